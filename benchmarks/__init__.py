@@ -0,0 +1,9 @@
+"""Benchmarks of the simulator subsystems and of the whole simulation.
+
+Results are written as JSON so runs of different commits can be compared:
+
+    python -m benchmarks -o before.json
+    git checkout other-branch
+    python -m benchmarks -o after.json
+    python -m benchmarks compare before.json after.json
+"""
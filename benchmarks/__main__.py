@@ -0,0 +1,147 @@
+"""Usage:
+    python -m benchmarks [-o results.json] [-k filter] [--quick]
+    python -m benchmarks compare before.json after.json [--threshold 0.1]
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import traceback
+
+from benchmarks.cases import E2E_SIZES, MICRO, simulate
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_micro(case, n: int, repeat: int) -> dict:
+    times = []
+    for _ in range(repeat):
+        # a fresh subsystem every repeat, built outside of the timing
+        batch, ops, *teardown = case.setup(n)
+        try:
+            start = time.perf_counter()
+            batch()
+            times.append(time.perf_counter() - start)
+        finally:
+            for done in teardown:
+                done()
+
+    best = min(times)
+    return {
+        "name": case.name,
+        "size": n,
+        "ops": ops,
+        "repeat": repeat,
+        "best_s": best,
+        "mean_s": sum(times) / len(times),
+        "per_op_s": best / ops,
+    }
+
+
+def run_e2e(n: int) -> dict:
+    result = {"name": "simulate_os", "size": n}
+    start = time.perf_counter()
+    try:
+        result.update(simulate(n))
+    except Exception as e:
+        # recorded instead of aborting the whole suite
+        result["error"] = f"{type(e).__name__}: {e}"
+        traceback.print_exc(file=sys.stderr)
+    result["best_s"] = time.perf_counter() - start
+    result["per_op_s"] = result["best_s"] / n
+    return result
+
+
+def run(args) -> dict:
+    results = []
+
+    for case in MICRO:
+        if args.filter and args.filter not in case.name:
+            continue
+        sizes = case.sizes[:1] if args.quick else case.sizes
+        for n in sizes:
+            result = run_micro(case, n, args.repeat)
+            print(f"{case.name}[{n}]: {result['per_op_s'] * 1e6:.3f} us/op", file=sys.stderr)
+            results.append(result)
+
+    if not args.filter or args.filter in "simulate_os":
+        sizes = args.sizes or (E2E_SIZES[:1] if args.quick else E2E_SIZES)
+        for n in sizes:
+            result = run_e2e(n)
+            status = result["error"] if "error" in result else f"{result['completed']} completed"
+            print(f"simulate_os[{n}]: {result['best_s']:.3f} s ({status})", file=sys.stderr)
+            results.append(result)
+
+    return {
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+
+
+def compare(path_a: str, path_b: str, threshold: float) -> bool:
+    """Prints the change of every benchmark present in both files.
+    Returns False when any got slower by more than threshold.
+    """
+    with open(path_a) as f:
+        a = json.load(f)
+    with open(path_b) as f:
+        b = json.load(f)
+
+    before = {(r["name"], r["size"]): r for r in a["results"]}
+    ok = True
+    print(f"{a['commit']} -> {b['commit']}")
+    for result in b["results"]:
+        key = (result["name"], result["size"])
+        old = before.get(key)
+        if old is None or "error" in old or "error" in result:
+            continue
+        ratio = result["per_op_s"] / old["per_op_s"]
+        mark = ""
+        if ratio > 1 + threshold:
+            mark = "  REGRESSION"
+            ok = False
+        print(f"{key[0]}[{key[1]}]: {old['per_op_s'] * 1e6:.3f} -> {result['per_op_s'] * 1e6:.3f} us/op (x{ratio:.2f}){mark}")
+    return ok
+
+
+def main():
+    if sys.argv[1:2] == ["compare"]:
+        parser = argparse.ArgumentParser(prog="python -m benchmarks compare")
+        parser.add_argument("before", type=str)
+        parser.add_argument("after", type=str)
+        parser.add_argument("--threshold", type=float, default=0.1, help="Slowdown reported as a regression")
+        args = parser.parse_args(sys.argv[2:])
+        sys.exit(0 if compare(args.before, args.after, args.threshold) else 1)
+
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="OS Simulator benchmarks")
+    parser.add_argument("--output", "-o", type=str, help="JSON file for the results (default: stdout)")
+    parser.add_argument("--filter", "-k", type=str, help="Only benchmarks whose name contains this")
+    parser.add_argument("--repeat", "-r", type=int, default=5)
+    parser.add_argument("--sizes", type=int, nargs="+", help="Number of processes of the end to end runs")
+    parser.add_argument("--quick", action="store_true", help="Only the smallest size of each benchmark")
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""Benchmark cases.
+
+A micro benchmark is a function of a size n that builds a fresh subsystem and
+returns (batch, ops): batch runs ops operations on it and is what gets timed.
+Cases that leave something behind, like a temporary file, return
+(batch, ops, teardown) instead, and teardown runs after the timing.
+End to end cases run simulate_os over a generated workload of n processes.
+"""
+import functools
+import os
+import random
+import tempfile
+import typing
+from collections import deque
+from dataclasses import dataclass
+
+from main import simulate_os
+from simple_os.cpu import _CPU
+from simple_os.files.input_reader import InputReader
+from simple_os.files.system import FileSystem
+from simple_os.kernel import Kernel
+from simple_os.memory.memory_manager import _MemoryManager
+from simple_os.memory.strategies import STRATEGIES
+from simple_os.output import NullSink
+from simple_os.process.pcb import PCB, ProcState
+from simple_os.process.policies import POLICIES
+from simple_os.process.scheduler import _Scheduler
+from simple_os.resource.resource_manager import _ResourceManager
+from simple_os.resource.safety import _SafetyChecker
+from simple_os.simulation_utils import parse_procs_decl
+from simple_os.workload import GeneratedWorkload, WorkloadSpec
+
+Batch = typing.Callable[[], None]
+
+
+@dataclass(frozen=True)
+class Case:
+    name: str
+    setup: typing.Callable[[int], tuple[Batch, int] | tuple[Batch, int, Batch]]
+    sizes: tuple[int, ...]
+
+
+def _pcb(pid: int, priority: int) -> PCB:
+    return PCB(
+        pid=pid,
+        starting_priority=priority,
+        time_needed=10,
+        is_preemptable=priority == 0,
+        marked_for_termination=False,
+        memory_needed=None,
+        memory_offset=0,
+        memory_num_allocated_blocks=1,
+        time_left=10,
+        priority=priority,
+        state=ProcState.READY,
+        blocked_reason=None,
+        pc=0,
+        using_scanner=False,
+        requested_printer=0,
+        using_modem=False,
+        requested_sata=0,
+    )
+
+
+def _scheduler(n: int, policy: str = "mlfq") -> _Scheduler:
+    """Scheduler with n ready processes spread over the user queues."""
+    scheduler = _Scheduler(_CPU(NullSink()), sink=NullSink(), policy=policy)
+    table = [_pcb(pid, 1 + pid % 5) for pid in range(n)]
+    scheduler.register_process_lookup(table.__getitem__)
+    for pcb in table:
+        scheduler.add_ready_process(pcb)
+    return scheduler
+
+
+def scheduler_next(n: int):
+    scheduler = _scheduler(n)
+
+    def batch():
+        for _ in range(n):
+            scheduler.get_next_exec_time_and_proc()
+
+    return batch, n
+
+
+def scheduler_aging(n: int):
+    scheduler = _scheduler(n)
+    calls = 100
+
+    def batch():
+        for _ in range(calls):
+            scheduler.apply_aging(1)
+
+    return batch, calls
+
+
+def scheduler_cycle(policy: str, n: int):
+    """n slices of one unit: pick, age and requeue, with n ready processes."""
+    scheduler = _scheduler(n, policy)
+
+    def batch():
+        for _ in range(n):
+            _, pcb = scheduler.get_next_exec_time_and_proc()
+            scheduler.apply_aging(1)
+            scheduler.requeue_after_execution(pcb, 1)
+
+    return batch, n
+
+
+def memory_churn(strategy: str, n: int):
+    """Allocates 1000 processes of random sizes on a memory of n blocks,
+    freeing the oldest ones whenever memory is full.
+    """
+    memory_manager = _MemoryManager(total_blocks=n, real_time_blocks=n // 16, strategy=strategy)
+    rng = random.Random(0)
+    sizes = [rng.randint(1, n // 8) for _ in range(1000)]
+
+    def batch():
+        live = deque()
+        for pid, size in enumerate(sizes):
+            while memory_manager.allocate(pid, size)[0] == 1:
+                memory_manager.free(live.popleft())
+            live.append(pid)
+
+    return batch, len(sizes)
+
+
+def filesystem_first_fit(n: int):
+    """first_fit on a disk of n blocks, every other block taken on its first
+    half so each search scans past the fragments.
+    """
+    system = FileSystem(n, NullSink())
+    for i in range(0, n // 2, 2):
+        system.disk.occupy_block(i, "X")
+    calls = 100
+
+    def batch():
+        for size in range(1, calls + 1):
+            system.first_fit(size)
+
+    return batch, calls
+
+
+def resources_acquire(devices: int):
+    """Every device of printer and SATA pools of the given size taken and
+    given back, one process per device.
+    """
+    resource_manager = _ResourceManager({"printer": devices, "sata": devices})
+
+    def batch():
+        for pid in range(devices):
+            resource_manager.acquire(pid, 1, False, False, 1)
+        for pid in range(devices):
+            resource_manager.release(pid)
+
+    return batch, devices
+
+
+def safety_check(processes: int):
+    """Banker's safety check of processes holding and claiming random
+    devices of 64 classes.
+    """
+    classes = 64
+    rng = random.Random(0)
+    safety = _SafetyChecker([processes] * classes)
+    for pid in range(processes):
+        claim = safety.pack(rng.randrange(2) for _ in range(classes))
+        safety.declare(pid, claim)
+        safety.granted(pid, claim & safety.pack(rng.randrange(2) for _ in range(classes)))
+
+    def batch():
+        safety.is_safe()
+
+    return batch, processes
+
+
+def _tmp_file(lines: typing.Iterable[str]) -> str:
+    fd, path = tempfile.mkstemp(prefix="simple-os-bench-", suffix=".txt")
+    with os.fdopen(fd, "w") as f:
+        f.writelines(lines)
+    return path
+
+
+def files_read(n: int):
+    """InputReader.read_file of a declaration with n file operations."""
+    path = _tmp_file(
+        ["1000\n", "2\n", "X, 0, 2\n", "Y, 3, 1\n"]
+        + [f"{i}, 0, A, 3\n" if i % 2 else f"{i}, 1, A\n" for i in range(n)]
+    )
+
+    def batch():
+        InputReader.read_file(path, NullSink())
+
+    return batch, n, functools.partial(os.remove, path)
+
+
+def procs_parse(n: int):
+    """parse_procs_decl of n process declarations."""
+    rng = random.Random(0)
+    path = _tmp_file(
+        f"{t}, {rng.randint(0, 5)}, {rng.randint(1, 20)}, {rng.randint(1, 64)}, 0, 0, 0, 0\n"
+        for t in range(n)
+    )
+
+    def batch():
+        parse_procs_decl(path, NullSink())
+
+    return batch, n, functools.partial(os.remove, path)
+
+
+MICRO = [
+    Case("scheduler.get_next_exec_time_and_proc", scheduler_next, (100, 10_000)),
+    Case("scheduler.apply_aging", scheduler_aging, (100, 10_000)),
+    *(
+        Case(f"scheduler.cycle.{policy}", functools.partial(scheduler_cycle, policy), (100, 10_000))
+        for policy in POLICIES
+    ),
+    *(
+        Case(f"memory_manager.allocate_free.{strategy}", functools.partial(memory_churn, strategy), (1024, 16_384))
+        for strategy in STRATEGIES
+    ),
+    Case("filesystem.first_fit", filesystem_first_fit, (1024, 65_536)),
+    Case("resource_manager.acquire_release", resources_acquire, (2, 128)),
+    Case("safety.is_safe", safety_check, (100, 1_000)),
+    Case("input_reader.read_file", files_read, (1_000, 100_000)),
+    Case("simulation_utils.parse_procs_decl", procs_parse, (10_000, 1_000_000)),
+]
+
+
+# end to end
+
+E2E_SIZES = (100, 10_000, 1_000_000)
+
+
+def e2e_spec(n: int) -> WorkloadSpec:
+    # about 75% CPU load, so the queues stay bounded however long the run
+    return WorkloadSpec(seed=0, num_procs=n, rate=0.1)
+
+
+def simulate(n: int) -> dict:
+    """Runs simulate_os over n generated processes, returns its statistics."""
+    kernel = Kernel(sink=NullSink())
+    simulation = kernel.start(GeneratedWorkload(e2e_spec(n)))
+    simulate_os(simulation.arrivals, None, [], kernel, simulation)
+    return {
+        "completed": simulation.completed,
+        "killed": kernel.process_manager.killed_count,
+        "makespan": simulation.makespan,
+    }
@@ -1,86 +1,88 @@
 import simple_os.simulation_utils as utils
-from simple_os.process.process_manager import ProcessManager
-from simple_os.process.scheduler import Scheduler
+from simple_os.config import MachineConfig
+from simple_os.kernel import Kernel
+from simple_os.output import OUTPUT_MODES, OutputEvent, make_sink
+from simple_os.simulation import Simulation
+from simple_os.memory.paging import REPLACEMENT_POLICIES
+from simple_os.memory.strategies import STRATEGIES
+from simple_os.process.policies import POLICIES, REAL_TIME_POLICIES
+from simple_os.resource.resource_manager import DEADLOCK_HANDLING, DEFAULT_DEVICES
+from simple_os.profiling import Profiler
+import simple_os.snapshot as snapshot
+from simple_os.workload import GeneratedWorkload, load_spec
 
 import argparse
+import sys
 
 def simulate_os(
-    to_be_created_procs_list: utils.ProcCreatedTimedList,
+    to_be_created_procs_list: utils.ProcCreatedTimedList,  # or any arrival source
     filesystem_state,  # FileSystemManager
     filesystem_operations: list,  # List of file operations
+    kernel: Kernel = None,
+    simulation: Simulation = None,  # resumes this one instead of starting anew
 ):
     # time for debugging purposes
     max_os_execution_time = 1e8
-    t = 0
-
-    while (
-        t < max_os_execution_time and
-        (to_be_created_procs_list.num_unfetched_procs > 0 or
-        ProcessManager.existing_processes > 0)
-    ):
-        just_arrived_procs_to_create = to_be_created_procs_list.get_unfetched_procs_until(t)
-
-        for proc in just_arrived_procs_to_create:
-            ProcessManager.create_process(
-                proc.priority,
-                proc.execution_time,
-                proc.memory_needed,
-                proc.requested_printer,
-                proc.requested_scanner,
-                proc.requested_modem,
-                proc.requested_disk,
-            )
 
-        exec_time, proc = Scheduler.get_next_exec_time_and_proc()
-        interrupted_at = 0
-        interrupted = False
-        if proc is None:
-            t += 1
-            continue
-
-        while not interrupted and interrupted_at < exec_time:
-            interrupted_at += 1
-            just_arrived_procs_to_create = to_be_created_procs_list.get_unfetched_procs_until(
-                t + interrupted_at
-            )
+    if kernel is None:
+        kernel = Kernel()
+
+    if simulation is None:
+        simulation = kernel.start(to_be_created_procs_list, max_os_execution_time)
 
-            for just_arrived_proc in just_arrived_procs_to_create:
-                ProcessManager.create_process(
-                    just_arrived_proc.priority,
-                    just_arrived_proc.execution_time,
-                    just_arrived_proc.memory_needed,
-                    just_arrived_proc.requested_printer,
-                    just_arrived_proc.requested_scanner,
-                    just_arrived_proc.requested_modem,
-                    just_arrived_proc.requested_disk,
-                )
-                if just_arrived_proc.priority < proc.priority:
-                    # current process just got interrupted
-                    interrupted = True
-                    break
+    simulation.run()
 
-        t += interrupted_at
+    if kernel.config.num_cores > 1:
+        for core, utilization in enumerate(simulation.utilization):
+            kernel.sink.emit(OutputEvent.MESSAGE, f"Core {core}: {utilization:.1%} busy")
+        kernel.sink.emit(OutputEvent.MESSAGE, f"Migrations: {kernel.scheduler.migrations}")
 
-        Scheduler.dispatch(proc, exec_time, interrupted_at)
+    if kernel.config.paging:
+        mm = kernel.memory_manager
+        kernel.sink.emit(
+            OutputEvent.MESSAGE,
+            f"Page faults: {mm.page_faults} ({mm.fault_rate:.2%} of {mm.references} references)",
+        )
+        kernel.sink.emit(OutputEvent.MESSAGE, f"TLB hits: {mm.tlb_hit_rate:.1%}")
+        kernel.sink.emit(OutputEvent.MESSAGE, f"Time stalled on page faults: {mm.stall_time}")
 
-        if proc.time_left == 0:
-            ProcessManager.terminate_process(proc.pid)
+    if kernel.config.compaction:
+        mm = kernel.memory_manager
+        kernel.sink.emit(
+            OutputEvent.MESSAGE,
+            f"Compactions: {mm.compactions} ({mm.rescued} allocations rescued, "
+            f"{mm.moved_blocks} blocks moved in {mm.compaction_time} time units)",
+        )
+
+    if kernel.config.deadlock != "none":
+        rm = kernel.resource_manager
+        kernel.sink.emit(
+            OutputEvent.MESSAGE,
+            f"Deadlocks: {rm.safety.refused} unsafe requests delayed, "
+            f"{kernel.process_manager.deadlock_victims} processes killed",
+        )
 
     # After process simulation finishes, execute file system operations (if any)
     try:
-        if filesystem_operations:
-            print("Filesystem =>")
-            for i in range(len(to_be_created_procs_list._procs_to_be_created)):
-                if to_be_created_procs_list._procs_to_be_created[i].priority == 0:
-                    filesystem_state.add_real_time_process(i)
-                else:
-                    filesystem_state.add_process(i)
-
-            filesystem_state.execute_all_operations()
-            filesystem_state.show_current_state()
+        utils.execute_file_operations(
+            to_be_created_procs_list,
+            filesystem_state,
+            filesystem_operations,
+        )
 
     except Exception as e:
-        print("File system integration error:", e)
+        kernel.sink.emit(OutputEvent.MESSAGE, f"File system integration error: {e}")
+
+
+def device_counts(text: str) -> dict:
+    """Parses --devices, e.g. "printer=64,sata=128"."""
+    counts = {}
+    for item in text.split(","):
+        name, _, count = item.partition("=")
+        if not count.strip().isdigit():
+            raise argparse.ArgumentTypeError(f"Expected class=count, got {item!r}")
+        counts[name.strip()] = int(count)
+    return counts
 
 
 def main():
@@ -92,23 +94,243 @@ def main():
         help="File with definition of the processes that shall be run",
     )
 
+    parser.add_argument(
+        "--generate", "-g",
+        type=str,
+        help="JSON workload spec to generate the processes from, lazily, instead of --procs",
+    )
+
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Read --procs in chunks while the simulation runs instead of loading it first (must be sorted by arrival time)",
+    )
+
     parser.add_argument(
         "--files", "-f",
         type=str,
         help="File with definition of filesystem start state and file operations"
     )
-    args = parser.parse_args()
 
-    to_be_created_list = utils.parse_procs_decl(args.procs)
+    parser.add_argument(
+        "--output", "-o",
+        choices=OUTPUT_MODES,
+        default="text",
+        help="Output mode: human readable text, quiet (nothing), jsonl events, event counts or binary trace",
+    )
 
-    ops, fs_manager = utils.parse_file_decl(args.files)
+    parser.add_argument(
+        "--output-file",
+        type=str,
+        help="Write the output to this file instead of stdout",
+    )
 
-    simulate_os(
-        to_be_created_list,
-        fs_manager,
-        ops,
+    parser.add_argument(
+        "--policy",
+        choices=POLICIES,
+        default="mlfq",
+        help="Scheduling policy of the user priorities",
     )
 
+    parser.add_argument(
+        "--real-time-policy",
+        choices=REAL_TIME_POLICIES,
+        default="fifo",
+        help="Scheduling policy of the real time priority",
+    )
+
+    parser.add_argument(
+        "--memory-blocks",
+        type=int,
+        default=1024,
+        help="Number of memory blocks",
+    )
+
+    parser.add_argument(
+        "--real-time-blocks",
+        type=int,
+        default=64,
+        help="Memory blocks reserved for real time processes, at the start of the memory",
+    )
+
+    parser.add_argument(
+        "--memory-strategy",
+        choices=STRATEGIES,
+        default="first_fit",
+        help="Contiguous memory allocation strategy",
+    )
+
+    parser.add_argument(
+        "--compaction",
+        action="store_true",
+        help="Compact memory when an allocation fails only because of fragmentation",
+    )
+
+    parser.add_argument(
+        "--compaction-rate",
+        type=int,
+        default=64,
+        help="Memory blocks copied per time unit by compaction",
+    )
+
+    parser.add_argument(
+        "--paging",
+        action="store_true",
+        help="Paged memory with a TLB and page replacement instead of contiguous segments",
+    )
+
+    parser.add_argument(
+        "--page-size",
+        type=int,
+        default=16,
+        help="Memory blocks per page",
+    )
+
+    parser.add_argument(
+        "--tlb-entries",
+        type=int,
+        default=16,
+        help="Entries of the TLB",
+    )
+
+    parser.add_argument(
+        "--page-replacement",
+        choices=REPLACEMENT_POLICIES,
+        default="lru",
+        help="Page replacement policy",
+    )
+
+    parser.add_argument(
+        "--page-fault-cost",
+        type=int,
+        default=2,
+        help="Time units a page fault stalls a process",
+    )
+
+    parser.add_argument(
+        "--devices",
+        type=device_counts,
+        default={},
+        help="Devices of each class, e.g. printer=64,sata=128 (others as the original machine: "
+        "1 scanner, 2 printers, 1 modem, 3 sata)",
+    )
+
+    parser.add_argument(
+        "--deadlock",
+        choices=DEADLOCK_HANDLING,
+        default="none",
+        help="Avoid device deadlocks with the Banker's algorithm, or detect them and kill a process",
+    )
+
+    parser.add_argument(
+        "--cores",
+        type=int,
+        default=1,
+        help="Number of CPU cores",
+    )
+
+    parser.add_argument(
+        "--snapshot-at",
+        type=int,
+        help="Stop the simulation at this instant and save its state to --snapshot",
+    )
+
+    parser.add_argument(
+        "--snapshot",
+        type=str,
+        help="Snapshot file written by --snapshot-at",
+    )
+
+    parser.add_argument(
+        "--resume",
+        type=str,
+        help="Snapshot file to resume the simulation from (replaces --procs and --files)",
+    )
+
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="",
+        metavar="JSON",
+        help="Time the simulator hot paths: prints a table to stderr and writes it as JSON if a file is given",
+    )
+    args = parser.parse_args()
+
+    if args.snapshot_at is not None and args.snapshot is None:
+        parser.error("--snapshot-at requires --snapshot")
+    if args.generate and (args.procs or args.files):
+        parser.error("--generate cannot be used with --procs or --files")
+
+    out = None
+    if args.output_file:
+        out = open(args.output_file, "wb" if args.output == "trace" else "w")
+    sink = make_sink(args.output, out)
+    profiler = Profiler() if args.profile is not None else None
+
+    try:
+        if args.resume:
+            kernel, simulation, fs_manager = snapshot.read_snapshot(args.resume, sink)
+            if profiler is not None:
+                kernel.profiler = profiler
+                profiler.instrument_kernel(kernel)
+                profiler.instrument_simulation(simulation)
+            to_be_created_list = simulation.arrivals
+            ops = fs_manager.pending_operations if fs_manager is not None else []
+        else:
+            if args.generate:
+                to_be_created_list = GeneratedWorkload(load_spec(args.generate))
+                ops, fs_manager = [], None
+            else:
+                if args.stream:
+                    to_be_created_list = utils.ProcFileStream(args.procs, sink)
+                else:
+                    to_be_created_list = utils.parse_procs_decl(args.procs, sink)
+                ops, fs_manager = utils.parse_file_decl(args.files, sink)
+
+            config = MachineConfig(
+                policy=args.policy,
+                real_time_policy=args.real_time_policy,
+                num_cores=args.cores,
+                devices={**DEFAULT_DEVICES, **args.devices},
+                deadlock=args.deadlock,
+                memory_blocks=args.memory_blocks,
+                real_time_blocks=args.real_time_blocks,
+                memory_strategy=args.memory_strategy,
+                compaction=args.compaction,
+                compaction_rate=args.compaction_rate,
+                paging=args.paging,
+                page_size=args.page_size,
+                tlb_entries=args.tlb_entries,
+                page_replacement=args.page_replacement,
+                page_fault_cost=args.page_fault_cost,
+            )
+            kernel = Kernel(config, sink, profiler)
+            simulation = kernel.start(to_be_created_list)
+
+        if profiler is not None and fs_manager is not None:
+            profiler.instrument_filesystem(fs_manager.system)
+
+        if args.snapshot_at is not None:
+            simulation.run(until=args.snapshot_at)
+            snapshot.write_snapshot(args.snapshot, kernel, simulation, fs_manager)
+            return
+
+        simulate_os(
+            to_be_created_list,
+            fs_manager,
+            ops,
+            kernel,
+            simulation,
+        )
+    finally:
+        sink.close()
+        if out is not None:
+            out.close()
+        if profiler is not None:
+            print(profiler.summary(), file=sys.stderr)
+            if args.profile:
+                profiler.write_json(args.profile)
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,126 @@
+import typing
+from dataclasses import dataclass, field, fields
+
+from simple_os.memory.paging import REPLACEMENT_POLICIES
+from simple_os.memory.strategies import STRATEGIES
+from simple_os.process.policies import POLICIES, REAL_TIME_POLICIES
+from simple_os.resource.resource_manager import DEADLOCK_HANDLING, DEFAULT_DEVICES, DEVICE_CLASSES
+
+
+def _default_quantum_table():
+    return {
+        0: None,  # real time, no preempting
+        1: 6,
+        2: 5,
+        3: 4,
+        4: 3,
+        5: 2,
+    }
+
+
+@dataclass(frozen=True)
+class MachineConfig:
+    """Tunable parameters of one simulated machine.
+    The defaults reproduce the original hard-coded machine.
+    """
+    name: str = "default"
+    quantum_table: dict[int, typing.Optional[int]] = field(
+        default_factory=_default_quantum_table
+    )
+    memory_blocks: int = 1024
+    # blocks [0, real_time_blocks) are reserved for real time processes
+    real_time_blocks: int = 64
+    # contiguous allocation strategy, see simple_os.memory.strategies
+    memory_strategy: str = "first_fit"
+    # slide segments together when an allocation fails only because of
+    # fragmentation, copying compaction_rate blocks per unit of time
+    compaction: bool = False
+    compaction_rate: int = 64
+    # paged memory instead of contiguous segments, see simple_os.memory.paging
+    paging: bool = False
+    page_size: int = 16
+    tlb_entries: int = 16
+    page_replacement: str = "lru"
+    # time units a process is stalled by every page fault
+    page_fault_cost: int = 2
+    # device class -> number of devices, see simple_os.resource
+    devices: dict[str, int] = field(default_factory=lambda: dict(DEFAULT_DEVICES))
+    # "avoid" delays device requests that could deadlock, "detect" kills
+    # processes blocked forever, see simple_os.resource.safety
+    deadlock: str = "none"
+    # scheduling policies of the user levels and of the real time level,
+    # see simple_os.process.policies
+    policy: str = "mlfq"
+    real_time_policy: str = "fifo"
+    num_cores: int = 1
+    # pid -> cores it may run on, any core if absent
+    affinity: dict[int, list[int]] = field(default_factory=dict)
+
+    def __post_init__(self):
+        if self.memory_blocks < 1:
+            raise ValueError("memory_blocks must be at least 1")
+        if not 0 <= self.real_time_blocks <= self.memory_blocks:
+            raise ValueError("real_time_blocks must be between 0 and memory_blocks")
+        if self.compaction_rate < 1:
+            raise ValueError("compaction_rate must be at least 1")
+        if self.compaction and (self.paging or self.memory_strategy == "buddy"):
+            raise ValueError("Compaction needs contiguous memory and a strategy other than buddy")
+        if self.page_size < 1 or self.tlb_entries < 1 or self.page_fault_cost < 0:
+            raise ValueError("page_size and tlb_entries must be at least 1, page_fault_cost at least 0")
+        if self.page_replacement not in REPLACEMENT_POLICIES:
+            raise ValueError(f"Unknown page replacement policy: {self.page_replacement}")
+        unknown = set(self.devices) - set(DEVICE_CLASSES)
+        if unknown:
+            raise ValueError(f"Unknown device classes: {sorted(unknown)}")
+        if any(count < 1 for count in self.devices.values()):
+            raise ValueError("Every device class needs at least 1 device")
+        if self.deadlock not in DEADLOCK_HANDLING:
+            raise ValueError(f"Unknown deadlock handling: {self.deadlock}")
+        if self.num_cores < 1:
+            raise ValueError("num_cores must be at least 1")
+        if self.policy not in POLICIES:
+            raise ValueError(f"Unknown scheduling policy: {self.policy}")
+        if self.real_time_policy not in REAL_TIME_POLICIES:
+            raise ValueError(f"Unknown real time scheduling policy: {self.real_time_policy}")
+        if self.memory_strategy not in STRATEGIES:
+            raise ValueError(f"Unknown memory allocation strategy: {self.memory_strategy}")
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "MachineConfig":
+        known = {f.name for f in fields(cls)}
+        unknown = set(data) - known
+        if unknown:
+            raise ValueError(f"Unknown machine config keys: {sorted(unknown)}")
+
+        data = dict(data)
+        if "quantum_table" in data:
+            # json keys are always strings
+            table = _default_quantum_table()
+            table.update({int(k): v for k, v in data["quantum_table"].items()})
+            data["quantum_table"] = table
+        if "affinity" in data:
+            data["affinity"] = {int(k): list(v) for k, v in data["affinity"].items()}
+
+        return cls(**data)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "quantum_table": {str(k): v for k, v in self.quantum_table.items()},
+            "memory_blocks": self.memory_blocks,
+            "real_time_blocks": self.real_time_blocks,
+            "memory_strategy": self.memory_strategy,
+            "compaction": self.compaction,
+            "compaction_rate": self.compaction_rate,
+            "paging": self.paging,
+            "page_size": self.page_size,
+            "tlb_entries": self.tlb_entries,
+            "page_replacement": self.page_replacement,
+            "page_fault_cost": self.page_fault_cost,
+            "devices": dict(self.devices),
+            "deadlock": self.deadlock,
+            "policy": self.policy,
+            "real_time_policy": self.real_time_policy,
+            "num_cores": self.num_cores,
+            "affinity": {str(k): v for k, v in self.affinity.items()},
+        }
@@ -1,25 +1,31 @@
+from simple_os.output import EventSink, OutputEvent, TextSink
 from simple_os.process.pcb import PCB
 
 class _CPU:
-    def execute(self, proc: PCB, exec_time: int, interrupted_at: int):
+    def __init__(self, sink: EventSink = None):
+        self.sink = sink if sink is not None else TextSink()
+
+    def execute(self, proc: PCB, exec_time: int, interrupted_at: int, progress: int = None):
+        """Runs proc for interrupted_at units of its exec_time slice, of
+        which only progress (all of them by default) execute instructions,
+        the others being stalls.
+        """
         assert exec_time <= proc.time_left
-        print()
-        print(f"process {proc.pid} =>")
-        if proc.time_left == proc.time_needed:
-            print(f"P{proc.pid} STARTED")
-        while interrupted_at > 0:
-            print(f"P{proc.pid} instruction {proc.pc + 1}")
-            exec_time -= 1
-            interrupted_at -= 1
-            proc.pc += 1
-            proc.time_left -= 1
+        if progress is None:
+            progress = interrupted_at
+        sink = self.sink
+        # started by the slice that runs its first instruction
+        sink.emit(OutputEvent.EXECUTE, proc.pid, proc.pc == 0 and progress > 0)
+
+        # every instruction is executed in one go and reported as a range
+        sink.emit(OutputEvent.INSTRUCTIONS, proc.pid, proc.pc + 1, progress)
+        exec_time -= interrupted_at
+        proc.pc += progress
+        proc.time_left -= progress
 
         if proc.time_left == 0:
-            print(f"P{proc.pid} return SIGINT")
+            sink.emit(OutputEvent.EXIT, proc.pid)
         elif exec_time == 0:
-            print(f"P{proc.pid} used its quantum")
+            sink.emit(OutputEvent.QUANTUM_EXPIRED, proc.pid)
         else:
-
-            print(f"P{proc.pid} interrupted")
-
-CPU = _CPU()
+            sink.emit(OutputEvent.PREEMPTED, proc.pid)
@@ -6,14 +6,18 @@ for the file system.
 
 from typing import Dict, Any
 from simple_os.files.file import FileOperation
+from simple_os.output import EventSink, OutputEvent, TextSink
 
 
 class InputReader:
     """Reader for input files in the specified format"""
     
     @staticmethod
-    def read_file(file_name: str) -> Dict[str, Any]:
+    def read_file(file_name: str, sink: EventSink = None) -> Dict[str, Any]:
         """Reads input file and returns structured data"""
+        if sink is None:
+            sink = TextSink()
+
         try:
             with open(file_name, 'r') as file:
                 lines = file.readlines()
@@ -66,7 +70,7 @@ class InputReader:
             operations = []
             for i in range(2 + n, len(clean_lines)):
                 operation_line = clean_lines[i]
-                operation = InputReader.parse_operation_line(operation_line, i+1)
+                operation = InputReader.parse_operation_line(operation_line, i+1, sink)
                 if operation:
                     operations.append(operation)
 
@@ -77,7 +81,8 @@ class InputReader:
                 max_id = max(process_ids)
                 expected = set(range(max_id + 1))
                 if not process_ids.issubset(expected):
-                    print("Warning: Process IDs are not sequential starting from 0")
+                    sink.emit(OutputEvent.MESSAGE,
+                              "Warning: Process IDs are not sequential starting from 0")
             
             return {
                 'total_blocks': total_blocks,
@@ -87,17 +92,17 @@ class InputReader:
             }
             
         except FileNotFoundError:
-            print(f"Error: File '{file_name}' not found")
+            sink.emit(OutputEvent.MESSAGE, f"Error: File '{file_name}' not found")
             return None
         except ValueError as e:
-            print(f"Format error in file: {e}")
+            sink.emit(OutputEvent.MESSAGE, f"Format error in file: {e}")
             return None
         except Exception as e:
-            print(f"Error reading file: {e}")
+            sink.emit(OutputEvent.MESSAGE, f"Error reading file: {e}")
             return None
     
     @staticmethod
-    def parse_operation_line(line: str, line_number: int):
+    def parse_operation_line(line: str, line_number: int, sink: EventSink = None):
         """
         Parses an operation line.
         
@@ -142,11 +147,15 @@ class InputReader:
                 return FileOperation(process_id, operation_code, file_name, file_id=file_id)
                 
         except ValueError as e:
-            print(f"Error parsing line {line_number}: {e}")
-            print(f"  Line: {line}")
+            if sink is None:
+                sink = TextSink()
+            sink.emit(OutputEvent.MESSAGE, f"Error parsing line {line_number}: {e}")
+            sink.emit(OutputEvent.MESSAGE, f"  Line: {line}")
             raise e
         except Exception as e:
-            print(f"Unexpected error parsing line {line_number}: {e}")
+            if sink is None:
+                sink = TextSink()
+            sink.emit(OutputEvent.MESSAGE, f"Unexpected error parsing line {line_number}: {e}")
             raise e
     
     @staticmethod
@@ -6,16 +6,20 @@ and managing real-time processes.
 
 from typing import List, Dict, Any
 from simple_os.files.system import FileSystem
+from simple_os.output import EventSink, OutputEvent, TextSink
 
 
 class FileSystemManager:
     """Main file system manager"""
     
-    def __init__(self, total_blocks: int):
+    def __init__(self, total_blocks: int, sink: EventSink = None):
         """Initializes the file system manager"""
+
+        # Where every operation is reported
+        self.sink = sink if sink is not None else TextSink()
         
         # Create file system
-        self.system = FileSystem(total_blocks)
+        self.system = FileSystem(total_blocks, self.sink)
         
         # List of real-time processes
         self.real_time_processes = set()
@@ -47,10 +51,11 @@ class FileSystemManager:
     def execute_all_operations(self):
         """Executes all pending operations in the system"""
         if not self.pending_operations:
-            print("No pending operations to execute.")
+            self.sink.emit(OutputEvent.MESSAGE, "No pending operations to execute.")
             return
         
-        print(f"\nExecuting {len(self.pending_operations)} pending operations...")
+        self.sink.emit(OutputEvent.MESSAGE,
+                       f"\nExecuting {len(self.pending_operations)} pending operations...")
         self.system.execute_operations(self.pending_operations)
         
         # Clear operation queue after execution
@@ -80,30 +85,36 @@ class FileSystemManager:
     
     def show_current_state(self):
         """hows current file system state"""
-        print("\n" + "="*60)
-        print("CURRENT FILE SYSTEM STATE")
-        print("="*60)
+        if not self.sink.enabled:
+            return
+
+        lines = []
+        lines.append("\n" + "="*60)
+        lines.append("CURRENT FILE SYSTEM STATE")
+        lines.append("="*60)
         
         report = self.get_report()
         
-        print("\nDisk Configuration:")
-        print(f"  • Total blocks: {report['total_blocks']}")
-        print(f"  • Free blocks: {report['free_blocks']}")
-        print(f"  • Occupied blocks: {report['occupied_blocks']} "
-              f"({report['occupied_percent']:.1f}%)")
-        print(f"  • Total files: {report['total_files']}")
+        lines.append("\nDisk Configuration:")
+        lines.append(f"  • Total blocks: {report['total_blocks']}")
+        lines.append(f"  • Free blocks: {report['free_blocks']}")
+        lines.append(f"  • Occupied blocks: {report['occupied_blocks']} "
+                     f"({report['occupied_percent']:.1f}%)")
+        lines.append(f"  • Total files: {report['total_files']}")
         
         if report['real_time_processes']:
-            print(f"\nReal-time processes: {report['real_time_processes']}")
+            lines.append(f"\nReal-time processes: {report['real_time_processes']}")
 
         if report['processes']:
-            print(f"\nProcesses: {report['processes']}")
+            lines.append(f"\nProcesses: {report['processes']}")
         
         if report['files']:
-            print("\nFiles in system:")
+            lines.append("\nFiles in system:")
             for file_id, info in report['files'].items():
-                print(f"  • {info}")
+                lines.append(f"  • {info}")
         
-        print("="*60)
+        lines.append("="*60)
+
+        self.sink.emit(OutputEvent.MESSAGE, "\n".join(lines))
 
         self.system.generate_disk_map()
\ No newline at end of file
@@ -7,14 +7,18 @@ Manages files, blocks, and process permissions.
 from typing import List, Tuple
 from simple_os.files.disk import Disk
 from simple_os.files.file import File
+from simple_os.output import EventSink, OutputEvent, TextSink
 
 
 class FileSystem:
     """File system with contiguous allocation and First-Fit algorithm"""
     
-    def __init__(self, total_blocks: int):
+    def __init__(self, total_blocks: int, sink: EventSink = None):
         """Initializes the file system"""
 
+        # Where every operation is reported
+        self.sink = sink if sink is not None else TextSink()
+
         # Create disk with specified number of blocks
         self.disk = Disk(total_blocks)
         
@@ -30,16 +34,19 @@ class FileSystem:
         
         # Mapping for unique IDs (for internal control)
         self.next_id = 1
+
+        # Number of operations that could not be executed
+        self.failed_operations = 0
     
     def add_real_time_process(self, process_id: int):
         """Marks a process as real-time"""
         self.real_time_processes.add(process_id)
-        print(f"Process P{process_id} marked as real-time")
+        self.sink.emit(OutputEvent.MESSAGE, f"Process P{process_id} marked as real-time")
 
     def add_process(self, process_id: int):
         """Adds a process to the set of processes"""
         self.processes.add(process_id)
-        print(f"Process P{process_id} added to the set of processes")
+        self.sink.emit(OutputEvent.MESSAGE, f"Process P{process_id} added to the set of processes")
     
     def is_real_time_process(self, process_id: int) -> bool:
         """Checks if a process is real-time"""
@@ -75,23 +82,27 @@ class FileSystem:
         """Creates a new file in the system"""
         # Initial validations
         if size_blocks <= 0:
-            print(f"Error: Invalid size for file '{file_name}'")
+            self.sink.emit(OutputEvent.FS_FAIL, process_id,
+                           f"Error: Invalid size for file '{file_name}'")
             return False
         
         if file_id in self.files:
-            print(f"Error: ID '{file_id}' already in use")
+            self.sink.emit(OutputEvent.FS_FAIL, process_id,
+                           f"Error: ID '{file_id}' already in use")
             return False
         
         if process_id not in self.processes and process_id not in self.real_time_processes:
-            print(f"Error: Process P{process_id} not found")
+            self.sink.emit(OutputEvent.FS_FAIL, process_id,
+                           f"Error: Process P{process_id} not found")
             return False
         
         # Find space using First-Fit algorithm
         start = self.first_fit(size_blocks)
         
         if start == -1:
-            print(f"Error: Insufficient space for file '{file_name}' "
-                  f"({size_blocks} blocks)")
+            self.sink.emit(OutputEvent.FS_FAIL, process_id,
+                           f"Error: Insufficient space for file '{file_name}' "
+                           f"({size_blocks} blocks)")
             return False
         
         # Create File object
@@ -104,16 +115,15 @@ class FileSystem:
                 # If fails, free already allocated blocks
                 for j in range(start, i):
                     self.disk.free_block(j)
-                print(f"Error: Failed to allocate block {i}")
+                self.sink.emit(OutputEvent.FS_FAIL, process_id,
+                               f"Error: Failed to allocate block {i}")
                 return False
         
         # Store file in system
         self.files[file_name] = file
         
-        print(f"Success: File '{file_name}' (ID: {file_id}) created "
-              f"by process P{process_id}")
-        print(f"  Allocated blocks: {start} to {start + size_blocks - 1} "
-              f"({size_blocks} blocks)")
+        self.sink.emit(OutputEvent.FS_CREATE, process_id, file_name,
+                       file_id, start, size_blocks)
         
         return True
     
@@ -121,7 +131,8 @@ class FileSystem:
         """Deletes a file from the system"""
         # Check if file exists
         if file_id not in self.files:
-            print(f"Error: File with ID '{file_id}' not found")
+            self.sink.emit(OutputEvent.FS_FAIL, process_id,
+                           f"Error: File with ID '{file_id}' not found")
             return False
         
         file = self.files[file_id]
@@ -130,8 +141,9 @@ class FileSystem:
         if not self.is_real_time_process(process_id):
             # Regular process can only delete its own files
             if not file.belongs_to_process(process_id):
-                print(f"Error: Regular process P{process_id} not allowed "
-                      f"to delete file '{file_id}' (owner: P{file.owner_process})")
+                self.sink.emit(OutputEvent.FS_FAIL, process_id,
+                               f"Error: Regular process P{process_id} not allowed "
+                               f"to delete file '{file_id}' (owner: P{file.owner_process})")
                 return False
         
         # Free all blocks occupied by the file
@@ -141,25 +153,25 @@ class FileSystem:
         # Remove file from system
         del self.files[file_id]
         
-        print(f"Success: File '{file_id}' ('{file.name}') deleted "
-              f"by process P{process_id}")
+        self.sink.emit(OutputEvent.FS_DELETE, process_id, file_id, file.name)
         
         return True
     
     def load_initial_state(self, initial_files: List[Tuple]) -> bool:
         """Loads initial disk state"""
-        print("Loading initial disk state...")
+        self.sink.emit(OutputEvent.MESSAGE, "Loading initial disk state...")
         file_id = 0
         for file_name, start_block, size in initial_files:
             # Check if blocks are within disk
             if start_block + size > self.disk.total_blocks:
-                print(f"Error: File '{file_name}' exceeds disk size")
+                self.sink.emit(OutputEvent.MESSAGE, f"Error: File '{file_name}' exceeds disk size")
                 return False
             
             # Check if blocks are free
             for i in range(start_block, start_block + size):
                 if not self.disk.is_free(i):
-                    print(f"Error: Conflict at block {i} for file '{file_name}'")
+                    self.sink.emit(OutputEvent.MESSAGE,
+                                   f"Error: Conflict at block {i} for file '{file_name}'")
                     return False
 
             file = File(file_id, file_name,
@@ -174,15 +186,15 @@ class FileSystem:
             file_id += 1
         
         self.next_id = file_id
-        print(f"Initial state loaded: {len(initial_files)} files")
+        self.sink.emit(OutputEvent.MESSAGE, f"Initial state loaded: {len(initial_files)} files")
         return True
     
     def execute_operations(self, operations: List):
         """Executes a list of operations in the file system"""
-        print(f"\nExecuting {len(operations)} operations...")
+        self.sink.emit(OutputEvent.MESSAGE, f"\nExecuting {len(operations)} operations...")
         
         for i, operation in enumerate(operations, 1):
-            print(f"\n[{i}] {operation}")
+            self.sink.emit(OutputEvent.MESSAGE, f"\n[{i}] {operation}")
             
             if operation.is_creation():
                 # For creation, we need to generate a unique ID (letter)
@@ -190,23 +202,30 @@ class FileSystem:
                 file_id = self.next_id
                 self.next_id += 1
                 
-                self.create_file(operation.process_id, operation.file_name,
-                               operation.size, file_id)
+                ok = self.create_file(operation.process_id, operation.file_name,
+                                      operation.size, file_id)
             else:
                 # For deletion, file_id is in the operation
-                self.delete_file(operation.process_id, operation.file_id)
+                ok = self.delete_file(operation.process_id, operation.file_id)
+
+            if not ok:
+                self.failed_operations += 1
     
     def generate_disk_map(self):
         """Generates a visual map of disk occupation"""
-        print("\n" + "="*70)
-        print("DISK OCCUPATION MAP")
-        print("="*70)
+        if not self.sink.enabled:
+            return
+
+        lines = []
+        lines.append("\n" + "="*70)
+        lines.append("DISK OCCUPATION MAP")
+        lines.append("="*70)
         
         # Legend
-        print("\nLEGEND:")
-        print("  0 = Free block")
-        print("  Letter = name of file occupying the block")
-        print("-"*70)
+        lines.append("\nLEGEND:")
+        lines.append("  0 = Free block")
+        lines.append("  Letter = name of file occupying the block")
+        lines.append("-"*70)
         
         # Map configuration
         blocks_per_line = 20
@@ -218,17 +237,19 @@ class FileSystem:
             end = min(start + blocks_per_line, self.disk.total_blocks)
             
             # Line header
-            print(f"\nBlocks {start:3d} to {end-1:3d}: ", end="")
+            text = f"\nBlocks {start:3d} to {end-1:3d}: "
             
             # Block values
             for i in range(start, end):
                 file_name = self.disk.get_block(i).get_file_name()
-                print(f"{file_name}", end=" ")
+                text += f"{file_name} "
+
+            lines.append(text)
 
-            print("")
+        lines.append("")
+        lines.append("-"*70)
 
-        print("")
-        print("-"*70)
+        self.sink.emit(OutputEvent.MESSAGE, "\n".join(lines))
     
     def get_disk_state(self) -> List[str]:
         """Returns current disk state"""
@@ -0,0 +1,106 @@
+from simple_os.config import MachineConfig
+from simple_os.cpu import _CPU
+from simple_os.memory.memory_manager import _MemoryManager
+from simple_os.memory.paging import _PagedMemoryManager
+from simple_os.output import EventSink, TextSink
+from simple_os.process.process_manager import _ProcessManager
+from simple_os.process.scheduler import _Scheduler
+from simple_os.profiling import Profiler
+from simple_os.resource.resource_manager import _ResourceManager
+from simple_os.simulation import Simulation
+from simple_os.simulation_utils import ProcCreatedTimedList
+
+
+class Kernel:
+    """A whole simulated machine.
+
+    Every kernel owns its own CPUs, scheduler, memory manager, resource manager
+    and process table, so independent simulations can run side by side in
+    the same Python process (threads) or in worker processes.
+    """
+
+    def __init__(
+        self,
+        config: MachineConfig = None,
+        sink: EventSink = None,
+        profiler: Profiler = None,
+    ):
+        if config is None:
+            config = MachineConfig()
+        self.config = config
+        self.sink = sink if sink is not None else TextSink()
+
+        self.cpu = _CPU(self.sink)
+        self.scheduler = _Scheduler(
+            self.cpu,
+            config.quantum_table,
+            self.sink,
+            config.policy,
+            config.real_time_policy,
+            config.num_cores,
+            config.affinity,
+        )
+        # one CPU per core, self.cpu is core 0
+        self.cpus = self.scheduler.cpus
+        if config.paging:
+            self.memory_manager = _PagedMemoryManager(
+                config.memory_blocks,
+                config.real_time_blocks,
+                config.page_size,
+                config.tlb_entries,
+                config.page_replacement,
+                config.page_fault_cost,
+            )
+        else:
+            self.memory_manager = _MemoryManager(
+                config.memory_blocks,
+                config.real_time_blocks,
+                config.memory_strategy,
+                config.compaction,
+                config.compaction_rate,
+            )
+        self.resource_manager = _ResourceManager(config.devices, config.deadlock)
+        self.process_manager = _ProcessManager(
+            self.memory_manager,
+            self.scheduler,
+            self.resource_manager,
+            self.sink,
+        )
+        if config.compaction:
+            # relocated segments update the offsets in the PCBs
+            self.memory_manager.register_process_lookup(self.process_manager._get_pcb)
+
+        # only set when profiling, see simple_os.profiling
+        self.profiler = profiler
+        if profiler is not None:
+            profiler.instrument_kernel(self)
+
+    def start(
+        self,
+        to_be_created_procs_list: ProcCreatedTimedList,
+        max_time: float = 1e8,
+    ) -> Simulation:
+        """Creates a simulation of the declared processes on this machine,
+        without running it.
+        """
+        simulation = Simulation(
+            to_be_created_procs_list,
+            self.process_manager,
+            self.scheduler,
+            max_time,
+        )
+        if self.profiler is not None:
+            self.profiler.instrument_simulation(simulation)
+        return simulation
+
+    def run(
+        self,
+        to_be_created_procs_list: ProcCreatedTimedList,
+        max_time: float = 1e8,
+    ) -> Simulation:
+        """Runs every process declared in the list until there is nothing
+        left to do (or until max_time). Returns the finished simulation.
+        """
+        simulation = self.start(to_be_created_procs_list, max_time)
+        simulation.run()
+        return simulation
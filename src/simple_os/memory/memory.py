@@ -1,7 +1,29 @@
 class Memory:
-    def __init__(self):
-        self.total_blocks = 1024
-        self.blocks = [None] * self.total_blocks
+    """Physical memory of total_blocks blocks.
+
+    Ownership is an extent map: the (offset, size) segments of every
+    process. The free space is kept by the allocation strategy of each
+    region, as holes. Nothing is stored per block, so memories of millions
+    of blocks stay small.
+    """
+
+    def __init__(self, total_blocks=1024):
+        self.total_blocks = total_blocks
+        # segmentos (offset, size) de cada processo
+        self.segments: dict[int, list[tuple[int, int]]] = {}
+
+    @property
+    def used_blocks(self) -> int:
+        return sum(size for segments in self.segments.values() for _, size in segments)
+
+    @property
+    def blocks(self) -> list:
+        """Owner pid of every block, None when free."""
+        blocks = [None] * self.total_blocks
+        for pid, segments in self.segments.items():
+            for offset, size in segments:
+                blocks[offset:offset + size] = [pid] * size
+        return blocks
 
     def __repr__(self):
         return str(self.blocks) # retorna lista self.blocks convertida pra string
@@ -1,55 +1,220 @@
+from dataclasses import dataclass
+from itertools import accumulate
 from simple_os.memory.memory import Memory
+from simple_os.memory.strategies import STRATEGIES
+from simple_os.process.pcb import PCB
 import typing
 
+
+@dataclass(frozen=True)
+class Fragmentation:
+    free_blocks: int
+    largest_hole: int
+    # parcela da memória livre fora do maior buraco, que nenhuma alocação
+    # sozinha consegue usar: 1 - largest_hole / free_blocks
+    external: float
+    # k -> número de buracos com [2**k, 2**(k+1)) blocos
+    histogram: dict[int, int]
+
+
+def _external(free_blocks, largest_hole) -> float:
+    return 1 - largest_hole / free_blocks if free_blocks else 0.0
+
+
 class _MemoryManager:
-    def __init__(self):
-        self.memory = Memory() # instancia Memory
+    paged = False
+
+    def __init__(
+        self,
+        total_blocks=1024,
+        real_time_blocks=64,
+        strategy="first_fit",
+        compaction=False,
+        compaction_rate=64,
+    ):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown memory allocation strategy: {strategy}")
+        if compaction and strategy == "buddy":
+            raise ValueError("Compaction does not work with the buddy system")
+        self.memory = Memory(total_blocks) # instancia Memory
+        # blocos [0, real_time_blocks) reservados para processos de tempo real
+        self.real_time_blocks = real_time_blocks
+        self.real_time_region = STRATEGIES[strategy](0, real_time_blocks)
+        self.region = STRATEGIES[strategy](real_time_blocks, total_blocks)
+        # alocações feitas, alocações que não acharam espaço e a soma da
+        # fragmentação externa da região depois de cada uma
+        self.allocations = 0
+        self.failed_allocations = 0
+        self.fragmentation_sum = 0.0
 
-    def find_contiguous_space(self, start, end, size): # busca por segmento contíguo de memória
-        free_count = 0
-        initial_index = -1
+        # compactação: quando uma alocação falha só por fragmentação, os
+        # segmentos são deslizados para abrir um buraco, copiando
+        # compaction_rate blocos por unidade de tempo
+        self.compaction = compaction
+        self.compaction_rate = compaction_rate
+        self.get_pcb: typing.Callable[[int], PCB] = None
+        # pid -> tempo de cópia que o processo ainda vai passar parado,
+        # no começo das próximas fatias
+        self.owed: dict[int, int] = {}
+        # compactações feitas, alocações que só conseguiram espaço por
+        # causa delas, blocos movidos e tempo gasto copiando
+        self.compactions = 0
+        self.rescued = 0
+        self.moved_blocks = 0
+        self.compaction_time = 0
 
-        for i in range(start, end):
-            if self.memory.blocks[i] is None:
-                if free_count == 0:
-                    initial_index = i
+    def register_process_lookup(self, get_pcb: typing.Callable[[int], PCB]):
+        self.get_pcb = get_pcb
 
-                free_count = free_count + 1 # atualiza espaço encontrado
+    @property
+    def holes_scanned(self) -> int:
+        return self.real_time_region.scanned + self.region.scanned
 
-                if free_count == size:
-                    return initial_index
-            else:
-                free_count = 0 # espaço alocado
+    @property
+    def mean_fragmentation(self) -> float:
+        """Mean external fragmentation seen by the allocations."""
+        attempts = self.allocations + self.failed_allocations
+        return self.fragmentation_sum / attempts if attempts else 0.0
 
-        return -1
+    def fragmentation(self, is_real_time=False) -> Fragmentation:
+        region = self.real_time_region if is_real_time else self.region
+        histogram = {}
+        for start, end in region.holes():
+            k = (end - start).bit_length() - 1
+            histogram[k] = histogram.get(k, 0) + 1
+        largest = region.largest
+        return Fragmentation(
+            region.free_blocks,
+            largest,
+            _external(region.free_blocks, largest),
+            dict(sorted(histogram.items())),
+        )
+
+    def room(self, is_real_time=False) -> int:
+        """Largest allocation that would succeed now."""
+        region = self.real_time_region if is_real_time else self.region
+        return region.free_blocks if self.compaction else region.largest
+
+    def find_contiguous_space(self, region, size): # busca por segmento contíguo de memória
+        if size < 1:
+            # segmentos vazios nunca são encontrados
+            return -1
+        return region.fit(size)
 
     def allocate(self, pid, size, is_real_time = False) -> typing.Tuple[int, typing.Optional[int]]:
         """Allocates memory for a process.
         Returns a tuple (status_code, offset).
         """
-        if is_real_time:
-            start = 0
-            end = 64
-        else:
-            start = 64
-            end = 1024
+        region = self.real_time_region if is_real_time else self.region
 
-        if size > (end - start):
+        if size > region.capacity:
             return 2, None
 
-        offset = self.find_contiguous_space(start, end, size)
+        handle = self.find_contiguous_space(region, size)
+
+        if handle == -1 and self.compaction and 0 < size <= region.free_blocks:
+            # há espaço suficiente, só não contíguo
+            self.compact(region, size, pid)
+            handle = region.fit(size)
+            if handle != -1:
+                self.rescued += 1
+
+        if handle == -1:
+            status_code, offset = 1, None
+            self.failed_allocations += 1
+        else:
+            status_code, offset = 0, region.take(handle, size)
+            self.memory.segments.setdefault(pid, []).append((offset, size)) # associa segmento a um PID
+            self.allocations += 1
+
+        free_blocks = region.free_blocks
+        if free_blocks:
+            self.fragmentation_sum += 1 - region.largest / free_blocks
+
+        return status_code, offset
 
-        if offset == -1:
-            return 1, None
+    def plan_compaction(self, region, size) -> typing.Tuple[int, int, int]:
+        """Cheapest window [start, end) of the region whose holes add up to
+        size blocks, as (start, end, blocks to move). Sliding the segments
+        of the window to its start leaves one hole at its end.
 
-        for i in range(offset, offset + size):
-            self.memory.blocks[i] = pid # associa bloco de memória a um PID
+        Every window starts and ends at a hole, and the segments inside it
+        all move, so the cost of the copy only grows with the window: for
+        each first hole the last one is the nearest with enough free space.
+        """
+        holes = region.holes()
+        free_before = [0, *accumulate(end - start for start, end in holes)]
+        best = None
+        j = 0
+        for i in range(len(holes)):
+            j = max(j, i)
+            while j < len(holes) and free_before[j + 1] - free_before[i] < size:
+                j += 1
+            if j == len(holes):
+                break
+            start, end = holes[i][0], holes[j][1]
+            moved = end - start - (free_before[j + 1] - free_before[i])
+            if best is None or moved < best[2]:
+                best = (start, end, moved)
+        return best
+
+    def compact(self, region, size, pid=None):
+        """Relocates the segments of the cheapest window of the region (see
+        plan_compaction) so that it holds a hole of at least size blocks.
+        Process pid, the one that needed room, waits for the copy: it
+        stalls that long once it runs, see execute.
+        """
+        start, end, moved = self.plan_compaction(region, size)
+        memory = self.memory
 
-        return 0, offset
+        inside = sorted(
+            (offset, seg_size, owner, k)
+            for owner, segments in memory.segments.items()
+            for k, (offset, seg_size) in enumerate(segments)
+            if start <= offset < end
+        )
+        position = start
+        for offset, seg_size, owner, k in inside:
+            memory.segments[owner][k] = (position, seg_size)
+            pcb = self.get_pcb(owner) if self.get_pcb is not None else None
+            if pcb is not None and pcb.memory_offset == offset:
+                pcb.memory_offset = position
+            position += seg_size
+
+        # os buracos da janela viram um só, no fim dela
+        region.relocate(start, end, position)
+
+        cost = -(-moved // self.compaction_rate)
+        self.compactions += 1
+        self.moved_blocks += moved
+        self.compaction_time += cost
+        if pid is not None and cost:
+            self.owed[pid] = self.owed.get(pid, 0) + cost
+
+    def execute(self, pcb: PCB, ran: int) -> int:
+        """Units of a slice of ran units in which pcb made progress, the
+        first ones going to the copy time it still owes.
+        """
+        owed = self.owed.pop(pcb.pid, 0)
+        if owed > ran:
+            self.owed[pcb.pid] = owed - ran
+        return max(ran - owed, 0)
 
     def free(self, pid): # libera memória do processo
-        for i in range(self.memory.total_blocks):
-            if self.memory.blocks[i] == pid:
-                self.memory.blocks[i] = None
+        self.owed.pop(pid, None)
+        for offset, size in self.memory.segments.pop(pid, ()):
+            region = self.real_time_region if offset < self.real_time_blocks else self.region
+            region.release(offset, size)
+
+    def state(self) -> list[list[int]]:
+        """What the segments do not tell about the free space, per region."""
+        return [self.real_time_region.state(), self.region.state()]
 
-MemoryManager = _MemoryManager()
+    def restore(self, segments: dict[int, list[tuple[int, int]]], state: list[list[int]] = ((), ())):
+        """Replaces the allocated segments, e.g. when loading a snapshot."""
+        self.memory.segments = segments
+        used = [segment for pid_segments in segments.values() for segment in pid_segments]
+        self.real_time_region.fill(
+            [segment for segment in used if segment[0] < self.real_time_blocks], state[0]
+        )
+        self.region.fill([segment for segment in used if segment[0] >= self.real_time_blocks], state[1])
@@ -0,0 +1,380 @@
+"""Paged memory.
+
+Instead of one contiguous segment, every process gets a page table of
+ceil(memory_needed / page_size) pages, loaded on demand into the frames of
+the user part of memory. When no frame is free a page replacement policy
+picks the one to evict, so processes larger than physical memory also run.
+Real time processes keep the reserved frames: all their pages are pinned
+when they are created, and they never fault.
+
+While a process runs it makes REFERENCES_PER_TICK memory references per
+unit of time, to pages near a locus that now and then jumps elsewhere.
+Every reference goes through a fully associative TLB (LRU, tagged by pid)
+before the page table; a page fault stalls the process for
+page_fault_cost units, in which it makes no progress.
+
+Every replacement policy has the same hooks, on user frame numbers:
+
+    loaded(frame)       a page was loaded in frame
+    referenced(frame)   the page in frame was referenced
+    removed(frame)      the page in frame was dropped, its process ended
+    victim()            the frame to evict, every frame being in use
+"""
+import math
+import random
+import typing
+from collections import OrderedDict
+
+from simple_os.process.pcb import PCB
+
+
+class FIFOReplacement:
+    """Evicts the page loaded first."""
+    name = "fifo"
+
+    def __init__(self, num_frames):
+        self.num_frames = num_frames
+        self.order: OrderedDict[int, None] = OrderedDict()
+        # set by the manager: virtual time of the process owning a frame
+        self.owner_time: typing.Callable[[int], int] = None
+
+    def loaded(self, frame):
+        self.order[frame] = None
+
+    def referenced(self, frame):
+        pass
+
+    def removed(self, frame):
+        del self.order[frame]
+
+    def victim(self) -> int:
+        return self.order.popitem(last=False)[0]
+
+    def state(self) -> list[list[int]]:
+        return [list(self.order)]
+
+    def restore(self, state):
+        self.order = OrderedDict.fromkeys(state[0])
+
+
+class LRUReplacement(FIFOReplacement):
+    """Evicts the page referenced longest ago."""
+    name = "lru"
+
+    def referenced(self, frame):
+        self.order.move_to_end(frame)
+
+
+class ClockReplacement(FIFOReplacement):
+    """Second chance: the hand goes around the frames clearing reference
+    bits, and evicts the first page whose bit was already clear.
+    """
+    name = "clock"
+
+    def __init__(self, num_frames):
+        super().__init__(num_frames)
+        self.referenced_bits = bytearray(num_frames)
+        self.hand = 0
+
+    def loaded(self, frame):
+        pass
+
+    def referenced(self, frame):
+        self.referenced_bits[frame] = 1
+
+    def removed(self, frame):
+        self.referenced_bits[frame] = 0
+
+    def victim(self) -> int:
+        bits = self.referenced_bits
+        while True:
+            frame = self.hand
+            self.hand = (frame + 1) % self.num_frames
+            if not bits[frame]:
+                return frame
+            bits[frame] = 0
+
+    def state(self) -> list[list[int]]:
+        return [list(self.referenced_bits), [self.hand]]
+
+    def restore(self, state):
+        bits, (self.hand,) = state
+        self.referenced_bits = bytearray(bits)
+
+
+class WorkingSetReplacement(ClockReplacement):
+    """WSClock: like clock, but only evicts pages out of the working set of
+    their process, the pages it referenced in its last WINDOW references.
+    When every page is in a working set, the one unused for longest.
+    """
+    name = "working_set"
+
+    WINDOW = 64
+
+    def __init__(self, num_frames):
+        super().__init__(num_frames)
+        # virtual time of the owner at the last reference of every frame
+        self.last_use = [0] * num_frames
+
+    def referenced(self, frame):
+        self.referenced_bits[frame] = 1
+        self.last_use[frame] = self.owner_time(frame)
+
+    def victim(self) -> int:
+        bits = self.referenced_bits
+        oldest, oldest_age = None, -1
+        for _ in range(2 * self.num_frames):
+            frame = self.hand
+            self.hand = (frame + 1) % self.num_frames
+            if bits[frame]:
+                bits[frame] = 0
+                continue
+            age = self.owner_time(frame) - self.last_use[frame]
+            if age > self.WINDOW:
+                return frame
+            if age > oldest_age:
+                oldest, oldest_age = frame, age
+        self.hand = (oldest + 1) % self.num_frames
+        return oldest
+
+    def state(self) -> list[list[int]]:
+        return super().state() + [self.last_use]
+
+    def restore(self, state):
+        super().restore(state[:2])
+        self.last_use = list(state[2])
+
+
+REPLACEMENT_POLICIES = {
+    policy.name: policy
+    for policy in (FIFOReplacement, LRUReplacement, ClockReplacement, WorkingSetReplacement)
+}
+
+
+class _PagedMemoryManager:
+    paged = True
+    # no holes with paging
+    mean_fragmentation = 0.0
+
+    REFERENCES_PER_TICK = 4
+    # references go to pages [locus, locus + LOCALITY), and the locus
+    # jumps to a random page with probability JUMP every unit of time
+    LOCALITY = 4
+    JUMP = 1 / 32
+    SEED = 0
+
+    def __init__(
+        self,
+        total_blocks=1024,
+        real_time_blocks=64,
+        page_size=16,
+        tlb_entries=16,
+        replacement="lru",
+        page_fault_cost=2,
+    ):
+        if replacement not in REPLACEMENT_POLICIES:
+            raise ValueError(f"Unknown page replacement policy: {replacement}")
+        self.page_size = page_size
+        self.tlb_entries = tlb_entries
+        self.page_fault_cost = page_fault_cost
+        self.real_time_frames = real_time_blocks // page_size
+        self.num_frames = (total_blocks - real_time_blocks) // page_size
+        self.replacement = REPLACEMENT_POLICIES[replacement](self.num_frames)
+        self.replacement.owner_time = self._owner_time
+        self.rng = random.Random(self.SEED)
+
+        # pid -> frame of every page, -1 when not loaded
+        self.page_tables: dict[int, list[int]] = {}
+        # frame -> (pid, page) loaded in it
+        self.frame_owner: list[typing.Optional[tuple[int, int]]] = [None] * self.num_frames
+        self.free_frames = list(range(self.num_frames - 1, -1, -1))
+        # real time pid -> frames pinned for it
+        self.pinned: dict[int, int] = {}
+        self.real_time_free = self.real_time_frames
+        # (pid, page) -> frame, least recently used first
+        self.tlb: OrderedDict[tuple[int, int], int] = OrderedDict()
+        # pid -> locus of its references, references made so far and
+        # stall time of its last faults not paid yet, past its last slice
+        self.locus: dict[int, int] = {}
+        self.virtual_time: dict[int, int] = {}
+        self.owed: dict[int, int] = {}
+
+        self.references = 0
+        self.tlb_hits = 0
+        self.page_faults = 0
+        self.evictions = 0
+        self.stall_time = 0
+        self.failed_allocations = 0
+
+    @property
+    def tlb_hit_rate(self) -> float:
+        return self.tlb_hits / self.references if self.references else 0.0
+
+    @property
+    def fault_rate(self) -> float:
+        return self.page_faults / self.references if self.references else 0.0
+
+    def room(self, is_real_time=False) -> float:
+        """Largest allocation that would succeed now: user processes never
+        wait for memory.
+        """
+        return self.real_time_free * self.page_size if is_real_time else math.inf
+
+    def _owner_time(self, frame) -> int:
+        return self.virtual_time[self.frame_owner[frame][0]]
+
+    def _pages(self, size) -> int:
+        return -(-size // self.page_size)
+
+    def allocate(self, pid, size, is_real_time = False) -> typing.Tuple[int, typing.Optional[int]]:
+        """Creates the page table of a process, or pins the pages of a real
+        time one. Same status codes as the contiguous allocation; the
+        offset is the start of the process's address space, always 0.
+        """
+        if pid in self.page_tables or pid in self.pinned:
+            # processes that blocked for another reason ask again
+            return 0, 0
+
+        pages = self._pages(size)
+        if is_real_time:
+            if pages > self.real_time_frames:
+                return 2, None
+            if pages > self.real_time_free:
+                self.failed_allocations += 1
+                return 1, None
+            self.real_time_free -= pages
+            self.pinned[pid] = pages
+            return 0, 0
+
+        if pages and not self.num_frames:
+            return 2, None
+        self.page_tables[pid] = [-1] * pages
+        self.locus[pid] = 0
+        self.virtual_time[pid] = 0
+        self.owed[pid] = 0
+        return 0, 0
+
+    def free(self, pid):
+        self.real_time_free += self.pinned.pop(pid, 0)
+        table = self.page_tables.pop(pid, None)
+        if table is None:
+            return
+        for page, frame in enumerate(table):
+            if frame != -1:
+                self.frame_owner[frame] = None
+                self.replacement.removed(frame)
+                self.free_frames.append(frame)
+                self.tlb.pop((pid, page), None)
+        del self.locus[pid]
+        del self.virtual_time[pid]
+        del self.owed[pid]
+
+    def _load(self, pid, page) -> int:
+        if self.free_frames:
+            frame = self.free_frames.pop()
+        else:
+            frame = self.replacement.victim()
+            owner, owner_page = self.frame_owner[frame]
+            self.page_tables[owner][owner_page] = -1
+            self.tlb.pop((owner, owner_page), None)
+            self.evictions += 1
+        self.frame_owner[frame] = (pid, page)
+        self.replacement.loaded(frame)
+        return frame
+
+    def _reference(self, pid, table, page) -> int:
+        # 1 on a page fault
+        self.references += 1
+        self.virtual_time[pid] += 1
+        tlb = self.tlb
+        key = (pid, page)
+        frame = tlb.get(key)
+        fault = 0
+        if frame is not None:
+            tlb.move_to_end(key)
+            self.tlb_hits += 1
+        else:
+            frame = table[page]
+            if frame == -1:
+                fault = 1
+                self.page_faults += 1
+                frame = table[page] = self._load(pid, page)
+            tlb[key] = frame
+            if len(tlb) > self.tlb_entries:
+                tlb.popitem(last=False)
+        self.replacement.referenced(frame)
+        return fault
+
+    def execute(self, pcb: PCB, ran: int) -> int:
+        """Makes the references of ran units of execution of pcb. Returns
+        the units in which it made progress, the others were stalled on
+        page faults.
+        """
+        pid = pcb.pid
+        table = self.page_tables.get(pid)
+        if not table:
+            # real time and empty processes never fault
+            return ran
+
+        rng = self.rng
+        pages = len(table)
+        locus = self.locus[pid]
+        progress = 0
+        used = self.owed[pid]
+        while used < ran:
+            if rng.random() < self.JUMP:
+                locus = rng.randrange(pages)
+            faults = 0
+            for _ in range(self.REFERENCES_PER_TICK):
+                faults += self._reference(pid, table, (locus + rng.randrange(self.LOCALITY)) % pages)
+            used += 1 + faults * self.page_fault_cost
+            progress += 1
+        self.locus[pid] = locus
+        self.owed[pid] = max(used - ran, 0)
+        self.stall_time += ran - progress
+        return progress
+
+    def state(self) -> list[list[int]]:
+        """The whole state as lists of ints, for snapshots."""
+        tables = []
+        for pid, table in self.page_tables.items():
+            tables += [pid, self.locus[pid], self.virtual_time[pid], self.owed[pid], len(table), *table]
+        return [
+            tables,
+            [x for item in self.pinned.items() for x in item],
+            self.free_frames,
+            [x for (pid, page), frame in self.tlb.items() for x in (pid, page, frame)],
+            list(self.rng.getstate()[1]),
+            [
+                self.references, self.tlb_hits, self.page_faults,
+                self.evictions, self.stall_time, self.failed_allocations,
+            ],
+            *self.replacement.state(),
+        ]
+
+    def restore(self, state: list[list[int]]):
+        tables, pinned, free_frames, tlb, rng_state, counters, *replacement = state
+        self.page_tables, self.locus, self.virtual_time, self.owed = {}, {}, {}, {}
+        self.frame_owner = [None] * self.num_frames
+        i = 0
+        while i < len(tables):
+            pid, locus, virtual_time, owed, pages = tables[i:i + 5]
+            table = tables[i + 5:i + 5 + pages]
+            i += 5 + pages
+            self.page_tables[pid] = table
+            self.locus[pid] = locus
+            self.virtual_time[pid] = virtual_time
+            self.owed[pid] = owed
+            for page, frame in enumerate(table):
+                if frame != -1:
+                    self.frame_owner[frame] = (pid, page)
+        self.pinned = dict(zip(pinned[::2], pinned[1::2]))
+        self.real_time_free = self.real_time_frames - sum(self.pinned.values())
+        self.free_frames = list(free_frames)
+        self.tlb = OrderedDict(((tlb[i], tlb[i + 1]), tlb[i + 2]) for i in range(0, len(tlb), 3))
+        self.rng.setstate((3, tuple(rng_state), None))
+        (
+            self.references, self.tlb_hits, self.page_faults,
+            self.evictions, self.stall_time, self.failed_allocations,
+        ) = counters
+        self.replacement.restore(replacement)
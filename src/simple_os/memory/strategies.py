@@ -0,0 +1,332 @@
+"""Contiguous memory allocation strategies.
+
+A strategy owns the free space of one memory region [start, end), and every
+one has the same hooks:
+
+    fit(size)             looks for room for size blocks: a handle, or -1
+                          when there is none
+    take(handle, size)    allocates size blocks there, returns the offset
+    release(offset, size) gives an allocated segment back
+
+Strategies over a hole list can also be compacted: relocate(start, end,
+position) tells that the segments of [start, end) were slid together to
+its start, up to position.
+
+Strategies over a hole list coalesce a released segment with the holes
+right before and after it; the buddy system merges buddies instead.
+`scanned` counts the holes (or buddy orders) examined by fit.
+
+For snapshots, fill(used, state) rebuilds the free space around the used
+(offset, size) segments; state() holds what the segments do not tell, as a
+list of ints.
+"""
+from bisect import bisect_left, bisect_right, insort
+import typing
+
+
+class FirstFit:
+    """The lowest hole large enough.
+
+    Holes are kept sorted by offset (starts, ends) and by (size, start), so
+    the largest hole is known without looking at any.
+    """
+    name = "first_fit"
+
+    def __init__(self, start, end):
+        self.start = start
+        self.end = end
+        # largest segment the region can ever hold
+        self.capacity = end - start
+        self.scanned = 0
+        self.fill([])
+
+    def fill(self, used: typing.Iterable[tuple[int, int]], state: list[int] = ()):
+        self.starts, self.ends = [], []
+        self.by_size = []
+        self.free_blocks = 0
+        position = self.start
+        for offset, size in sorted(used):
+            if offset > position:
+                self._insert(len(self.starts), position, offset)
+            position = offset + size
+        if position < self.end:
+            self._insert(len(self.starts), position, self.end)
+
+    def state(self) -> list[int]:
+        return []
+
+    def holes(self) -> list[tuple[int, int]]:
+        """Free extents as (start, end), by offset."""
+        return list(zip(self.starts, self.ends))
+
+    @property
+    def largest(self) -> int:
+        return self.by_size[-1][0] if self.by_size else 0
+
+    def _insert(self, i, start, end):
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+        insort(self.by_size, (end - start, start))
+        self.free_blocks += end - start
+
+    def _delete(self, i):
+        start, end = self.starts.pop(i), self.ends.pop(i)
+        del self.by_size[bisect_left(self.by_size, (end - start, start))]
+        self.free_blocks -= end - start
+
+    def _shrink(self, i, size):
+        # hole i loses its first size blocks
+        start, end = self.starts[i], self.ends[i]
+        by_size = self.by_size
+        del by_size[bisect_left(by_size, (end - start, start))]
+        insort(by_size, (end - start - size, start + size))
+        self.starts[i] = start + size
+        self.free_blocks -= size
+
+    def _index(self, start) -> int:
+        return bisect_left(self.starts, start)
+
+    def relocate(self, start, end, position):
+        """The holes of [start, end) become one, [position, end)."""
+        i = self._index(start)
+        while i < len(self.starts) and self.starts[i] < end:
+            self._delete(i)
+        self._insert(i, position, end)
+
+    def fit(self, size) -> int:
+        if self.largest < size:
+            return -1
+        for i, (start, end) in enumerate(zip(self.starts, self.ends)):
+            if end - start >= size:
+                self.scanned += i + 1
+                return i
+
+    def take(self, i, size) -> int:
+        start = self.starts[i]
+        if self.ends[i] - start == size:
+            self._delete(i)
+        else:
+            self._shrink(i, size)
+        return start
+
+    def release(self, offset, size):
+        end = offset + size
+        i = bisect_right(self.starts, offset) # primeiro buraco depois do segmento
+        if i < len(self.starts) and self.starts[i] == end:
+            end = self.ends[i]
+            self._delete(i)
+        if i > 0 and self.ends[i - 1] == offset:
+            i -= 1
+            offset = self.starts[i]
+            self._delete(i)
+        self._insert(i, offset, end)
+
+
+class BestFit(FirstFit):
+    """The smallest hole large enough, the lowest one among equals."""
+    name = "best_fit"
+
+    def fit(self, size) -> int:
+        j = bisect_left(self.by_size, (size, self.start))
+        if j == len(self.by_size):
+            return -1
+        self.scanned += 1
+        return self._index(self.by_size[j][1])
+
+
+class WorstFit(FirstFit):
+    """The largest hole, the lowest one among equals."""
+    name = "worst_fit"
+
+    def fit(self, size) -> int:
+        largest = self.largest
+        if largest < size:
+            return -1
+        self.scanned += 1
+        return self._index(self.by_size[bisect_left(self.by_size, (largest, self.start))][1])
+
+
+class NextFit(FirstFit):
+    """First fit starting from where the last allocation ended, wrapping
+    around at the end of the region.
+    """
+    name = "next_fit"
+
+    def fill(self, used, state=()):
+        super().fill(used)
+        self.rover = state[0] if state else self.start
+
+    def state(self) -> list[int]:
+        return [self.rover]
+
+    def fit(self, size) -> int:
+        if self.largest < size:
+            return -1
+        starts, ends = self.starts, self.ends
+        # the hole holding the rover, or the first one after it
+        first = bisect_right(starts, self.rover) - 1
+        if first < 0 or ends[first] <= self.rover:
+            first += 1
+        n = len(starts)
+        for k in range(n):
+            i = (first + k) % n
+            if ends[i] - starts[i] >= size:
+                self.scanned += k + 1
+                return i
+
+    def take(self, i, size) -> int:
+        offset = super().take(i, size)
+        self.rover = offset + size
+        return offset
+
+
+class SegregatedFit(FirstFit):
+    """Holes are also kept in size classes, class k holding the holes of
+    [2**k, 2**(k+1)) blocks. A request is served by the lowest fitting hole
+    of its own class, or else by the lowest hole of the next non empty
+    larger class, every hole of which fits.
+    """
+    name = "segregated"
+
+    def fill(self, used, state=()):
+        # class -> starts of its holes, sorted
+        self.classes: dict[int, list[int]] = {}
+        super().fill(used)
+
+    def _insert(self, i, start, end):
+        super()._insert(i, start, end)
+        insort(self.classes.setdefault((end - start).bit_length() - 1, []), start)
+
+    def _delete(self, i):
+        starts = self.classes[(self.ends[i] - self.starts[i]).bit_length() - 1]
+        del starts[bisect_left(starts, self.starts[i])]
+        super()._delete(i)
+
+    def _shrink(self, i, size):
+        # the hole may change class
+        start, end = self.starts[i], self.ends[i]
+        self._delete(i)
+        self._insert(i, start + size, end)
+
+    def fit(self, size) -> int:
+        if self.largest < size:
+            return -1
+        own_class = size.bit_length() - 1
+        for start in self.classes.get(own_class, ()):
+            self.scanned += 1
+            i = self._index(start)
+            if self.ends[i] - start >= size:
+                return i
+        for k in range(own_class + 1, self.largest.bit_length()):
+            starts = self.classes.get(k)
+            if starts:
+                self.scanned += 1
+                return self._index(starts[0])
+
+
+def _order(size) -> int:
+    # smallest k with 2**k >= size
+    return (size - 1).bit_length()
+
+
+class BuddySystem:
+    """Blocks of power of two sizes, split in halves on demand and merged
+    back with their buddy when both are free. The region is first cut in
+    the largest power of two blocks that fit in it, one after the other.
+    """
+    name = "buddy"
+
+    def __init__(self, start, end):
+        self.start = start
+        self.end = end
+        self.chunks = []
+        position = start
+        while position < end:
+            order = (end - position).bit_length() - 1
+            self.chunks.append((position, order))
+            position += 1 << order
+        max_order = max((order for _, order in self.chunks), default=-1)
+        self.capacity = 1 << max_order if self.chunks else 0
+        self.scanned = 0
+        self.fill([])
+
+    def fill(self, used: typing.Iterable[tuple[int, int]], state: list[int] = ()):
+        # order -> offsets of its free blocks, sorted
+        self.free = [[] for _ in range(self.capacity.bit_length())]
+        self.free_blocks = 0
+        for offset, order in self.chunks:
+            self.free[order].append(offset)
+            self.free_blocks += 1 << order
+        for offset, size in used:
+            self._reserve(offset, _order(size))
+
+    def _reserve(self, offset, order):
+        # splits the free block holding offset down to the given order
+        k = order
+        while True:
+            blocks = self.free[k]
+            j = bisect_right(blocks, offset) - 1
+            if j >= 0 and offset < blocks[j] + (1 << k):
+                break
+            k += 1
+        block = blocks.pop(j)
+        while k > order:
+            k -= 1
+            half = block + (1 << k)
+            if offset >= half:
+                insort(self.free[k], block)
+                block = half
+            else:
+                insort(self.free[k], half)
+        self.free_blocks -= 1 << order
+
+    def state(self) -> list[int]:
+        return []
+
+    def holes(self) -> list[tuple[int, int]]:
+        return sorted(
+            (offset, offset + (1 << k)) for k, blocks in enumerate(self.free) for offset in blocks
+        )
+
+    @property
+    def largest(self) -> int:
+        for k in range(len(self.free) - 1, -1, -1):
+            if self.free[k]:
+                return 1 << k
+        return 0
+
+    def fit(self, size) -> int:
+        for k in range(_order(size), len(self.free)):
+            self.scanned += 1
+            if self.free[k]:
+                return k
+        return -1
+
+    def take(self, k, size) -> int:
+        order = _order(size)
+        offset = self.free[k].pop(0)
+        while k > order:
+            k -= 1
+            insort(self.free[k], offset + (1 << k))
+        self.free_blocks -= 1 << order
+        return offset
+
+    def release(self, offset, size):
+        k = _order(size)
+        self.free_blocks += 1 << k
+        while k < len(self.free) - 1:
+            buddy = self.start + ((offset - self.start) ^ (1 << k))
+            blocks = self.free[k]
+            j = bisect_left(blocks, buddy)
+            if j == len(blocks) or blocks[j] != buddy:
+                break
+            del blocks[j]
+            offset = min(offset, buddy)
+            k += 1
+        insort(self.free[k], offset)
+
+
+STRATEGIES = {
+    strategy.name: strategy
+    for strategy in (FirstFit, BestFit, WorstFit, NextFit, BuddySystem, SegregatedFit)
+}
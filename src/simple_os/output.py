@@ -0,0 +1,238 @@
+"""Output of the simulator.
+
+Every subsystem reports what it does by emitting an OutputEvent with its
+fields to an EventSink, instead of printing. The sink decides what to do with
+it: print today's human readable text, write JSON lines, only count, or
+nothing at all.
+"""
+import json
+import sys
+import typing
+from abc import ABC, abstractmethod
+from enum import Enum, IntEnum
+
+
+class OutputEvent(IntEnum):
+    MESSAGE = 0
+    DISPATCH = 1
+    EXECUTE = 2
+    INSTRUCTIONS = 3
+    EXIT = 4
+    QUANTUM_EXPIRED = 5
+    PREEMPTED = 6
+    KILL = 7
+    BLOCK = 8
+    UNBLOCK = 9
+    FS_CREATE = 10
+    FS_DELETE = 11
+    FS_FAIL = 12
+
+
+# order of the fields each event is emitted with
+EVENT_FIELDS: dict[OutputEvent, tuple[str, ...]] = {
+    OutputEvent.MESSAGE: ("text",),
+    OutputEvent.DISPATCH: (
+        "pid",
+        "offset",
+        "blocks",
+        "priority",
+        "starting_priority",
+        "allocated_time",
+        "time_left",
+        "scanners",
+        "printers",
+        "modems",
+        "sata",
+    ),
+    OutputEvent.EXECUTE: ("pid", "started"),
+    # instructions first_pc .. first_pc + count - 1 were executed
+    OutputEvent.INSTRUCTIONS: ("pid", "first_pc", "count"),
+    OutputEvent.EXIT: ("pid",),
+    OutputEvent.QUANTUM_EXPIRED: ("pid",),
+    OutputEvent.PREEMPTED: ("pid",),
+    OutputEvent.KILL: ("pid", "reason"),
+    OutputEvent.BLOCK: ("pid", "reason"),
+    OutputEvent.UNBLOCK: ("pid",),
+    OutputEvent.FS_CREATE: ("pid", "file_name", "file_id", "start", "size"),
+    OutputEvent.FS_DELETE: ("pid", "file_id", "file_name"),
+    OutputEvent.FS_FAIL: ("pid", "text"),
+}
+
+
+class EventSink(ABC):
+    # producers may skip building expensive events when the sink is disabled
+    enabled = True
+
+    @abstractmethod
+    def emit(self, event: OutputEvent, *fields):
+        ...
+
+    def close(self):
+        pass
+
+
+class NullSink(EventSink):
+    """Drops everything. Meant for benchmark runs."""
+    enabled = False
+
+    def emit(self, event: OutputEvent, *fields):
+        pass
+
+
+def format_event(event: OutputEvent, fields: tuple) -> typing.Optional[str]:
+    """Human readable text of an event, None for events with no text."""
+    if event == OutputEvent.MESSAGE:
+        return fields[0]
+
+    if event == OutputEvent.DISPATCH:
+        (pid, offset, blocks, priority, starting_priority, allocated_time,
+         time_left, scanners, printers, modems, sata) = fields
+        return f"""
+dispatcher =>
+    PID: {pid}
+    offset: {offset}
+    blocks: {blocks}
+    priority: {priority}
+    starting_priority: {starting_priority}
+    allocated_time: {allocated_time}
+    time_left: {time_left}
+    scanners: {scanners}
+    printers: {printers}
+    modems: {modems}
+    sata: {sata}"""
+
+    if event == OutputEvent.EXECUTE:
+        pid, started = fields
+        if started:
+            return f"\nprocess {pid} =>\nP{pid} STARTED"
+        return f"\nprocess {pid} =>"
+
+    if event == OutputEvent.INSTRUCTIONS:
+        pid, first_pc, count = fields
+        return "\n".join(
+            f"P{pid} instruction {pc}" for pc in range(first_pc, first_pc + count)
+        ) if count else None
+
+    if event == OutputEvent.EXIT:
+        return f"P{fields[0]} return SIGINT"
+
+    if event == OutputEvent.QUANTUM_EXPIRED:
+        return f"P{fields[0]} used its quantum"
+
+    if event == OutputEvent.PREEMPTED:
+        return f"P{fields[0]} interrupted"
+
+    if event == OutputEvent.KILL:
+        pid, reason = fields
+        return f"P{pid} terminated for {reason}"
+
+    if event == OutputEvent.FS_CREATE:
+        pid, file_name, file_id, start, size = fields
+        return (f"Success: File '{file_name}' (ID: {file_id}) created "
+                f"by process P{pid}\n"
+                f"  Allocated blocks: {start} to {start + size - 1} "
+                f"({size} blocks)")
+
+    if event == OutputEvent.FS_DELETE:
+        pid, file_id, file_name = fields
+        return (f"Success: File '{file_id}' ('{file_name}') deleted "
+                f"by process P{pid}")
+
+    if event == OutputEvent.FS_FAIL:
+        return fields[1]
+
+    # BLOCK, UNBLOCK: not part of the text output
+    return None
+
+
+class TextSink(EventSink):
+    """Today's human readable output."""
+
+    def __init__(self, out: typing.TextIO = None):
+        self.out = out
+
+    def emit(self, event: OutputEvent, *fields):
+        text = format_event(event, fields)
+        if text is not None:
+            print(text, file=self.out if self.out is not None else sys.stdout)
+
+
+def _json_value(value):
+    if isinstance(value, Enum):
+        return value.name
+    return value
+
+
+class JsonlSink(EventSink):
+    """One JSON object per event, written in batches."""
+
+    def __init__(self, out: typing.TextIO = None, buffer_size: int = 4096):
+        self.out = out if out is not None else sys.stdout
+        self.buffer_size = buffer_size
+        self._buffer: list[str] = []
+
+    def emit(self, event: OutputEvent, *fields):
+        record = {"event": event.name.lower()}
+        for name, value in zip(EVENT_FIELDS[event], fields):
+            record[name] = _json_value(value)
+        self._buffer.append(json.dumps(record))
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self.out.write("\n".join(self._buffer))
+            self.out.write("\n")
+            self._buffer.clear()
+        self.out.flush()
+
+    def close(self):
+        self.flush()
+
+
+class CountingSink(EventSink):
+    """Only counts events. Executed instructions are counted one by one."""
+
+    def __init__(self, out: typing.TextIO = None):
+        self.out = out if out is not None else sys.stdout
+        self.counts = [0] * len(OutputEvent)
+
+    def emit(self, event: OutputEvent, *fields):
+        if event == OutputEvent.INSTRUCTIONS:
+            self.counts[event] += fields[2]
+        else:
+            self.counts[event] += 1
+
+    def summary(self) -> dict[str, int]:
+        return {event.name.lower(): self.counts[event] for event in OutputEvent}
+
+    def close(self):
+        for name, count in self.summary().items():
+            self.out.write(f"{name}: {count}\n")
+        self.out.flush()
+
+
+SINKS = {
+    "text": TextSink,
+    "quiet": NullSink,
+    "jsonl": JsonlSink,
+    "count": CountingSink,
+}
+
+
+# "trace" writes the binary format of simple_os.trace
+OUTPUT_MODES = (*SINKS, "trace")
+
+
+def make_sink(name: str, out: typing.IO = None) -> EventSink:
+    if name == "trace":
+        # imported here since the trace module depends on this one
+        from simple_os.trace import TraceSink
+        if out is None:
+            out = sys.stdout.buffer
+        return TraceSink(out)
+    if name not in SINKS:
+        raise ValueError(f"Unknown output mode: {name}")
+    if name == "quiet":
+        return NullSink()
+    return SINKS[name](out)
@@ -1,5 +1,5 @@
 import typing
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum, auto
 
 class ProcState(Enum):
@@ -13,9 +13,11 @@ class ProcBlockedReason(Enum):
     WAITING_FOR_MEM = auto()
     TOO_LARGE_MEM_REQUEST = auto()
     WAITING_FOR_IO = auto()
+    DEADLOCK = auto()
     # ...
 
-@dataclass
+# slots: no per-instance __dict__, smaller PCBs and faster attribute access
+@dataclass(slots=True)
 class PCB:
     # generic properties
     pid: int
@@ -33,18 +35,19 @@ class PCB:
     state: ProcState
     blocked_reason: typing.Optional[ProcBlockedReason]
     pc: int
-    # i/o status
+    # i/o status, fixed once the process is created
     using_scanner: bool
     requested_printer: int
     using_modem: bool
     requested_sata: int
+    # whether any device was requested, computed once instead of on every
+    # resource check
+    using_io: bool = field(init=False)
 
-    @property
-    def using_io(self):
-        return (
+    def __post_init__(self):
+        self.using_io = bool(
             self.using_scanner
             or self.using_modem
             or self.requested_printer
             or self.requested_sata
         )
-
@@ -0,0 +1,645 @@
+"""Scheduling policies.
+
+A policy decides in which order, and for how long, the ready processes it
+holds run. Every core of the scheduler has two of them: one for the real
+time level 0, always served first and never preempted, and one for the user
+levels 1..n-1. Every policy has the same hooks:
+
+    enqueue(pcb)       a process became ready
+    pick_next()        takes out the next process: (exec_time, pcb) or None
+    requeue(pcb, ran)  the picked process ran for ran units, it goes back
+                       to the ready processes unless it finished
+    age(t)             t more units of CPU time were executed
+    steal(can_move)    takes out a ready process for another core, if the
+                       one at the back of the policy can move there
+
+Every hook is O(log n) or better in the number of ready processes, so the
+choice of policy does not change the cost of a simulation.
+
+For snapshots, state() returns the whole state of a policy as lists of ints
+and restore() rebuilds it.
+"""
+import heapq
+import random
+import typing
+from abc import ABC, abstractmethod
+from collections import deque
+
+from simple_os.process.pcb import PCB
+
+
+def _flatten(entries) -> list[int]:
+    return [x for entry in entries for x in entry]
+
+
+def _unflatten(values: list[int], size: int) -> list[tuple[int, ...]]:
+    return [tuple(values[i:i + size]) for i in range(0, len(values), size)]
+
+
+class SchedulingPolicy(ABC):
+    name: str = None
+
+    def __init__(self, quantum_table: dict[int, typing.Optional[int]]):
+        self.quantum_table = quantum_table
+        self.num_queues = max(quantum_table) + 1
+        # pid -> PCB, set by the scheduler
+        self.get_pcb: typing.Callable[[int], PCB] = None
+        # processes promoted by aging
+        self.promotions = 0
+
+    @abstractmethod
+    def enqueue(self, pcb: PCB):
+        ...
+
+    @abstractmethod
+    def pick_next(self) -> typing.Optional[tuple[int, PCB]]:
+        ...
+
+    @abstractmethod
+    def requeue(self, pcb: PCB, ran: int):
+        ...
+
+    def age(self, t: int):
+        pass
+
+    @abstractmethod
+    def steal(self, can_move: typing.Callable[[int], bool]) -> typing.Optional[PCB]:
+        ...
+
+    @abstractmethod
+    def state(self) -> list[list[int]]:
+        ...
+
+    @abstractmethod
+    def restore(self, state: list[list[int]]):
+        ...
+
+    def tickets(self, prio: int) -> int:
+        """Share of the CPU of a level for the proportional share policies,
+        the highest user level gets num_queues - 1 times the lowest's.
+        """
+        return 100 * (self.num_queues - prio)
+
+
+# Real time
+
+class FIFOPolicy(SchedulingPolicy):
+    """First come, first served, every process runs to completion."""
+
+    name = "fifo"
+
+    def __init__(self, quantum_table):
+        super().__init__(quantum_table)
+        self.queue: deque[int] = deque()
+
+    def enqueue(self, pcb: PCB):
+        self.queue.append(pcb.pid)
+
+    def pick_next(self):
+        if not self.queue:
+            return None
+        pcb = self.get_pcb(self.queue.popleft())
+        return pcb.time_left, pcb  # sem preempção
+
+    def requeue(self, pcb: PCB, ran: int):
+        if pcb.time_left > 0:
+            self.queue.append(pcb.pid)
+
+    def steal(self, can_move):
+        # from the back, the process that would wait the longest here
+        if not self.queue or not can_move(self.queue[-1]):
+            return None
+        return self.get_pcb(self.queue.pop())
+
+    def state(self):
+        return [list(self.queue)]
+
+    def restore(self, state):
+        self.queue = deque(state[0])
+
+
+class EDFPolicy(SchedulingPolicy):
+    """Earliest deadline first, every process runs to completion.
+
+    A process is due time_needed after it became ready, measured on a clock
+    advanced by the executed CPU time (the scheduler does not see the wall
+    clock, and it only differs while the CPU idles with nothing ready).
+    """
+
+    name = "edf"
+
+    def __init__(self, quantum_table):
+        super().__init__(quantum_table)
+        self.clock = 0
+        # (deadline, seq, pid), seq keeps equal deadlines in arrival order
+        self.heap: list[tuple[int, int, int]] = []
+        self._seq = 0
+        # deadlines of the picked processes until they are requeued
+        self.picked: dict[int, int] = {}
+
+    def _push(self, pid: int, deadline: int):
+        heapq.heappush(self.heap, (deadline, self._seq, pid))
+        self._seq += 1
+
+    def enqueue(self, pcb: PCB):
+        self._push(pcb.pid, self.clock + pcb.time_needed)
+
+    def pick_next(self):
+        if not self.heap:
+            return None
+        deadline, _, pid = heapq.heappop(self.heap)
+        self.picked[pid] = deadline
+        pcb = self.get_pcb(pid)
+        return pcb.time_left, pcb
+
+    def requeue(self, pcb: PCB, ran: int):
+        deadline = self.picked.pop(pcb.pid)
+        if pcb.time_left > 0:
+            self._push(pcb.pid, deadline)
+
+    def age(self, t: int):
+        self.clock += t
+
+    def steal(self, can_move):
+        # the last entry of a heap is a leaf, a late deadline that can be
+        # taken out without breaking the heap
+        if not self.heap or not can_move(self.heap[-1][2]):
+            return None
+        return self.get_pcb(self.heap.pop()[2])
+
+    def state(self):
+        return [_flatten(self.heap), _flatten(self.picked.items()), [self.clock, self._seq]]
+
+    def restore(self, state):
+        # saved in heap order, which is still a valid heap
+        self.heap = _unflatten(state[0], 3)
+        self.picked = dict(_unflatten(state[1], 2))
+        self.clock, self._seq = state[2]
+
+
+# User levels
+
+class MLFQPolicy(SchedulingPolicy):
+    """Multilevel feedback queue: one FIFO queue per level with the quantum
+    of the level, demotion after every slice and promotion by aging.
+    """
+
+    name = "mlfq"
+
+    # waiting time after which a process is promoted one level
+    AGING_THRESHOLD = 20
+    # stale queue entries tolerated before a queue is compacted
+    _MIN_STALE = 32
+
+    def __init__(self, quantum_table):
+        super().__init__(quantum_table)
+        # the queues keep (seq, pid) entries in arrival order, indexed by
+        # level (level 0 belongs to the real time policy and stays empty).
+        # An entry is live while queue_seq[pid] == seq; entries of promoted
+        # processes go stale in place and are skipped when reached.
+        self.queues: list[deque[tuple[int, int]]] = [deque() for _ in range(self.num_queues)]
+        self.queue_seq: dict[int, int] = {}
+        self.num_ready = [0] * self.num_queues
+        self.num_stale = [0] * self.num_queues
+        self._seq = 0
+        # bit p is set while level p has a ready process
+        self.ready_levels = 0
+
+        # for aging. The aging clock advances by every executed slice; a
+        # process waits aging_clock - enqueued_at[pid] and is promoted once
+        # that reaches AGING_THRESHOLD. Promotions are found lazily in a
+        # heap of (deadline, priority, seq, pid) instead of by rescanning
+        # the queues.
+        self.aging_clock = 0
+        self.enqueued_at: dict[int, int] = {}
+        self.deadlines: list[tuple[int, int, int, int]] = []
+
+    def _enqueue(self, pid: int, prio: int, enqueued_at: int = None):
+        if enqueued_at is None:
+            enqueued_at = self.aging_clock
+        seq = self._seq
+        self._seq += 1
+        self.queues[prio].append((seq, pid))
+        self.queue_seq[pid] = seq
+        self.num_ready[prio] += 1
+        self.ready_levels |= 1 << prio
+        self.enqueued_at[pid] = enqueued_at
+        # levels 0 and 1 do not age
+        if prio >= 2:
+            heapq.heappush(self.deadlines, (enqueued_at + self.AGING_THRESHOLD, prio, seq, pid))
+
+    def _unqueue(self, pid: int, prio: int):
+        """Takes a process out of its queue, leaving a stale entry behind."""
+        del self.queue_seq[pid]
+        del self.enqueued_at[pid]
+        self.num_ready[prio] -= 1
+        if not self.num_ready[prio]:
+            self.ready_levels &= ~(1 << prio)
+
+        self.num_stale[prio] += 1
+        if self.num_stale[prio] > max(self._MIN_STALE, self.num_ready[prio]):
+            queue_seq = self.queue_seq
+            self.queues[prio] = deque(
+                entry for entry in self.queues[prio] if queue_seq.get(entry[1]) == entry[0]
+            )
+            self.num_stale[prio] = 0
+
+    def ready_pids(self, prio: int) -> list[int]:
+        """Ready processes of a level, in dispatch order."""
+        queue_seq = self.queue_seq
+        return [pid for seq, pid in self.queues[prio] if queue_seq.get(pid) == seq]
+
+    def waiting_time(self, pid: int) -> int:
+        return self.aging_clock - self.enqueued_at[pid]
+
+    def enqueue(self, pcb: PCB):
+        self._enqueue(pcb.pid, pcb.priority)
+
+    def pick_next(self):
+        ready_levels = self.ready_levels
+        if not ready_levels:
+            return None
+
+        # lowest set bit: highest priority level with a ready process
+        prio = (ready_levels & -ready_levels).bit_length() - 1
+        queue = self.queues[prio]
+        queue_seq = self.queue_seq
+        seq, pid = queue.popleft()
+        while queue_seq.get(pid) != seq:
+            self.num_stale[prio] -= 1
+            seq, pid = queue.popleft()
+
+        del queue_seq[pid]
+        del self.enqueued_at[pid]
+        self.num_ready[prio] -= 1
+        if not self.num_ready[prio]:
+            self.ready_levels = ready_levels & ~(1 << prio)
+
+        pcb = self.get_pcb(pid)
+        return min(self.quantum_table[prio], pcb.time_left), pcb
+
+    def requeue(self, pcb: PCB, ran: int):
+        """
+        Chamado depois que o PCB executou por um quantum.
+        Só realimenta se ainda não terminou.
+        """
+        if pcb.time_left <= 0:
+            return
+
+        if pcb.priority < self.num_queues - 1:
+            pcb.priority += 1
+
+        self.enqueue(pcb)
+
+    def steal(self, can_move):
+        if not self.ready_levels:
+            return None
+
+        # back of the lowest priority level with a ready process
+        prio = self.ready_levels.bit_length() - 1
+        queue = self.queues[prio]
+        queue_seq = self.queue_seq
+        while queue_seq.get(queue[-1][1]) != queue[-1][0]:
+            queue.pop()
+            self.num_stale[prio] -= 1
+        pid = queue[-1][1]
+        if not can_move(pid):
+            return None
+
+        queue.pop()
+        del queue_seq[pid]
+        del self.enqueued_at[pid]
+        self.num_ready[prio] -= 1
+        if not self.num_ready[prio]:
+            self.ready_levels &= ~(1 << prio)
+        return self.get_pcb(pid)
+
+    def age(self, t: int):
+        """Makes processes higher priority depending on waiting time.
+        This prevents starvation.
+        """
+        self.aging_clock += t
+        clock = self.aging_clock
+        deadlines = self.deadlines
+        if not deadlines or deadlines[0][0] > clock:
+            return
+
+        due = []
+        while deadlines and deadlines[0][0] <= clock:
+            entry = heapq.heappop(deadlines)
+            _, prio, seq, pid = entry
+            # dispatched or promoted since the deadline was set
+            if self.queue_seq.get(pid) == seq:
+                due.append(entry)
+
+        # same order as scanning the queues from level 2 down: by level,
+        # then by position in the queue
+        due.sort(key=lambda entry: (entry[1], entry[2]))
+        for _, prio, _, pid in due:
+            self._unqueue(pid, prio)
+            pcb = self.get_pcb(pid)
+            pcb.priority -= 1
+            self._enqueue(pid, prio - 1)
+            self.promotions += 1
+
+    def state(self):
+        return [
+            *(self.ready_pids(prio) for prio in range(self.num_queues)),
+            _flatten(self.enqueued_at.items()),
+            [self.aging_clock, self.promotions],
+        ]
+
+    def restore(self, state):
+        *queues, enqueued_at, (aging_clock, promotions) = state
+        if len(queues) != self.num_queues:
+            raise ValueError("The ready queues do not match the priority levels")
+        enqueued_at = dict(_unflatten(enqueued_at, 2))
+
+        self.queues = [deque() for _ in range(self.num_queues)]
+        self.queue_seq = {}
+        self.num_ready = [0] * self.num_queues
+        self.num_stale = [0] * self.num_queues
+        self.ready_levels = 0
+        self.enqueued_at = {}
+        self.deadlines = []
+        self.aging_clock = aging_clock
+        self.promotions = promotions
+        for prio, pids in enumerate(queues):
+            for pid in pids:
+                self._enqueue(pid, prio, enqueued_at[pid])
+
+
+class CFSPolicy(SchedulingPolicy):
+    """Completely fair scheduling: the process that ran the least virtual
+    time runs next, for its weighted share of TARGET_LATENCY.
+
+    Virtual time grows slower for higher priorities (every level weighs
+    1.25 times the one below, as the nice levels of Linux). The tree of
+    virtual runtimes is a heap, which is all that picking the leftmost
+    process needs. Priorities never change and the quantum table is not
+    used.
+    """
+
+    name = "cfs"
+
+    TARGET_LATENCY = 24
+    MIN_GRANULARITY = 2
+    # virtual time units of one time unit at level 1
+    VIRTUAL_UNIT = 1 << 20
+
+    def __init__(self, quantum_table):
+        super().__init__(quantum_table)
+        self.weights = [round(1024 / 1.25 ** (prio - 1)) or 1 for prio in range(self.num_queues)]
+        # virtual time of one time unit at each level, integral so that the
+        # runtimes are exact and fit in a snapshot
+        self.scale = [self.VIRTUAL_UNIT * self.weights[1] // weight for weight in self.weights]
+
+        # (vruntime, seq, pid), seq keeps equal runtimes in arrival order
+        self.tree: list[tuple[int, int, int]] = []
+        self._seq = 0
+        # virtual runtimes of the picked processes until they are requeued
+        self.picked: dict[int, int] = {}
+        # never decreases, new processes start there so they cannot
+        # monopolize the CPU to catch up
+        self.min_vruntime = 0
+        self.total_weight = 0
+
+    def _push(self, pcb: PCB, vruntime: int):
+        heapq.heappush(self.tree, (vruntime, self._seq, pcb.pid))
+        self._seq += 1
+        self.total_weight += self.weights[pcb.priority]
+
+    def enqueue(self, pcb: PCB):
+        self._push(pcb, self.min_vruntime)
+
+    def pick_next(self):
+        if not self.tree:
+            return None
+        vruntime, _, pid = heapq.heappop(self.tree)
+        pcb = self.get_pcb(pid)
+        weight = self.weights[pcb.priority]
+        exec_time = max(self.MIN_GRANULARITY, self.TARGET_LATENCY * weight // self.total_weight)
+
+        self.total_weight -= weight
+        self.picked[pid] = vruntime
+        if vruntime > self.min_vruntime:
+            self.min_vruntime = vruntime
+        return min(exec_time, pcb.time_left), pcb
+
+    def requeue(self, pcb: PCB, ran: int):
+        vruntime = self.picked.pop(pcb.pid) + ran * self.scale[pcb.priority]
+        if pcb.time_left > 0:
+            self._push(pcb, vruntime)
+            # the least runtime of the ready processes
+            self.min_vruntime = max(self.min_vruntime, self.tree[0][0])
+
+    def steal(self, can_move):
+        # a leaf of the heap, which has run more than most
+        if not self.tree or not can_move(self.tree[-1][2]):
+            return None
+        pcb = self.get_pcb(self.tree.pop()[2])
+        self.total_weight -= self.weights[pcb.priority]
+        return pcb
+
+    def state(self):
+        return [
+            _flatten(self.tree),
+            _flatten(self.picked.items()),
+            [self.min_vruntime, self._seq],
+        ]
+
+    def restore(self, state):
+        # saved in heap order, which is still a valid heap
+        self.tree = _unflatten(state[0], 3)
+        self.picked = dict(_unflatten(state[1], 2))
+        self.min_vruntime, self._seq = state[2]
+        self.total_weight = sum(self.weights[self.get_pcb(pid).priority] for _, _, pid in self.tree)
+
+
+class LotteryPolicy(SchedulingPolicy):
+    """Lottery scheduling: every ready process holds the tickets of its
+    level and a random ticket picks the next one, which runs for the
+    quantum of its level.
+
+    The tickets live in a Fenwick tree over slots, so drawing, adding and
+    removing a process are O(log n). Priorities never change.
+    """
+
+    name = "lottery"
+
+    SEED = 0
+
+    def __init__(self, quantum_table):
+        super().__init__(quantum_table)
+        self.rng = random.Random(self.SEED)
+        # slot -> pid (None when free) and tickets of the slot
+        self.slots: list[typing.Optional[int]] = []
+        self.slot_tickets: list[int] = []
+        self.free_slots: list[int] = []
+        # fenwick[i] holds the tickets of the slots (i - lowbit(i), i]
+        self.fenwick = [0]
+        self.total_tickets = 0
+
+    def _add(self, slot: int, delta: int):
+        fenwick = self.fenwick
+        size = len(fenwick)
+        i = slot + 1
+        while i < size:
+            fenwick[i] += delta
+            i += i & -i
+        self.slot_tickets[slot] += delta
+        self.total_tickets += delta
+
+    def _grow(self):
+        size = max(16, 2 * len(self.slots))
+        self.free_slots.extend(range(size - 1, len(self.slots) - 1, -1))
+        self.slots.extend([None] * (size - len(self.slots)))
+        self.slot_tickets.extend([0] * (size - len(self.slot_tickets)))
+
+        # O(n) rebuild
+        fenwick = [0] + self.slot_tickets
+        for i in range(1, size + 1):
+            parent = i + (i & -i)
+            if parent <= size:
+                fenwick[parent] += fenwick[i]
+        self.fenwick = fenwick
+
+    def _find(self, ticket: int) -> int:
+        """Slot holding the given ticket."""
+        fenwick = self.fenwick
+        size = len(fenwick) - 1
+        pos = 0
+        bit = 1 << (size.bit_length() - 1)
+        while bit:
+            i = pos + bit
+            if i <= size and fenwick[i] <= ticket:
+                pos = i
+                ticket -= fenwick[i]
+            bit >>= 1
+        return pos
+
+    def enqueue(self, pcb: PCB):
+        if not self.free_slots:
+            self._grow()
+        slot = self.free_slots.pop()
+        self.slots[slot] = pcb.pid
+        self._add(slot, self.tickets(pcb.priority))
+
+    def _remove(self, slot: int) -> PCB:
+        pid = self.slots[slot]
+        self.slots[slot] = None
+        self._add(slot, -self.slot_tickets[slot])
+        self.free_slots.append(slot)
+        return self.get_pcb(pid)
+
+    def pick_next(self):
+        if not self.total_tickets:
+            return None
+        pcb = self._remove(self._find(self.rng.randrange(self.total_tickets)))
+        return min(self.quantum_table[pcb.priority], pcb.time_left), pcb
+
+    def requeue(self, pcb: PCB, ran: int):
+        if pcb.time_left > 0:
+            self.enqueue(pcb)
+
+    def steal(self, can_move):
+        # another draw
+        if not self.total_tickets:
+            return None
+        rng_state = self.rng.getstate()
+        slot = self._find(self.rng.randrange(self.total_tickets))
+        if not can_move(self.slots[slot]):
+            # a failed steal leaves no trace: idle cores try again, the
+            # same way, e.g. when a snapshot is resumed
+            self.rng.setstate(rng_state)
+            return None
+        return self._remove(slot)
+
+    def state(self):
+        return [
+            [-1 if pid is None else pid for pid in self.slots],
+            self.free_slots,
+            list(self.rng.getstate()[1]),
+        ]
+
+    def restore(self, state):
+        slots, free_slots, rng_state = state
+        self.rng.setstate((3, tuple(rng_state), None))
+        self.slots = [None] * len(slots)
+        self.slot_tickets = [0] * len(slots)
+        self.fenwick = [0] * (len(slots) + 1)
+        self.total_tickets = 0
+        for slot, pid in enumerate(slots):
+            if pid != -1:
+                self.slots[slot] = pid
+                self._add(slot, self.tickets(self.get_pcb(pid).priority))
+        self.free_slots = list(free_slots)
+
+
+class StridePolicy(SchedulingPolicy):
+    """Stride scheduling, the deterministic counterpart of the lottery:
+    every process advances its pass by a stride inversely proportional to
+    its tickets for each quantum it runs, and the lowest pass runs next.
+    """
+
+    name = "stride"
+
+    STRIDE1 = 1 << 20
+
+    def __init__(self, quantum_table):
+        super().__init__(quantum_table)
+        self.strides = [self.STRIDE1 // self.tickets(prio) for prio in range(self.num_queues)]
+        # (pass, seq, pid), seq keeps equal passes in arrival order
+        self.heap: list[tuple[int, int, int]] = []
+        self._seq = 0
+        # passes of the picked processes until they are requeued
+        self.picked: dict[int, int] = {}
+        # pass of the last picked process, where new processes start
+        self.global_pass = 0
+
+    def _push(self, pid: int, pass_: int):
+        heapq.heappush(self.heap, (pass_, self._seq, pid))
+        self._seq += 1
+
+    def enqueue(self, pcb: PCB):
+        self._push(pcb.pid, self.global_pass)
+
+    def pick_next(self):
+        if not self.heap:
+            return None
+        pass_, _, pid = heapq.heappop(self.heap)
+        self.picked[pid] = pass_
+        self.global_pass = max(self.global_pass, pass_)
+
+        pcb = self.get_pcb(pid)
+        return min(self.quantum_table[pcb.priority], pcb.time_left), pcb
+
+    def requeue(self, pcb: PCB, ran: int):
+        # slices cut short advance the pass proportionally
+        prio = pcb.priority
+        pass_ = self.picked.pop(pcb.pid) + self.strides[prio] * ran // self.quantum_table[prio]
+        if pcb.time_left > 0:
+            self._push(pcb.pid, pass_)
+
+    def steal(self, can_move):
+        # a leaf of the heap, a late pass
+        if not self.heap or not can_move(self.heap[-1][2]):
+            return None
+        return self.get_pcb(self.heap.pop()[2])
+
+    def state(self):
+        return [
+            _flatten(self.heap),
+            _flatten(self.picked.items()),
+            [self.global_pass, self._seq],
+        ]
+
+    def restore(self, state):
+        # saved in heap order, which is still a valid heap
+        self.heap = _unflatten(state[0], 3)
+        self.picked = dict(_unflatten(state[1], 2))
+        self.global_pass, self._seq = state[2]
+
+
+REAL_TIME_POLICIES = {policy.name: policy for policy in (FIFOPolicy, EDFPolicy)}
+POLICIES = {policy.name: policy for policy in (MLFQPolicy, CFSPolicy, LotteryPolicy, StridePolicy)}
@@ -1,64 +1,96 @@
+import math
+from collections import deque
+from simple_os.output import EventSink, OutputEvent, TextSink
 from simple_os.process.pcb import PCB, ProcState, ProcBlockedReason
-from simple_os.process.scheduler import Scheduler
-from simple_os.memory.memory_manager import MemoryManager
-from simple_os.resource.resource_manager import ResourceManager
 import typing
 
-class _ProcessManager:
-    MAX_PROCS = 100
+# one wait queue per resource: the two memory regions and every kind of
+# device, woken only when a resource of its kind is released. Device
+# requests delayed as unsafe wait in the last one, woken by any device.
+WAIT_QUEUES = ("real_time_memory", "memory", "scanner", "modem", "printer", "sata", "unsafe")
 
-    def __init__(self, memory_manager, scheduler, resource_manager):
-        self.process_table: list[typing.Optional[PCB]] = [None] * self.MAX_PROCS
-        self.blocked_procs = []
+class _ProcessManager:
+    def __init__(self, memory_manager, scheduler, resource_manager, sink: EventSink = None):
+        self.sink = sink if sink is not None else TextSink()
+        # grows as needed: a PCB keeps its slot while alive, freed slots
+        # are reused first
+        self.process_table: list[typing.Optional[PCB]] = []
+        self.free_slots: list[int] = []
+        self.pid_to_slot: dict[int, int] = {}
+        # resource -> blocked pids, in the order they blocked on it
+        self.wait_queues: dict[str, deque[int]] = {name: deque() for name in WAIT_QUEUES}
+        # blocked pid -> its wait queue
+        self.waiting_on: dict[int, str] = {}
+        # memory queue -> no more than the smallest request waiting in it,
+        # so that releases too small for all of them skip the queue
+        self.least_waiting = {"real_time_memory": 0, "memory": 0}
         self.scheduler = scheduler
-        scheduler.register_process_table(self.process_table)
+        scheduler.register_process_lookup(self._get_pcb)
         self.memory_manager = memory_manager
         self.resource_manager = resource_manager
+        # pids are never reused, so they keep matching the declaration
+        # order the file system operations refer to
         self.next_pid = 0
         self.existing_processes = 0
+        # statistics
+        self.memory_blocked_count = 0
+        self.killed_count = 0
+        # processes killed to break a deadlock
+        self.deadlock_victims = 0
 
     def _get_pcb(self, pid: int) -> PCB:
         i = self._get_proc_table_idx(pid)
 
-        if i == self.MAX_PROCS:
+        if i is None:
             return None
 
         return self.process_table[i]
 
-    def _get_proc_table_idx(self, pid: int) -> int:
-        return pid
-        
+    def _get_proc_table_idx(self, pid: int) -> typing.Optional[int]:
+        return self.pid_to_slot.get(pid)
+
+    def _index_table(self):
+        """Rebuilds the pid -> slot map and free slots from the table."""
+        self.pid_to_slot = {
+            pcb.pid: i for i, pcb in enumerate(self.process_table) if pcb is not None
+        }
+        # lowest slots handed out first
+        self.free_slots = [
+            i for i in reversed(range(len(self.process_table))) if self.process_table[i] is None
+        ]
+
     def _add_pcb_to_table(self, pcb: PCB) -> int:
-        i = self.next_pid
+        pid = self.next_pid
         self.next_pid += 1
-        # find first allocation space for process
-        while self.process_table[i] is not None:
-            i += 1
-            if i == self.MAX_PROCS:
-                i = 0
-
-        assert i != self.MAX_PROCS, "Cannot handle more than MAX_PROCS processes at the same time"
 
-        self.process_table[i] = pcb
+        if self.free_slots:
+            i = self.free_slots.pop()
+            self.process_table[i] = pcb
+        else:
+            i = len(self.process_table)
+            self.process_table.append(pcb)
+        self.pid_to_slot[pid] = i
 
-        return i
+        return pid
 
     def _free_pid_from_table(self, pid: int):
-        i = self._get_proc_table_idx(pid)
+        i = self.pid_to_slot.pop(pid, None)
 
-        if i == self.MAX_PROCS:
+        if i is None:
             raise ValueError("Tried freeing non existent process")
 
         self.process_table[i] = None
+        self.free_slots.append(i)
 
     def resolve_process_resource_requests(
         self, pcb: PCB
-    ):
+    ) -> typing.Optional[str]:
         """Allocates process resources when possible.
         May update pcb state according to it.
         This function may be rerun any number of time for the same process.
+        Returns the wait queue of the resource it blocked on, if it did.
         """
-        if pcb.memory_needed is not None:
+        if pcb.memory_offset is None:
             # still has no memory
             status_code, pcb.memory_offset = self.memory_manager.allocate(
                 pcb.pid, pcb.memory_needed, pcb.priority == 0
@@ -67,28 +99,32 @@ class _ProcessManager:
                 if status_code == 2:
                     pcb.marked_for_termination = True
                     pcb.blocked_reason = ProcBlockedReason.TOO_LARGE_MEM_REQUEST
-                    return
+                    return None
 
+                if pcb.blocked_reason != ProcBlockedReason.WAITING_FOR_MEM:
+                    self.memory_blocked_count += 1
                 pcb.state = ProcState.BLOCKED
                 pcb.blocked_reason = ProcBlockedReason.WAITING_FOR_MEM
-                return
+                return "real_time_memory" if pcb.priority == 0 else "memory"
 
         if pcb.using_io:
-            ok, _ = self.resource_manager.request_resources(
+            request = (
                 pcb.pid,
                 pcb.requested_printer,
                 pcb.using_scanner,
                 pcb.using_modem,
-                pcb.requested_sata
+                pcb.requested_sata,
             )
-            if not ok:
+            if self.resource_manager.acquire(*request) is None:
                 pcb.state = ProcState.BLOCKED
                 pcb.blocked_reason = ProcBlockedReason.WAITING_FOR_IO
-                return
+                # None: every device free, but granting them was unsafe
+                return self.resource_manager.busy_device(*request) or "unsafe"
 
         pcb.state = ProcState.READY
         pcb.blocked_reason = None
-        
+        return None
+
     def create_process(
         self,
         priority: int,
@@ -98,7 +134,7 @@ class _ProcessManager:
         requested_scanner: int,
         requested_modem: int,
         requested_disk: int,
-    ):
+    ) -> PCB:
         self.existing_processes += 1
         pcb = PCB(
             pid=None,
@@ -124,51 +160,121 @@ class _ProcessManager:
         )
         actual_pid = self._add_pcb_to_table(pcb)
         pcb.pid = actual_pid
+        if pcb.using_io:
+            # the claim, for deadlock avoidance
+            self.resource_manager.declare(
+                pcb.pid, pcb.requested_printer, pcb.using_scanner, pcb.using_modem, pcb.requested_sata
+            )
 
-        self.resolve_process_resource_requests(pcb)
+        queue = self.resolve_process_resource_requests(pcb)
         if pcb.marked_for_termination:
-            print(f"P{pcb.pid} terminated for {pcb.blocked_reason}")
+            self.sink.emit(OutputEvent.KILL, pcb.pid, pcb.blocked_reason)
+            self.killed_count += 1
             self.terminate_process(pcb.pid)
         elif pcb.state == ProcState.READY:
             self.scheduler.add_ready_process(pcb)
         else:
-            self.blocked_procs.append(pcb.pid)
-
-    def unblock_processes_when_possible(self):
-        i = 0
-        # NOTE: we need while loop here since len(self.blocked_procs)
-        # needs to be reevaluated every loop
-        while i < len(self.blocked_procs):
-            pid = self.blocked_procs[i]
-            pcb = self._get_pcb(pid)
-
-            assert pcb is not None, "This should never happen"
-            assert pcb.blocked_reason is not None, "This should never happen"
-
-            self.resolve_process_resource_requests(pcb)
-
-            if pcb.state == ProcState.READY:
-                self.blocked_procs.pop(i)
-                self.scheduler.add_ready_process(pcb)
-            elif pcb.marked_for_termination:
-                self.blocked_procs.pop(i)
-                print(f"P{pcb.pid} terminated for {pcb.blocked_reason}")
-                self.terminate_process(pcb.pid)
-            else:
-                i += 1
+            self.sink.emit(OutputEvent.BLOCK, pcb.pid, pcb.blocked_reason)
+            self._wait(pcb.pid, queue)
+            self.recover_from_deadlock()
+
+        return pcb
+
+    def _wait(self, pid: int, queue: str):
+        self.wait_queues[queue].append(pid)
+        self.waiting_on[pid] = queue
+        if queue in self.least_waiting:
+            self.least_waiting[queue] = min(self.least_waiting[queue], self._get_pcb(pid).memory_needed)
+
+    def unblock_processes_when_possible(self, released: typing.Iterable[str]):
+        """Retries every process waiting on the released resources, queue
+        by queue and in the order they blocked. The ones still missing the
+        resource keep their order, and later ones that fit get it.
+
+        Memory waiters larger than the room left are not even retried, and
+        a device queue stops once no device of its kind is free.
+        """
+        pools = self.resource_manager.pools
+        for name in released:
+            queue = self.wait_queues[name]
+            memory = name in self.least_waiting
+            if memory:
+                is_real_time = name == "real_time_memory"
+                room = self.memory_manager.room(is_real_time)
+                if self.least_waiting[name] > room:
+                    continue
+                least = math.inf
+            # still waiting, in order
+            kept = []
+            while queue:
+                if name in pools and not pools[name].free:
+                    break
+                pid = queue.popleft()
+                pcb = self._get_pcb(pid)
+
+                assert pcb is not None, "This should never happen"
+                assert pcb.blocked_reason is not None, "This should never happen"
+
+                if memory and pcb.memory_needed > room:
+                    kept.append(pid)
+                    least = min(least, pcb.memory_needed)
+                    continue
+
+                blocked_on = self.resolve_process_resource_requests(pcb)
+
+                if pcb.state == ProcState.READY:
+                    del self.waiting_on[pid]
+                    self.sink.emit(OutputEvent.UNBLOCK, pcb.pid)
+                    self.scheduler.add_ready_process(pcb)
+                elif pcb.marked_for_termination:
+                    del self.waiting_on[pid]
+                    self.sink.emit(OutputEvent.KILL, pcb.pid, pcb.blocked_reason)
+                    self.killed_count += 1
+                    self.terminate_process(pcb.pid)
+                elif blocked_on == name:
+                    kept.append(pid)
+                    if memory:
+                        least = min(least, pcb.memory_needed)
+                    continue
+                else:
+                    # got this resource, waits for the next one it misses
+                    self._wait(pid, blocked_on)
+                if memory:
+                    room = self.memory_manager.room(is_real_time)
+
+            queue.extendleft(reversed(kept))
+            if memory:
+                self.least_waiting[name] = least
+
+    def recover_from_deadlock(self):
+        """Kills the youngest of the processes deadlocked on devices, if
+        any, until none is left.
+        """
+        while True:
+            deadlocked = self.resource_manager.deadlocked()
+            if not deadlocked:
+                return
+            pid = deadlocked[-1]
+            self.sink.emit(OutputEvent.KILL, pid, ProcBlockedReason.DEADLOCK)
+            self.killed_count += 1
+            self.deadlock_victims += 1
+            self.terminate_process(pid)
 
     def terminate_process(self, pid: int):
         self.existing_processes -= 1
-        if pid in self.blocked_procs:
-            self.blocked_procs = [id for id in self.blocked_procs if id != pid]
+        queue = self.waiting_on.pop(pid, None)
+        if queue is not None:
+            self.wait_queues[queue].remove(pid)
+
+        pcb = self._get_pcb(pid)
+        # devices first: their waiters already hold memory
+        released = list(self.resource_manager.release(pid))
+        if pcb.using_io:
+            # gave back devices or a claim, unsafe requests may be safe now
+            released.append("unsafe")
+        if pcb.memory_offset is not None:
+            released.append("real_time_memory" if pcb.priority == 0 else "memory")
 
         self.memory_manager.free(pid)
-        self.resource_manager.release_resources(pid)
         self._free_pid_from_table(pid)
-        self.unblock_processes_when_possible()
-
-ProcessManager = _ProcessManager(
-    MemoryManager,
-    Scheduler,
-    ResourceManager
-)
+        self.unblock_processes_when_possible(released)
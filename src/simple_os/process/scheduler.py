@@ -1,12 +1,27 @@
+from simple_os.cpu import _CPU
+from simple_os.output import EventSink, OutputEvent, TextSink
 from simple_os.process.pcb import PCB, ProcState
-from simple_os.cpu import CPU
+from simple_os.process.policies import POLICIES, REAL_TIME_POLICIES, SchedulingPolicy
 import typing
 
+
+class _RunQueue:
+    """Ready processes of one core. Real time ones are always served first."""
+
+    def __init__(self, real_time: SchedulingPolicy, policy: SchedulingPolicy):
+        self.real_time = real_time
+        self.policy = policy
+        # processes queued here
+        self.num_ready = 0
+        # queued here or running on the core, for the placement of new ones
+        self.load = 0
+
+    def of(self, pcb: PCB) -> SchedulingPolicy:
+        return self.real_time if pcb.priority == 0 else self.policy
+
+
 # definition of what would be in a c module about the scheduler
 class _Scheduler:
-    NUM_QUEUES = 6
-    MAX_PROCS = 100
-
     QUANTUM_TABLE = {
         0: None,  # real time, no preempting
         1: 6,
@@ -16,103 +31,198 @@ class _Scheduler:
         5: 2,
     }
 
-    def __init__(self):
-        # the queues keep indices for process table lookup
-        self.queues: list[list[int]] = [[] for _ in range(self.NUM_QUEUES)]
-        # uninitialized process table
-        self.process_table: list[typing.Optional[PCB]] = None
-        
-        # for aging
-        self.waiting_time = {}  # indice -> waiting time
-
-    def apply_aging(self, t: int):
-        """Makes processes higher priority depending on waiting time.
-        This prevents starvation.
+    def __init__(
+        self,
+        cpu,
+        quantum_table=None,
+        sink: EventSink = None,
+        policy: str = "mlfq",
+        real_time_policy: str = "fifo",
+        num_cores: int = 1,
+        affinity: dict[int, typing.Iterable[int]] = None,
+    ):
+        self.sink = sink if sink is not None else TextSink()
+        if quantum_table is None:
+            quantum_table = self.QUANTUM_TABLE
+        # one priority level per quantum, 0 is real time and n-1 the lowest
+        self.num_queues = max(quantum_table) + 1
+        if any(prio not in quantum_table for prio in range(1, self.num_queues)):
+            raise ValueError("quantum_table needs a quantum for every priority 1..n-1")
+        # real time processes are never preempted
+        self.quantum_table = {0: None, **quantum_table}
+        if real_time_policy not in REAL_TIME_POLICIES:
+            raise ValueError(f"Unknown real time scheduling policy: {real_time_policy}")
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown scheduling policy: {policy}")
+
+        # one CPU and one run queue per core, the given CPU is core 0
+        if num_cores < 1:
+            raise ValueError("There must be at least one core")
+        self.num_cores = num_cores
+        self.cpus = [cpu, *(_CPU(cpu.sink) for _ in range(num_cores - 1))]
+        self.run_queues = [
+            _RunQueue(
+                REAL_TIME_POLICIES[real_time_policy](self.quantum_table),
+                POLICIES[policy](self.quantum_table),
+            )
+            for _ in range(num_cores)
+        ]
+        # pid -> bitmask of the cores it may run on, every core if absent
+        self.affinity: dict[int, int] = {}
+        for pid, cores in (affinity or {}).items():
+            cores = list(cores)
+            if not cores or any(not 0 <= core < num_cores for core in cores):
+                raise ValueError(f"Invalid affinity of process {pid}: {cores}")
+            self.affinity[pid] = sum(1 << core for core in set(cores))
+        # pid -> core of every queued process
+        self.core_of: dict[int, int] = {}
+        # statistics
+        self.migrations = 0
+
+        # pid -> PCB, registered by the process manager
+        self.get_pcb: typing.Callable[[int], PCB] = None
+
+    @property
+    def cpu(self) -> _CPU:
+        return self.cpus[0]
+
+    # policies of core 0, the only ones of a single core machine
+    @property
+    def real_time(self) -> SchedulingPolicy:
+        return self.run_queues[0].real_time
+
+    @property
+    def policy(self) -> SchedulingPolicy:
+        return self.run_queues[0].policy
+
+    @property
+    def promotions(self) -> int:
+        return sum(run_queue.policy.promotions for run_queue in self.run_queues)
+
+    def apply_aging(self, t: int, core: int = 0):
+        """Tells the policies of a core that it executed t more units of
+        time (the feedback queue promotes the processes that waited too
+        long).
         """
-        for prio in range(2, 6):
-            updated_queue = []
-            for pid in self.queues[prio]:
-                self.waiting_time[pid] += t
-
-                if self.waiting_time[pid] >= 20 and prio > 1:
-                    pcb = self.process_table[pid]
-                    pcb.priority -= 1
-                    self.queues[prio - 1].append(pid)
-                    self.waiting_time[pid] = 0
-                else:
-                    updated_queue.append(pid)
-
-            self.queues[prio] = updated_queue
+        run_queue = self.run_queues[core]
+        run_queue.real_time.age(t)
+        run_queue.policy.age(t)
+
+    def register_process_lookup(self, get_pcb: typing.Callable[[int], PCB]):
+        self.get_pcb = get_pcb
+        for run_queue in self.run_queues:
+            run_queue.real_time.get_pcb = get_pcb
+            run_queue.policy.get_pcb = get_pcb
+
+    def _place(self, pid: int) -> int:
+        """Least loaded core the process may run on."""
+        if self.num_cores == 1:
+            return 0
+        mask = self.affinity.get(pid, -1)
+        run_queues = self.run_queues
+        return min(
+            (core for core in range(self.num_cores) if mask >> core & 1),
+            key=lambda core: run_queues[core].load,
+        )
 
-    def register_process_table(self, process_table: list[typing.Optional[PCB]]):
-        self.process_table = process_table
+    def _enqueue(self, pcb: PCB, core: int):
+        run_queue = self.run_queues[core]
+        run_queue.of(pcb).enqueue(pcb)
+        run_queue.num_ready += 1
+        self.core_of[pcb.pid] = core
 
     def add_ready_process(
         self,
         pcb: PCB,
     ) -> int:
+        """Queues a new or unblocked process on the least loaded core.
+        Returns the core.
+        """
         assert pcb.state == ProcState.READY
 
-        assert 0 <= pcb.priority <= 5
-        self.queues[pcb.priority].append(pcb.pid)
-        self.waiting_time[pcb.pid] = 0
-
-    def get_next_exec_time_and_proc(self) -> (int, PCB):
-        if self.queues[0]:
-            pid = self.queues[0].pop(0)
-            pcb = self.process_table[pid]
-
-            assert pcb.state == ProcState.READY
-
-            return pcb.time_left, pcb  # sem preempção
+        assert 0 <= pcb.priority < self.num_queues
+        core = self._place(pcb.pid)
+        self.run_queues[core].load += 1
+        self._enqueue(pcb, core)
+        return core
 
-        for prio in range(1, 6):
-            if self.queues[prio]:
-                pid = self.queues[prio].pop(0)
-                pcb = self.process_table[pid]
-
-                assert pcb.state == ProcState.READY
-
-                quantum = self.QUANTUM_TABLE[prio]
-                self.waiting_time[pid] = 0
-
-                return min(quantum, pcb.time_left), pcb
-
-        return None, None
-
-    def requeue_after_execution(self, pcb: PCB):
+    def _steal(self, core: int) -> typing.Optional[PCB]:
+        """Moves a ready process of the busiest other core that may run on
+        the given one to it.
         """
-        Chamado pelo process manager depois que o PCB executou por um quantum.
-        Só realimenta se ainda não terminou.
+        run_queues = self.run_queues
+        victims = sorted(
+            (victim for victim in range(self.num_cores) if victim != core and run_queues[victim].num_ready),
+            key=lambda victim: -run_queues[victim].num_ready,
+        )
+        bit = 1 << core
+        affinity = self.affinity
+
+        def can_move(pid: int) -> bool:
+            return affinity.get(pid, -1) & bit != 0
+
+        for victim in victims:
+            run_queue = run_queues[victim]
+            pcb = run_queue.real_time.steal(can_move) or run_queue.policy.steal(can_move)
+            if pcb is not None:
+                run_queue.num_ready -= 1
+                run_queue.load -= 1
+                run_queues[core].load += 1
+                self._enqueue(pcb, core)
+                self.migrations += 1
+                return pcb
+        return None
+
+    def get_next_exec_time_and_proc(self, core: int = 0, steal: bool = True) -> (int, PCB):
+        """Next slice of a core. When its run queue is empty, a process of
+        another core is stolen unless steal is False.
         """
-        if pcb.time_left <= 0:
-            return
-
-        if pcb.priority < 5:
-            pcb.priority += 1
-
-        self.add_ready_process(pcb)
+        run_queue = self.run_queues[core]
+        picked = run_queue.real_time.pick_next()
+        if picked is None:
+            picked = run_queue.policy.pick_next()
+            if picked is None:
+                if not steal or self.num_cores == 1 or self._steal(core) is None:
+                    return None, None
+                return self.get_next_exec_time_and_proc(core)
+
+        pcb = picked[1]
+        assert pcb.state == ProcState.READY
+        run_queue.num_ready -= 1
+        del self.core_of[pcb.pid]
+        return picked
 
-    def dispatch(self, proc: PCB, exec_time: int, interrupted_at: int):
+    def requeue_after_execution(self, pcb: PCB, ran: int, core: int = 0):
+        """
+        Chamado pelo process manager depois que o PCB executou por ran
+        unidades de tempo no core. A política só realimenta se ainda não
+        terminou.
+        """
+        run_queue = self.run_queues[core]
+        run_queue.of(pcb).requeue(pcb, ran)
+        if pcb.time_left > 0:
+            run_queue.num_ready += 1
+            self.core_of[pcb.pid] = core
+        else:
+            run_queue.load -= 1
+
+    def dispatch(self, proc: PCB, exec_time: int, interrupted_at: int, core: int = 0, progress: int = None):
         proc.state = ProcState.RUNNING
-        print()
-        print(f"""dispatcher =>
-    PID: {proc.pid}
-    offset: {proc.memory_offset}
-    blocks: {proc.memory_num_allocated_blocks}
-    priority: {proc.priority}
-    starting_priority: {proc.starting_priority}
-    allocated_time: {exec_time}
-    time_left: {proc.time_left}
-    scanners: {1 if proc.using_scanner else 0}
-    printers: {proc.requested_printer}
-    modems: {1 if proc.using_modem else 0}
-    sata: {proc.requested_sata}"""
+        self.sink.emit(
+            OutputEvent.DISPATCH,
+            proc.pid,
+            proc.memory_offset,
+            proc.memory_num_allocated_blocks,
+            proc.priority,
+            proc.starting_priority,
+            exec_time,
+            proc.time_left,
+            1 if proc.using_scanner else 0,
+            proc.requested_printer,
+            1 if proc.using_modem else 0,
+            proc.requested_sata,
         )
-        CPU.execute(proc, exec_time, interrupted_at)
+        self.cpus[core].execute(proc, exec_time, interrupted_at, progress)
         proc.state = ProcState.READY
-        self.apply_aging(interrupted_at)
-        self.requeue_after_execution(proc)
-
-
-Scheduler = _Scheduler()
+        self.apply_aging(interrupted_at, core)
+        self.requeue_after_execution(proc, interrupted_at, core)
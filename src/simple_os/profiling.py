@@ -0,0 +1,172 @@
+"""Opt-in profiling of the simulator hot paths.
+
+A Profiler wraps the key methods of one kernel (and optionally of a file
+system) on the instances themselves, counting calls, cumulative wall time
+and work units: holes examined by the memory search (memory references with
+paging), blocks moved by compaction, blocks scanned by the disk search,
+blocked processes re-examined, processes promoted by aging. Nothing is
+wrapped when no profiler is given, so disabled profiling costs nothing.
+
+Times are inclusive: a call's time also counts the instrumented calls it
+makes (unblock_processes_when_possible includes the resolves it triggers).
+"""
+import json
+import time
+import typing
+from dataclasses import dataclass
+
+
+@dataclass
+class Counter:
+    calls: int = 0
+    seconds: float = 0.0
+    work: int = 0
+
+
+@dataclass(frozen=True)
+class _Probe:
+    method: str
+    # work units of one call: before(obj, *args) is evaluated before the
+    # call and handed to work(obj, result, before, *args) after it
+    work: typing.Optional[typing.Callable] = None
+    before: typing.Optional[typing.Callable] = None
+
+
+def _first_fit_scan(system, start, _, size):
+    return system.disk.total_blocks if start == -1 else start + size
+
+
+RESOLVE = "process_manager.resolve_process_resource_requests"
+
+
+class Profiler:
+    def __init__(self):
+        self.counters: dict[str, Counter] = {}
+
+    def _instrument(self, obj, prefix: str, probes: typing.Iterable[_Probe]):
+        for probe in probes:
+            name = f"{prefix}.{probe.method}"
+            counter = self.counters.setdefault(name, Counter())
+            # bound method of the class, shadowed by the wrapper on the
+            # instance so internal self.method() calls are counted too
+            method = getattr(obj, probe.method)
+            setattr(obj, probe.method, self._wrap(obj, method, counter, probe))
+
+    @staticmethod
+    def _wrap(obj, method, counter: Counter, probe: _Probe):
+        work, before = probe.work, probe.before
+        perf_counter = time.perf_counter
+
+        def wrapper(*args, **kwargs):
+            state = before(obj) if before is not None else None
+            start = perf_counter()
+            result = method(*args, **kwargs)
+            counter.seconds += perf_counter() - start
+            counter.calls += 1
+            if work is not None:
+                counter.work += work(obj, result, state, *args)
+            return result
+
+        return wrapper
+
+    def instrument_kernel(self, kernel):
+        self._instrument(kernel.scheduler, "scheduler", [
+            _Probe("get_next_exec_time_and_proc"),
+            _Probe(
+                "apply_aging",
+                lambda s, r, promotions, *args: s.promotions - promotions,
+                lambda s: s.promotions,
+            ),
+            _Probe("dispatch"),
+        ])
+        for cpu in kernel.cpus:
+            # one counter for all the cores
+            self._instrument(cpu, "cpu", [_Probe("execute")])
+        if kernel.memory_manager.paged:
+            self._instrument(kernel.memory_manager, "memory_manager", [
+                _Probe("allocate"),
+                _Probe(
+                    "execute",
+                    lambda mm, r, references, *args: mm.references - references,
+                    lambda mm: mm.references,
+                ),
+                _Probe("free"),
+            ])
+        else:
+            self._instrument(kernel.memory_manager, "memory_manager", [
+                _Probe("allocate"),
+                _Probe(
+                    "find_contiguous_space",
+                    lambda mm, r, scanned, *args: mm.holes_scanned - scanned,
+                    lambda mm: mm.holes_scanned,
+                ),
+                _Probe(
+                    "compact",
+                    lambda mm, r, moved, *args: mm.moved_blocks - moved,
+                    lambda mm: mm.moved_blocks,
+                ),
+                _Probe("free"),
+            ])
+        self._instrument(kernel.resource_manager, "resource_manager", [
+            _Probe("acquire"),
+            _Probe("release"),
+        ])
+        resolves = self.counters.setdefault(RESOLVE, Counter())
+        self._instrument(kernel.process_manager, "process_manager", [
+            _Probe("create_process"),
+            _Probe("terminate_process"),
+            _Probe("resolve_process_resource_requests"),
+            # waiters of the released resources re-examined, nested unblocks included
+            _Probe(
+                "unblock_processes_when_possible",
+                lambda pm, r, calls_before, *args: resolves.calls - calls_before,
+                lambda pm: resolves.calls,
+            ),
+        ])
+
+    def instrument_simulation(self, simulation):
+        self._instrument(simulation, "simulation", [
+            _Probe("run"),
+            _Probe("_handle_arrival"),
+            _Probe("_end_slice"),
+        ])
+
+    def instrument_filesystem(self, system):
+        self._instrument(system, "filesystem", [
+            _Probe("first_fit", _first_fit_scan),
+            _Probe("create_file"),
+            _Probe("delete_file"),
+        ])
+
+    def to_dict(self) -> dict[str, dict]:
+        return {
+            name: {"calls": c.calls, "seconds": c.seconds, "work": c.work}
+            for name, c in self.counters.items()
+        }
+
+    def summary(self) -> str:
+        """Table of every instrumented entry point, slowest first."""
+        rows = [("entry point", "calls", "total ms", "us/call", "work", "work/call")]
+        for name, c in sorted(self.counters.items(), key=lambda item: -item[1].seconds):
+            per_call = c.seconds / c.calls * 1e6 if c.calls else 0.0
+            work_per_call = f"{c.work / c.calls:.1f}" if c.calls and c.work else "-"
+            rows.append((
+                name,
+                str(c.calls),
+                f"{c.seconds * 1e3:.3f}",
+                f"{per_call:.3f}",
+                str(c.work) if c.work else "-",
+                work_per_call,
+            ))
+
+        widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+        lines = []
+        for row in rows:
+            cells = [row[0].ljust(widths[0])]
+            cells += [cell.rjust(width) for cell, width in zip(row[1:], widths[1:])]
+            lines.append("  ".join(cells))
+        return "\n".join(lines)
+
+    def write_json(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
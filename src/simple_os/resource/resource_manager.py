@@ -1,136 +1,223 @@
-class _ResourceManager:
-    def __init__(self): # inicializa 1 scanner, 2 impressoras, 1 modem e 3 SATA
-        self.scanner = None # cada recurso associado a None ou a um PID
-        self.printers = [None, None]
-        self.modem = None
-        self.sata = [None, None, None]
-
-    def _is_printer_free(self, idx):
-        if ((0 <= idx < len(self.printers)) and (self.printers[idx] is None)):
-            return True
-        else:
-            return False
+import typing
 
-    def _is_sata_free(self, idx):
-        if ((0 <= idx < len(self.sata)) and (self.sata[idx] is None)):
-            return True
-        else:
-            return False
+from simple_os.resource.safety import _SafetyChecker
 
-    def request_resources(self, pid, need_printer = False, need_scanner = False, need_modem = False, need_sata = False): # aloca recurso
-        if need_scanner and self.scanner is not None and self.scanner is not pid: # checa impressora
-            return False, f"Scanner busy (held by PID {self.scanner})"
-
-        if need_modem and self.modem is not None and self.modem is not pid: # checa modem
-            return False, f"Modem busy (held by PID {self.modem})"
-
-        printer_idx = None
-        if need_printer: # qualquer impressora disponível
-            avail = None
-            i = 0
-            already_has = False
-            for p in self.printers: # busca primeira impressora disponível
-                if p is None:
-                    avail = i
-                if p == pid:
-                    already_has = True
-                i = i + 1
-            if already_has:
-                pass
-            elif avail is None:
-                return False, "todas impressoras ocupadas"
-            printer_idx = avail
-
-        sata_idx = None
-        if need_sata: # qualquer SATA disponível
-            avail = None
-            already_has = False
-            i = 0
-            for p in self.sata: # busca primeiro SATA disponível
-                if p is None:
-                    avail = i
-                if p == pid:
-                    already_has = True
-                i = i + 1 # define índice de SATA
-            if already_has:
-                pass
-            elif avail is None:
-                return False, "todos dispositivos SATA ocupados"
+# classes de dispositivo, na ordem em que um pedido é verificado
+DEVICE_CLASSES = ("scanner", "modem", "printer", "sata")
+# a máquina original: 1 scanner, 2 impressoras, 1 modem e 3 SATA
+DEFAULT_DEVICES = {"scanner": 1, "printer": 2, "modem": 1, "sata": 3}
+# none, Banker's algorithm before every grant, or detection of the
+# processes blocked forever, see simple_os.resource.safety
+DEADLOCK_HANDLING = ("none", "avoid", "detect")
 
-            sata_idx = avail
 
-        if need_scanner:
-            self.scanner = pid
+class _DevicePool:
+    """The devices of one class, numbered from 0. Free devices are the set
+    bits of a bitmask, and the highest free one is handed out first.
+    """
 
-        if need_modem:
-            self.modem = pid
+    def __init__(self, count):
+        self.count = count
+        self.free = (1 << count) - 1
+        # pid holding every device, None when free
+        self.holders: list[typing.Optional[int]] = [None] * count
 
-        if printer_idx is not None:
-            self.printers[printer_idx] = pid
+    def take(self, pid) -> int:
+        i = self.free.bit_length() - 1
+        self.free ^= 1 << i
+        self.holders[i] = pid
+        return i
 
-        if sata_idx is not None:
-            self.sata[sata_idx] = pid
+    def give_back(self, i):
+        self.free |= 1 << i
+        self.holders[i] = None
 
-        allocated_parts = []
-        if need_scanner:
-            allocated_parts.append("scanner")
 
-        if need_modem:
-            allocated_parts.append("modem")
+class _ResourceManager:
+    def __init__(self, devices: dict[str, int] = None, deadlock="none"): # inicializa os dispositivos de cada classe
+        if deadlock not in DEADLOCK_HANDLING:
+            raise ValueError(f"Unknown deadlock handling: {deadlock}")
+        counts = {**DEFAULT_DEVICES, **(devices or {})}
+        self.pools = {name: _DevicePool(counts[name]) for name in DEVICE_CLASSES}
+        # pid -> classe -> dispositivos que ele tem
+        self.held: dict[int, dict[str, list[int]]] = {}
+
+        self.deadlock = deadlock
+        self.safety = None
+        if deadlock != "none":
+            self.safety = _SafetyChecker([counts[name] for name in DEVICE_CLASSES])
+            # classe -> linha com 1 dispositivo dela
+            self.unit = {name: self.safety.pack([1]) << (i * self.safety.width) for i, name in enumerate(DEVICE_CLASSES)}
+
+    # os dispositivos da máquina original, por quem os tem
+    @property
+    def scanner(self):
+        return self.pools["scanner"].holders[0]
+
+    @property
+    def modem(self):
+        return self.pools["modem"].holders[0]
+
+    @property
+    def printers(self):
+        return self.pools["printer"].holders
+
+    @property
+    def sata(self):
+        return self.pools["sata"].holders
+
+    def _needed(self, need_printer, need_scanner, need_modem, need_sata):
+        return [
+            name
+            for name, need in zip(DEVICE_CLASSES, (need_scanner, need_modem, need_printer, need_sata))
+            if need
+        ]
+
+    def _busy(self, pid, needed) -> typing.Optional[str]:
+        held = self.held.get(pid, {})
+        for name in needed:
+            if not self.pools[name].free and name not in held:
+                return name
+        return None
+
+    def busy_device(self, pid, need_printer = False, need_scanner = False, need_modem = False, need_sata = False):
+        """First device class of a request with no device free, when pid
+        has none of that class: "scanner", "modem", "printer" or "sata", in
+        the order they are checked. None when the whole request can be
+        granted.
+        """
+        return self._busy(pid, self._needed(need_printer, need_scanner, need_modem, need_sata))
+
+    def acquire(self, pid, need_printer = False, need_scanner = False, need_modem = False, need_sata = False):
+        """All or nothing: one more device of every class needed while any
+        is free (a process asking again for a class it holds gets another
+        one, if there is one), or none. Returns the (class, device) pairs
+        taken, None when some class has no device for pid or, avoiding
+        deadlocks, when granting them would be unsafe.
+        """
+        needed = self._needed(need_printer, need_scanner, need_modem, need_sata)
+        safety = self.safety
+        if self._busy(pid, needed) is not None:
+            if safety is not None:
+                self._wait(pid, needed)
+            return None
+
+        grant = [name for name in needed if self.pools[name].free]
+        if safety is not None:
+            row = sum(self.unit[name] for name in grant)
+            if self.deadlock == "avoid" and not safety.can_grant(pid, row):
+                safety.wait(pid, row)
+                return None
+            safety.granted(pid, row)
+
+        taken = []
+        for name in grant:
+            i = self.pools[name].take(pid)
+            self.held.setdefault(pid, {}).setdefault(name, []).append(i)
+            taken.append((name, i))
+        return taken
+
+    def _wait(self, pid, needed):
+        held = self.held.get(pid, {})
+        self.safety.wait(pid, sum(self.unit[name] for name in needed if name not in held))
+
+    def wait(self, pid, need_printer = False, need_scanner = False, need_modem = False, need_sata = False):
+        """Records that pid is blocked on a request, e.g. when loading a
+        snapshot, for deadlock detection.
+        """
+        if self.safety is not None:
+            self._wait(pid, self._needed(need_printer, need_scanner, need_modem, need_sata))
+
+    def declare(self, pid, need_printer = False, need_scanner = False, need_modem = False, need_sata = False):
+        """The devices pid may ask for, for deadlock avoidance."""
+        if self.safety is not None:
+            needed = self._needed(need_printer, need_scanner, need_modem, need_sata)
+            self.safety.declare(pid, sum(self.unit[name] for name in needed))
+
+    def deadlocked(self) -> list:
+        """Pids blocked forever on each other, by device, see safety."""
+        return self.safety.deadlocked() if self.safety is not None else []
+
+    def release(self, pid) -> dict[str, list[int]]:
+        """Gives back every device of pid, returns them by class."""
+        held = self.held.pop(pid, {})
+        for name, devices in held.items():
+            pool = self.pools[name]
+            for i in devices:
+                pool.give_back(i)
+        if self.safety is not None:
+            self.safety.released(pid)
+        return held
+
+    def release_device(self, pid, name, idx): # libera um dispositivo
+        pool = self.pools[name]
+        if not (0 <= idx < pool.count and pool.holders[idx] == pid):
+            return False
+        pool.give_back(idx)
+        if self.safety is not None:
+            self.safety.given_back(pid, self.unit[name])
+        devices = self.held[pid][name]
+        devices.remove(idx)
+        if not devices:
+            del self.held[pid][name]
+            if not self.held[pid]:
+                del self.held[pid]
+        return True
 
-        if printer_idx is not None:
-            allocated_parts.append(f"printer[{printer_idx}]")
+    def release_printer(self, pid, idx): # libera impressora
+        return self.release_device(pid, "printer", idx)
 
-        if sata_idx is not None:
-            allocated_parts.append(f"sata[{sata_idx}]")
+    def release_sata(self, pid, idx): # libera sata
+        return self.release_device(pid, "sata", idx)
+
+    def restore(self, holders: dict[str, list[typing.Optional[int]]]):
+        """Replaces who holds every device, e.g. when loading a snapshot."""
+        self.held = {}
+        for name in DEVICE_CLASSES:
+            pool = self.pools[name]
+            pool.free = 0
+            for i, pid in enumerate(holders[name]):
+                pool.holders[i] = pid
+                if pid is None:
+                    pool.free |= 1 << i
+                else:
+                    self.held.setdefault(pid, {}).setdefault(name, []).append(i)
+        if self.safety is not None:
+            # claims and requests are declared again by the processes
+            self.safety = _SafetyChecker([self.pools[name].count for name in DEVICE_CLASSES])
+            for pid, devices in self.held.items():
+                self.safety.granted(pid, sum(self.unit[name] * len(devices[name]) for name in devices))
+
+    # versões com mensagem, formatada só quando alguém pede
+
+    def request_resources(self, pid, need_printer = False, need_scanner = False, need_modem = False, need_sata = False): # aloca recurso
+        taken = self.acquire(pid, need_printer, need_scanner, need_modem, need_sata)
+        if taken is None:
+            busy = self.busy_device(pid, need_printer, need_scanner, need_modem, need_sata)
+            if busy is None:
+                return False, "Request delayed: unsafe state"
+            if busy == "printer":
+                return False, "todas impressoras ocupadas"
+            if busy == "sata":
+                return False, "todos dispositivos SATA ocupados"
+            holders = ", ".join(str(holder) for holder in self.pools[busy].holders)
+            return False, f"{busy.capitalize()} busy (held by PID {holders})"
 
+        allocated_parts = [self._device_name(name, i) for name, i in taken]
         msg = f"Recursos alocados ao PID {pid}: {', '.join(allocated_parts) if allocated_parts else 'none'}"
         return True, msg
 
     def release_resources(self, pid): # libera recurso
-        released = []
-        if self.scanner == pid:
-            self.scanner = None
-            released.append("scanner")
-
-        i = 0
-        for p in self.printers: # libera impressora associada ao PID
-            if p == pid:
-                self.printers[i] = None
-                released.append(f"printer[{i}]")
-                break
-            i = i + 1
-
-        if self.modem == pid:
-            self.modem = None
-            released.append("modem")
-
-        i = 0
-        for d in self.sata: # libera SATA associada ao PID
-            if d == pid:
-                self.sata[i] = None
-                released.append(f"sata[{i}]")
-                break
-            i = i + 1
-
+        released = [
+            self._device_name(name, i) for name, devices in self.release(pid).items() for i in devices
+        ]
         if released:
             return True, f"Recursos liberados associados ao PID {pid}: {', '.join(released)}"
         else:
             return False, f"Nenhum recurso associado ao PID {pid}"
 
-    def release_printer(self, pid, idx): # libera impressora
-        if 0 <= idx < len(self.printers) and self.printers[idx] == pid:
-            self.printers[idx] = None
-            return True
-        return False
-
-    def release_sata(self, pid, idx): # libera sata
-        if 0 <= idx < len(self.sata) and self.sata[idx] == pid:
-            self.sata[idx] = None
-            return True
-        return False
+    def _device_name(self, name, i):
+        return name if self.pools[name].count == 1 else f"{name}[{i}]"
 
     def __str__(self):
-        return f"Scanner: {self.scanner}, Printers: {self.printers}, Modem: {self.modem}, SATA: {self.sata}"
-
-ResourceManager = _ResourceManager()
+        return ", ".join(f"{name}: {self.pools[name].holders}" for name in DEVICE_CLASSES)
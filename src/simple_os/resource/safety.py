@@ -0,0 +1,146 @@
+"""Deadlock avoidance and detection over the device classes.
+
+Every row of the allocation, maximum, need and request matrices is a
+vector with one count per device class, packed in a single int: class i
+takes the bits [i * width, (i + 1) * width), and the top bit of every lane
+is a guard that stays clear. A whole row is then added, subtracted or
+compared with one int operation, whatever the number of classes:
+(b | guard) - a keeps the guard bit of a lane set exactly when b >= a there.
+
+Rows are updated as devices are granted and released, so a check only
+walks the processes, never rebuilds the matrices.
+"""
+import typing
+
+
+class _SafetyChecker:
+    """Banker's algorithm for avoidance, graph reduction for detection."""
+
+    def __init__(self, counts: list[int]):
+        self.width = max(counts, default=0).bit_length() + 1
+        self.guard = sum(1 << (i * self.width + self.width - 1) for i in range(len(counts)))
+        self.total = self.pack(counts)
+        self.available = self.total
+        # pid -> row
+        self.allocation: dict[int, int] = {}
+        self.maximum: dict[int, int] = {}
+        self.need: dict[int, int] = {}
+        # pid -> what it is blocked asking for
+        self.requests: dict[int, int] = {}
+        # requests delayed because granting them was unsafe, each counted
+        # once however many times it is retried, and the pids still delayed
+        self.refused = 0
+        self.delayed: set[int] = set()
+
+    def pack(self, counts: typing.Iterable[int]) -> int:
+        return sum(count << (i * self.width) for i, count in enumerate(counts))
+
+    def unpack(self, row: int, classes: int) -> list[int]:
+        mask = (1 << self.width) - 1
+        return [row >> (i * self.width) & mask for i in range(classes)]
+
+    def le(self, a: int, b: int) -> bool:
+        """Every count of a <= the same count of b."""
+        return ((b | self.guard) - a) & self.guard == self.guard
+
+    def minus(self, a: int, b: int) -> int:
+        """a - b, count by count, 0 where b is larger."""
+        ge = ((a | self.guard) - b) & self.guard
+        # all the bits of the lanes where a >= b
+        base = ge >> (self.width - 1)
+        keep = (base << self.width) - base
+        return ((a | self.guard) - b) & keep & ~self.guard
+
+    def _track(self, pid):
+        if pid not in self.allocation:
+            self.allocation[pid] = 0
+            self.maximum[pid] = 0
+            self.need[pid] = 0
+
+    def declare(self, pid, claim: int):
+        """The most pid will ever hold at once."""
+        self._track(pid)
+        self.maximum[pid] = claim
+        self.need[pid] = self.minus(claim, self.allocation[pid])
+
+    def _grow(self, pid, request):
+        # asking for more than the claim raises the claim
+        self._track(pid)
+        extra = self.minus(request, self.need[pid])
+        self.maximum[pid] += extra
+        self.need[pid] += extra
+
+    def granted(self, pid, row: int):
+        self._grow(pid, row)
+        self.allocation[pid] += row
+        self.need[pid] -= row
+        self.available -= row
+        self.requests.pop(pid, None)
+        self.delayed.discard(pid)
+
+    def given_back(self, pid, row: int):
+        """pid gave back some devices and may ask for them again."""
+        self.allocation[pid] -= row
+        self.need[pid] += row
+        self.available += row
+
+    def released(self, pid):
+        """pid gave back everything and claims nothing anymore."""
+        self.available += self.allocation.pop(pid, 0)
+        self.maximum.pop(pid, None)
+        self.need.pop(pid, None)
+        self.requests.pop(pid, None)
+        self.delayed.discard(pid)
+
+    def wait(self, pid, request: int):
+        self.requests[pid] = request
+
+    def _stuck(self, work: int, wants: typing.Callable[[int], int]) -> list[int]:
+        # processes that cannot finish: every one whose wants fit in work
+        # finishes and gives its devices back, until none is left that can
+        pending = list(self.allocation)
+        while True:
+            rest = []
+            for pid in pending:
+                if self.le(wants(pid), work):
+                    work += self.allocation[pid]
+                else:
+                    rest.append(pid)
+            if len(rest) == len(pending):
+                return sorted(rest)
+            pending = rest
+
+    def is_safe(self) -> bool:
+        return not self._stuck(self.available, self.need.__getitem__)
+
+    def can_grant(self, pid, request: int) -> bool:
+        """Banker's check: whether granting request to pid leaves a state in
+        which every process can still get its whole claim.
+        """
+        if not self.le(request, self.available):
+            return False
+        self._track(pid)
+        saved = self.maximum[pid], self.need[pid]
+        self._grow(pid, request)
+        self.allocation[pid] += request
+        self.need[pid] -= request
+        self.available -= request
+        safe = self.is_safe()
+        self.allocation[pid] -= request
+        self.available += request
+        self.maximum[pid], self.need[pid] = saved
+        if not safe and pid not in self.delayed:
+            self.delayed.add(pid)
+            self.refused += 1
+        return safe
+
+    def deadlocked(self) -> list[int]:
+        """Processes blocked forever, by reduction of the wait-for graph: a
+        process not blocked, or whose request fits in what is free, can
+        finish and give its devices back. The ones left wait, directly or
+        not, on each other; with several devices per class a cycle alone is
+        not enough, and this is the check that stays exact.
+        """
+        if not self.requests:
+            return []
+        return self._stuck(self.available, lambda pid: self.requests.get(pid, 0))
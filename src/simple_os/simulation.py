@@ -0,0 +1,251 @@
+"""Discrete-event core of the OS simulation.
+
+Instead of moving the clock forward one unit at a time, the simulation keeps
+a priority queue of pending events and jumps straight to the next one. The
+only events that can change what runs next are process arrivals and the end
+of the running slice (completion, quantum expiry or preemption), so idle gaps
+and long real-time bursts cost nothing.
+
+Every core runs its own slices. A core that goes idle takes the next process
+of its run queue, or steals one from the busiest core.
+"""
+import heapq
+import typing
+from enum import IntEnum
+
+from simple_os.process.pcb import PCB
+from simple_os.simulation_utils import ProcToBeDispathed
+
+
+class EventKind(IntEnum):
+    # NOTE: the values define the processing order of events happening at the
+    # same instant. Arrivals come first so that a process arriving exactly when
+    # a slice ends is already in the ready queues at the next pick, the same
+    # way the old tick-by-tick loop behaved.
+    ARRIVAL = 0
+    PREEMPTION = 1
+    COMPLETION = 2
+    QUANTUM_EXPIRY = 3
+
+
+class EventQueue:
+    """Min-heap of (time, kind) events, FIFO for identical keys."""
+
+    def __init__(self):
+        self._heap: list[tuple[int, int, int, typing.Any]] = []
+        self._seq = 0
+
+    def __len__(self):
+        return len(self._heap)
+
+    def push(self, time: int, kind: EventKind, payload: typing.Any = None):
+        heapq.heappush(self._heap, (time, kind, self._seq, payload))
+        self._seq += 1
+
+    def pop(self) -> tuple[int, EventKind, typing.Any]:
+        time, kind, _, payload = heapq.heappop(self._heap)
+        return time, EventKind(kind), payload
+
+    def peek_time(self) -> typing.Optional[int]:
+        if not self._heap:
+            return None
+        return self._heap[0][0]
+
+
+class Simulation:
+    def __init__(
+        self,
+        to_be_created_procs_list,  # ProcCreatedTimedList or ProcStream
+        process_manager,  # _ProcessManager
+        scheduler,  # _Scheduler
+        max_time: float = 1e8,
+    ):
+        self.arrivals = to_be_created_procs_list
+        self.process_manager = process_manager
+        self.scheduler = scheduler
+        # paged memory makes processes stall on page faults, and
+        # compaction makes them wait for the copy of memory
+        memory_manager = process_manager.memory_manager
+        self.stalls = memory_manager if memory_manager.paged or memory_manager.compaction else None
+        self.max_time = max_time
+
+        self.t = 0
+        self.events = EventQueue()
+
+        # running slice of every core: process, allocated time, the instant
+        # it started and its id
+        self.num_cores = scheduler.num_cores
+        self.running: list[typing.Optional[PCB]] = [None] * self.num_cores
+        self.num_running = 0
+        self.running_exec_time = [0] * self.num_cores
+        self.running_since = [0] * self.num_cores
+        # slice ending events of interrupted slices stay in the heap, so
+        # every event carries the id of the slice it was created for. Ids
+        # are slice_id * num_cores + core, the core is the remainder.
+        self.slice_id = 0
+        self.slice_ids = [0] * self.num_cores
+
+        # statistics, kept as running totals so that memory only depends
+        # on the live processes, however long the workload is
+        self.arrived_at: dict[int, int] = {}  # live pid -> arrival instant
+        self.completed = 0
+        self.total_turnaround = 0
+        self.makespan = 0
+        # time every core spent running processes
+        self.core_busy = [0] * self.num_cores
+
+        # set once there is nothing left to simulate
+        self.finished = False
+
+        self._schedule_next_arrival()
+
+    @property
+    def mean_turnaround(self) -> float:
+        if not self.completed:
+            return 0.0
+        return self.total_turnaround / self.completed
+
+    @property
+    def utilization(self) -> list[float]:
+        """Fraction of the simulated time every core was busy."""
+        if not self.t:
+            return [0.0] * self.num_cores
+        return [busy / self.t for busy in self.core_busy]
+
+    def _create_process(self, proc: ProcToBeDispathed) -> PCB:
+        pcb = self.process_manager.create_process(
+            proc.priority,
+            proc.execution_time,
+            proc.memory_needed,
+            proc.requested_printer,
+            proc.requested_scanner,
+            proc.requested_modem,
+            proc.requested_disk,
+        )
+        if not pcb.marked_for_termination:
+            self.arrived_at[pcb.pid] = self.t
+        return pcb
+
+    def _schedule_next_arrival(self):
+        next_arrival = self.arrivals.next_arrival_time
+        if next_arrival is not None:
+            self.events.push(next_arrival, EventKind.ARRIVAL)
+
+    def _has_work_left(self) -> bool:
+        return (
+            self.arrivals.next_arrival_time is not None
+            or self.process_manager.existing_processes > 0
+        )
+
+    def _start_next_slice(self, core: int, steal: bool = True):
+        exec_time, proc = self.scheduler.get_next_exec_time_and_proc(core, steal)
+        if proc is None:
+            return
+
+        self.slice_id += 1
+        slice_id = self.slice_id * self.num_cores + core
+        self.slice_ids[core] = slice_id
+        self.running[core] = proc
+        self.num_running += 1
+        self.running_exec_time[core] = exec_time
+        self.running_since[core] = self.t
+
+        if exec_time == proc.time_left:
+            kind = EventKind.COMPLETION
+        else:
+            kind = EventKind.QUANTUM_EXPIRY
+        if proc.priority == 0 and self.stalls is not None:
+            # real time processes are never cut short: the slice also
+            # covers the time they still owe stalled
+            exec_time += self.stalls.owed.get(proc.pid, 0)
+        self.events.push(self.t + exec_time, kind, slice_id)
+
+    def _lowest_priority_core(self) -> typing.Optional[int]:
+        """Core running the lowest priority process, None if all are idle."""
+        core = None
+        for i, proc in enumerate(self.running):
+            if proc is not None and (core is None or proc.priority > self.running[core].priority):
+                core = i
+        return core
+
+    def _handle_arrival(self):
+        preempted = []
+        for proc in self.arrivals.get_unfetched_procs_until(self.t):
+            pcb = self._create_process(proc)
+            # the core it was queued on; processes that did not become
+            # ready are checked against the lowest priority running one
+            core = self.scheduler.core_of.get(pcb.pid)
+            if core is None:
+                core = self._lowest_priority_core()
+                if core is None:
+                    continue
+            running = self.running[core]
+            if running is not None and proc.priority < running.priority and core not in preempted:
+                # current process just got interrupted
+                preempted.append(core)
+
+        for core in preempted:
+            self.events.push(self.t, EventKind.PREEMPTION, self.slice_ids[core])
+
+        self._schedule_next_arrival()
+
+    def _end_slice(self, core: int = 0):
+        proc = self.running[core]
+        self.running[core] = None
+        self.num_running -= 1
+        ran = self.t - self.running_since[core]
+        self.core_busy[core] += ran
+        # time stalled holds the core but runs nothing
+        progress = ran if self.stalls is None else self.stalls.execute(proc, ran)
+
+        self.scheduler.dispatch(proc, self.running_exec_time[core], ran, core, progress)
+
+        if proc.time_left == 0:
+            self.completed += 1
+            self.total_turnaround += self.t - self.arrived_at.pop(proc.pid)
+            self.makespan = self.t
+            self.process_manager.terminate_process(proc.pid)
+
+    def run(self, until: typing.Optional[int] = None):
+        """Runs the simulation to the end. When until is given, stops before
+        the first event happening after that instant instead; calling run
+        again resumes from there.
+        """
+        num_cores = self.num_cores
+        while True:
+            if self.num_running < num_cores:
+                if self.t < self.max_time and self._has_work_left():
+                    # every idle core takes from its own run queue first, so
+                    # that no core steals what another one was about to run
+                    for core in range(num_cores):
+                        if self.running[core] is None:
+                            self._start_next_slice(core, steal=False)
+                    if num_cores > 1:
+                        for core in range(num_cores):
+                            if self.running[core] is None:
+                                self._start_next_slice(core)
+                elif not self.num_running:
+                    break
+
+            if not self.events:
+                # nothing pending can change the state anymore,
+                # e.g. every remaining process is blocked forever
+                break
+
+            next_time = self.events.peek_time()
+            if not self.num_running and next_time >= self.max_time:
+                break
+
+            if until is not None and next_time > until:
+                return
+
+            self.t, kind, slice_id = self.events.pop()
+
+            if kind == EventKind.ARRIVAL:
+                self._handle_arrival()
+            else:
+                core = slice_id % num_cores
+                if slice_id == self.slice_ids[core] and self.running[core] is not None:
+                    self._end_slice(core)
+
+        self.finished = True
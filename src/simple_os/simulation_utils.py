@@ -1,6 +1,14 @@
-from dataclasses import dataclass, field
+from array import array
+from dataclasses import dataclass, field, fields
+import bisect
+import itertools
+import json
+import operator
+import typing
 
-@dataclass
+from simple_os.output import EventSink, OutputEvent, TextSink
+
+@dataclass(slots=True)
 class ProcToBeDispathed:
     created_at: int  # time start
     priority: int
@@ -12,40 +20,164 @@ class ProcToBeDispathed:
     requested_disk: int
     
 
+# fields of a process declaration, in file order
+PROC_FIELDS = tuple(f.name for f in fields(ProcToBeDispathed))
+_proc_values = operator.attrgetter(*PROC_FIELDS)
+
+
+# array type of each column: a 64 bit int, so that no value a declaration
+# can have overflows it (a byte would stop at 127 printers)
+COLUMN_TYPES = ("q",) * len(PROC_FIELDS)
+
+
+def _empty_columns() -> list[array]:
+    return [array(code) for code in COLUMN_TYPES]
+
+
+def rows_to_columns(values: typing.Sequence[int]) -> list[array]:
+    """Columns of the declarations given one after the other in values."""
+    num_fields = len(PROC_FIELDS)
+    return [array(code, values[i::num_fields]) for i, code in enumerate(COLUMN_TYPES)]
+
+
 @dataclass
 class ProcCreatedTimedList:
-    # sorted by created_at list of processes to be created
-    _procs_to_be_created: list[ProcToBeDispathed] = field(default_factory=list)
+    # processes to be created, sorted by created_at, stored by column: one
+    # int array per field of ProcToBeDispathed. Processes are only built
+    # when they are fetched.
+    columns: list[array] = field(default_factory=_empty_columns)
     fetched_until_idx: int = 0
 
+    @property
+    def created_at(self) -> array:
+        return self.columns[0]
+
     def append(self, item: ProcToBeDispathed):
         # stable sorted insert into procs to be created
         # maintains order of processes at the same time
-        # NOTE: O(N) insert is quite alright considering the simulation scope
-        i = 0
-        while (
-            i < self.num_procs and
-            item.created_at >= self._procs_to_be_created[i].created_at
-        ):
-            i += 1
-        self._procs_to_be_created.insert(i, item)
+        values = _proc_values(item)
+        created_at = self.created_at
+        if not created_at or item.created_at >= created_at[-1]:
+            # already sorted input (the common case) is a plain append
+            for column, value in zip(self.columns, values):
+                column.append(value)
+        else:
+            # after every process created at the same time
+            i = bisect.bisect_right(created_at, item.created_at)
+            for column, value in zip(self.columns, values):
+                column.insert(i, value)
+
+    def extend(self, items: typing.Iterable[ProcToBeDispathed]):
+        columns = _empty_columns()
+        for item in items:
+            for column, value in zip(columns, _proc_values(item)):
+                column.append(value)
+        self.extend_columns(columns)
+
+    def extend_columns(self, columns: typing.Sequence[array]):
+        """Appends a batch of processes given by column, then sorts once if
+        needed. Same order as appending them one by one: the sort is stable.
+        """
+        start = self.num_procs
+        for column, values in zip(self.columns, columns):
+            column.extend(values)
+        self._sort(start)
+
+    def _sort(self, start: int = 0):
+        # sorts if any process from start on is out of order
+        created_at = self.created_at
+        start = max(start, 1)
+        if all(map(operator.le, created_at[start - 1:-1], created_at[start:])):
+            return
+        order = sorted(range(len(created_at)), key=created_at.__getitem__)
+        self.columns = [
+            array(column.typecode, map(column.__getitem__, order)) for column in self.columns
+        ]
+
+    def _procs(self, start: int, end: int) -> list[ProcToBeDispathed]:
+        return list(map(ProcToBeDispathed, *(column[start:end] for column in self.columns)))
+
+    def __iter__(self) -> typing.Iterator[ProcToBeDispathed]:
+        return map(ProcToBeDispathed, *self.columns)
 
     @property
     def num_procs(self):
-        return len(self._procs_to_be_created)
+        return len(self.created_at)
 
     @property
     def num_unfetched_procs(self):
-        return len(self._procs_to_be_created) - self.fetched_until_idx
+        return self.num_procs - self.fetched_until_idx
+
+    @property
+    def next_arrival_time(self) -> typing.Optional[int]:
+        if self.fetched_until_idx == self.num_procs:
+            return None
+        return self.created_at[self.fetched_until_idx]
 
     def get_unfetched_procs_until(self, t: int):
         start = self.fetched_until_idx
-        while (
-            self.fetched_until_idx < self.num_procs and
-            self._procs_to_be_created[self.fetched_until_idx].created_at <= t
-        ):
-            self.fetched_until_idx += 1
-        return self._procs_to_be_created[start:self.fetched_until_idx]
+        self.fetched_until_idx = bisect.bisect_right(self.created_at, t, lo=start)
+        return self._procs(start, self.fetched_until_idx)
+
+
+class ProcStream:
+    """Arrival source over a lazy iterator of processes sorted by created_at.
+    Same interface as ProcCreatedTimedList, but only the next process to
+    arrive is held in memory.
+    """
+
+    def __init__(self, procs: typing.Iterable[ProcToBeDispathed]):
+        self._procs = iter(procs)
+        self._next = next(self._procs, None)
+        self.num_fetched = 0
+
+    @property
+    def next_arrival_time(self) -> typing.Optional[int]:
+        if self._next is None:
+            return None
+        return self._next.created_at
+
+    @property
+    def num_unfetched_procs(self):
+        # unknown for lazy sources, only tells whether there is any left
+        return 0 if self._next is None else 1
+
+    def get_unfetched_procs_until(self, t: int):
+        procs = []
+        while self._next is not None and self._next.created_at <= t:
+            proc = self._next
+            procs.append(proc)
+            self._next = next(self._procs, None)
+            if self._next is not None and self._next.created_at < proc.created_at:
+                raise ValueError("Streamed processes must be sorted by created_at")
+        self.num_fetched += len(procs)
+        return procs
+
+    def skip(self, n: int):
+        """Drops the next n processes, as if they had been fetched."""
+        for _ in range(n):
+            if self._next is None:
+                break
+            self._next = next(self._procs, None)
+            self.num_fetched += 1
+
+
+class ProcFileStream(ProcStream):
+    """Arrival source reading a process declaration file in chunks while the
+    simulation runs. The file must be sorted by created_at.
+    """
+
+    def __init__(self, path: str, sink: EventSink = None, chunk_size: int = 4096):
+        self.path = path
+        self.sink = sink if sink is not None else TextSink()
+        self.chunk_size = chunk_size
+        super().__init__(self)
+
+    def __iter__(self) -> typing.Iterator[ProcToBeDispathed]:
+        # every iteration reads the file again from the start
+        for columns in read_procs_columns(self.path, self.sink, self.chunk_size):
+            yield from map(ProcToBeDispathed, *columns)
+
 
 @dataclass
 class FileSystemState:
@@ -55,34 +187,71 @@ class FileSystemState:
 class FileSystemOperations:
     pass
 
-def parse_procs_decl(path: str):
-    print("Parsing processes to create...")
+_count_commas = operator.methodcaller("count", ",")
 
-    to_be_created_list = ProcCreatedTimedList()
+
+def _parse_ints(text: str) -> list[int]:
+    # the whole chunk at once: json's parser is much faster than int() per
+    # value, and falls back to int() for what json does not take ("+1", "07")
+    try:
+        return json.loads(f"[{text}]")
+    except json.JSONDecodeError:
+        return list(map(int, text.split(",")))
+
+
+def read_procs_columns(
+    path: str,
+    sink: EventSink,
+    chunk_size: int = 4096,
+) -> typing.Iterator[list[array]]:
+    """Yields the processes of a declaration file by column (see
+    ProcCreatedTimedList), chunk_size lines at a time.
+    """
+    num_fields = len(PROC_FIELDS)
     with open(path, "r") as f:
-        for line in f:
-            if len(line.strip()) == 0:
-                continue
+        while True:
+            chunk = list(itertools.islice(f, chunk_size))
+            if not chunk:
+                return
+            lines = [line for line in chunk if line.strip()]
             try:
-                to_be_created_list.append(
-                    ProcToBeDispathed(
-                        *list(map(lambda x: int(x.strip()), line.split(",")))
-                    )
-                )
+                if any(count != num_fields - 1 for count in map(_count_commas, lines)):
+                    raise ValueError(f"Expected {num_fields} values per line")
+                columns = rows_to_columns(_parse_ints(",".join(lines)))
             except Exception as e:
-                print(f"Could not parse processes file {path}")
+                sink.emit(OutputEvent.MESSAGE, f"Could not parse processes file {path}")
                 raise e
+            yield columns
+
 
-    print(f"Initial state loaded: {to_be_created_list.num_procs} processes to be created during simulation")
+def parse_procs_decl(path: str, sink: EventSink = None):
+    if sink is None:
+        sink = TextSink()
+    sink.emit(OutputEvent.MESSAGE, "Parsing processes to create...")
+
+    to_be_created_list = ProcCreatedTimedList()
+    for chunk in read_procs_columns(path, sink):
+        for column, values in zip(to_be_created_list.columns, chunk):
+            column.extend(values)
+    # sorted once at the end, not chunk by chunk
+    to_be_created_list._sort()
+
+    sink.emit(
+        OutputEvent.MESSAGE,
+        f"Initial state loaded: {to_be_created_list.num_procs} processes to be created during simulation",
+    )
 
     return to_be_created_list
 
-def parse_file_decl(path: str):
+def parse_file_decl(path: str, sink: EventSink = None):
     # Use the input reader + filesystem manager to build state + ops
     from .files.input_reader import InputReader
     from .files.manager import FileSystemManager
 
-    data = InputReader.read_file(path)
+    if sink is None:
+        sink = TextSink()
+
+    data = InputReader.read_file(path, sink)
     if data is None:
         raise FileNotFoundError(f"Could not parse file declaration: {path}")
 
@@ -91,10 +260,10 @@ def parse_file_decl(path: str):
     operations = data.get("operations", [])
 
     # Create a FileSystemManager and load initial state
-    fs_manager = FileSystemManager(total_blocks)
+    fs_manager = FileSystemManager(total_blocks, sink)
     ok = fs_manager.load_initial_files(initial_files)
     if not ok:
-        print("Warning: failed to load initial files into file system.")
+        sink.emit(OutputEvent.MESSAGE, "Warning: failed to load initial files into file system.")
 
     # Add any explicit real-time processes (convention: process id 99 used for RT in examples)
     # and queue up operations in the manager as well as return the list.
@@ -105,3 +274,23 @@ def parse_file_decl(path: str):
     return operations, fs_manager
 
 
+def execute_file_operations(
+    to_be_created_list: typing.Iterable[ProcToBeDispathed],
+    fs_manager,  # FileSystemManager
+    operations: list,
+):
+    """Runs the file operations once the processes simulation finished.
+    Process i of the declaration file is the one with pid i.
+    """
+    if not operations:
+        return
+
+    fs_manager.sink.emit(OutputEvent.MESSAGE, "Filesystem =>")
+    for i, proc in enumerate(to_be_created_list):
+        if proc.priority == 0:
+            fs_manager.add_real_time_process(i)
+        else:
+            fs_manager.add_process(i)
+
+    fs_manager.execute_all_operations()
+    fs_manager.show_current_state()
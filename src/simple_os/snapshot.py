@@ -0,0 +1,550 @@
+"""Snapshot and restore of the whole simulator state.
+
+A snapshot holds the machine configuration, the process table, scheduler
+queues, memory, devices, the pending arrivals and the event queue of the
+simulation, and optionally the file system. It is a small versioned binary
+format (zlib compressed), not a pickle of the live objects, so it stays
+compact, fast to load and independent of the classes' internals.
+
+Loading the same snapshot several times gives independent machines, so
+what-if variants can branch from the same instant without re-simulating
+the prefix.
+"""
+from array import array
+import json
+import struct
+import typing
+import zlib
+
+from simple_os.config import MachineConfig
+from simple_os.files.disk import DiskBlock
+from simple_os.files.file import File, FileOperation
+from simple_os.files.manager import FileSystemManager
+from simple_os.kernel import Kernel
+from simple_os.output import EventSink
+from simple_os.process.pcb import PCB, ProcBlockedReason, ProcState
+from simple_os.process.process_manager import WAIT_QUEUES
+from simple_os.resource.resource_manager import DEVICE_CLASSES
+from simple_os.simulation import Simulation
+from simple_os.simulation_utils import ProcCreatedTimedList, ProcFileStream, rows_to_columns
+from simple_os.workload import GeneratedWorkload, WorkloadSpec
+
+MAGIC = b"SOSSNAP\0"
+VERSION = 15
+_HEADER = struct.Struct("<8sH")
+
+_INT = struct.Struct("<q")
+_FLOAT = struct.Struct("<d")
+_LEN = struct.Struct("<I")
+
+
+class _Writer:
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def int(self, value: int):
+        self.buffer += _INT.pack(value)
+
+    def opt_int(self, value: typing.Optional[int]):
+        self.bool(value is not None)
+        if value is not None:
+            self.int(value)
+
+    def float(self, value: float):
+        self.buffer += _FLOAT.pack(value)
+
+    def bool(self, value: bool):
+        self.buffer.append(1 if value else 0)
+
+    def str(self, value: str):
+        data = value.encode()
+        self.buffer += _LEN.pack(len(data))
+        self.buffer += data
+
+    def opt_str(self, value: typing.Optional[str]):
+        self.bool(value is not None)
+        if value is not None:
+            self.str(value)
+
+    def ints(self, values: typing.Sequence[int]):
+        self.buffer += _LEN.pack(len(values))
+        self.buffer += struct.pack(f"<{len(values)}q", *values)
+
+    def runs(self, values: list):
+        """Run-length encoding of lists with long runs of equal values
+        (devices and disk blocks).
+        """
+        runs = []
+        for value in values:
+            if runs and runs[-1][0] == value:
+                runs[-1][1] += 1
+            else:
+                runs.append([value, 1])
+
+        self.buffer += _LEN.pack(len(runs))
+        for value, length in runs:
+            if isinstance(value, str):
+                self.str(value)
+            else:
+                self.opt_int(value)
+            self.int(length)
+
+
+class _Reader:
+    def __init__(self, data: bytes):
+        self.data = data
+        self.pos = 0
+
+    def _unpack(self, fmt: struct.Struct):
+        value = fmt.unpack_from(self.data, self.pos)[0]
+        self.pos += fmt.size
+        return value
+
+    def int(self) -> int:
+        return self._unpack(_INT)
+
+    def opt_int(self) -> typing.Optional[int]:
+        return self.int() if self.bool() else None
+
+    def float(self) -> float:
+        return self._unpack(_FLOAT)
+
+    def bool(self) -> bool:
+        value = self.data[self.pos]
+        self.pos += 1
+        return value == 1
+
+    def str(self) -> str:
+        length = self._unpack(_LEN)
+        value = self.data[self.pos:self.pos + length].decode()
+        self.pos += length
+        return value
+
+    def opt_str(self) -> typing.Optional[str]:
+        return self.str() if self.bool() else None
+
+    def ints(self) -> list[int]:
+        length = self._unpack(_LEN)
+        values = list(struct.unpack_from(f"<{length}q", self.data, self.pos))
+        self.pos += 8 * length
+        return values
+
+    def runs(self, strings: bool = False) -> list:
+        values = []
+        for _ in range(self._unpack(_LEN)):
+            value = self.str() if strings else self.opt_int()
+            values.extend([value] * self.int())
+        return values
+
+
+# PCB
+
+def _write_pcb(w: _Writer, pcb: PCB):
+    w.int(pcb.pid)
+    w.int(pcb.starting_priority)
+    w.int(pcb.time_needed)
+    w.bool(pcb.is_preemptable)
+    w.bool(pcb.marked_for_termination)
+    w.opt_int(pcb.memory_needed)
+    w.opt_int(pcb.memory_offset)
+    w.opt_int(pcb.memory_num_allocated_blocks)
+    w.int(pcb.time_left)
+    w.int(pcb.priority)
+    w.int(pcb.state.value)
+    w.opt_int(pcb.blocked_reason.value if pcb.blocked_reason is not None else None)
+    w.int(pcb.pc)
+    w.bool(pcb.using_scanner)
+    w.int(pcb.requested_printer)
+    w.bool(pcb.using_modem)
+    w.int(pcb.requested_sata)
+
+
+def _read_pcb(r: _Reader) -> PCB:
+    pid = r.int()
+    starting_priority = r.int()
+    time_needed = r.int()
+    is_preemptable = r.bool()
+    marked_for_termination = r.bool()
+    memory_needed = r.opt_int()
+    memory_offset = r.opt_int()
+    memory_num_allocated_blocks = r.opt_int()
+    time_left = r.int()
+    priority = r.int()
+    state = ProcState(r.int())
+    blocked_reason = r.opt_int()
+    return PCB(
+        pid=pid,
+        starting_priority=starting_priority,
+        time_needed=time_needed,
+        is_preemptable=is_preemptable,
+        marked_for_termination=marked_for_termination,
+        memory_needed=memory_needed,
+        memory_offset=memory_offset,
+        memory_num_allocated_blocks=memory_num_allocated_blocks,
+        time_left=time_left,
+        priority=priority,
+        state=state,
+        blocked_reason=ProcBlockedReason(blocked_reason) if blocked_reason is not None else None,
+        pc=r.int(),
+        using_scanner=r.bool(),
+        requested_printer=r.int(),
+        using_modem=r.bool(),
+        requested_sata=r.int(),
+    )
+
+
+# Kernel
+
+def _write_kernel(w: _Writer, kernel: Kernel):
+    w.str(json.dumps(kernel.config.to_dict()))
+
+    pm = kernel.process_manager
+    w.int(pm.next_pid)
+    w.int(pm.existing_processes)
+    w.int(pm.memory_blocked_count)
+    w.int(pm.killed_count)
+    w.int(pm.deadlock_victims)
+    for name in WAIT_QUEUES:
+        w.ints(pm.wait_queues[name])
+    w.int(len(pm.process_table))
+    for pcb in pm.process_table:
+        w.bool(pcb is not None)
+        if pcb is not None:
+            _write_pcb(w, pcb)
+
+    scheduler = kernel.scheduler
+    w.int(scheduler.num_queues)
+    for run_queue in scheduler.run_queues:
+        w.int(run_queue.load)
+        for policy in (run_queue.real_time, run_queue.policy):
+            state = policy.state()
+            w.int(len(state))
+            for values in state:
+                w.ints(values)
+    w.ints([x for item in scheduler.core_of.items() for x in item])
+    w.int(scheduler.migrations)
+
+    mm = kernel.memory_manager
+    if mm.paged:
+        state = mm.state()
+        w.int(len(state))
+        for values in state:
+            w.ints(values)
+    else:
+        w.int(len(mm.memory.segments))
+        for pid, segments in mm.memory.segments.items():
+            w.int(pid)
+            w.ints([x for segment in segments for x in segment])
+        for values in mm.state():
+            w.ints(values)
+        w.int(mm.allocations)
+        w.int(mm.failed_allocations)
+        w.float(mm.fragmentation_sum)
+        w.ints([mm.compactions, mm.rescued, mm.moved_blocks, mm.compaction_time])
+        w.ints([x for item in mm.owed.items() for x in item])
+
+    rm = kernel.resource_manager
+    for name in DEVICE_CLASSES:
+        w.runs(rm.pools[name].holders)
+    w.int(rm.safety.refused if rm.safety is not None else 0)
+    w.ints(sorted(rm.safety.delayed) if rm.safety is not None else [])
+
+
+def _read_kernel(
+    r: _Reader,
+    sink: EventSink,
+    config: typing.Optional[MachineConfig],
+) -> Kernel:
+    saved_config = MachineConfig.from_dict(json.loads(r.str()))
+    kernel = Kernel(config if config is not None else saved_config, sink)
+
+    pm = kernel.process_manager
+    pm.next_pid = r.int()
+    pm.existing_processes = r.int()
+    pm.memory_blocked_count = r.int()
+    pm.killed_count = r.int()
+    pm.deadlock_victims = r.int()
+    for name in WAIT_QUEUES:
+        pm.wait_queues[name].extend(r.ints())
+        for pid in pm.wait_queues[name]:
+            pm.waiting_on[pid] = name
+    pm.process_table = [
+        _read_pcb(r) if r.bool() else None
+        for _ in range(r.int())
+    ]
+    pm._index_table()
+
+    scheduler = kernel.scheduler
+    if r.int() != scheduler.num_queues:
+        raise ValueError("A snapshot can only be restored on a machine with the same priority levels")
+    policies = (kernel.config.policy, kernel.config.real_time_policy, kernel.config.num_cores)
+    if policies != (saved_config.policy, saved_config.real_time_policy, saved_config.num_cores):
+        raise ValueError("A snapshot can only be restored with the same scheduling policies and cores")
+    for run_queue in scheduler.run_queues:
+        run_queue.load = r.int()
+        for policy in (run_queue.real_time, run_queue.policy):
+            policy.restore([r.ints() for _ in range(r.int())])
+    core_of = r.ints()
+    scheduler.core_of = dict(zip(core_of[::2], core_of[1::2]))
+    for core in scheduler.core_of.values():
+        scheduler.run_queues[core].num_ready += 1
+    scheduler.migrations = r.int()
+
+    mm = kernel.memory_manager
+    memory = ("memory_blocks", "real_time_blocks", "memory_strategy", "paging", "page_size", "page_replacement")
+    if any(getattr(kernel.config, name) != getattr(saved_config, name) for name in memory):
+        raise ValueError("A snapshot can only be restored on a machine with the same memory")
+    if mm.paged:
+        mm.restore([r.ints() for _ in range(r.int())])
+    else:
+        segments = {}
+        for _ in range(r.int()):
+            pid = r.int()
+            values = r.ints()
+            segments[pid] = list(zip(values[::2], values[1::2]))
+        mm.restore(segments, [r.ints(), r.ints()])
+        mm.allocations = r.int()
+        mm.failed_allocations = r.int()
+        mm.fragmentation_sum = r.float()
+        mm.compactions, mm.rescued, mm.moved_blocks, mm.compaction_time = r.ints()
+        owed = r.ints()
+        mm.owed = dict(zip(owed[::2], owed[1::2]))
+
+    rm = kernel.resource_manager
+    holders = {name: r.runs() for name in DEVICE_CLASSES}
+    if any(len(holders[name]) != rm.pools[name].count for name in DEVICE_CLASSES):
+        raise ValueError("A snapshot can only be restored on a machine with the same devices")
+    rm.restore(holders)
+    refused = r.int()
+    delayed = r.ints()
+    if rm.safety is not None:
+        rm.safety.refused = refused
+        rm.safety.delayed = set(delayed)
+        for pcb in pm.process_table:
+            if pcb is not None and pcb.using_io:
+                request = (pcb.pid, pcb.requested_printer, pcb.using_scanner, pcb.using_modem, pcb.requested_sata)
+                rm.declare(*request)
+                if pm.waiting_on.get(pcb.pid) in (*DEVICE_CLASSES, "unsafe"):
+                    rm.wait(*request)
+
+    return kernel
+
+
+# Simulation
+
+# arrival sources
+_ARRIVALS_LIST = 0
+_ARRIVALS_GENERATED = 1
+_ARRIVALS_FILE = 2
+
+
+def _write_simulation(w: _Writer, simulation: Simulation):
+    arrivals = simulation.arrivals
+    if isinstance(arrivals, GeneratedWorkload):
+        # generated workloads are deterministic, the spec and how far
+        # it was consumed are enough to rebuild them
+        w.int(_ARRIVALS_GENERATED)
+        w.str(json.dumps(arrivals.spec.to_dict()))
+        w.int(arrivals.num_fetched)
+    elif isinstance(arrivals, ProcFileStream):
+        # the declaration file is read again on resume, up to where it was
+        w.int(_ARRIVALS_FILE)
+        w.str(arrivals.path)
+        w.int(arrivals.chunk_size)
+        w.int(arrivals.num_fetched)
+    elif isinstance(arrivals, ProcCreatedTimedList):
+        w.int(_ARRIVALS_LIST)
+        _write_arrivals_list(w, arrivals)
+    else:
+        raise TypeError(f"Cannot snapshot a simulation fed by {type(arrivals).__name__}")
+
+    w.int(simulation.t)
+    w.float(simulation.max_time)
+    w.ints([proc.pid if proc is not None else -1 for proc in simulation.running])
+    w.ints(simulation.running_exec_time)
+    w.ints(simulation.running_since)
+    w.int(simulation.slice_id)
+    w.ints(simulation.slice_ids)
+    w.ints(simulation.core_busy)
+    w.bool(simulation.finished)
+
+    events = simulation.events
+    w.int(events._seq)
+    w.int(len(events._heap))
+    for time, kind, seq, payload in events._heap:
+        w.int(time)
+        w.int(kind)
+        w.int(seq)
+        w.opt_int(payload)
+
+    w.ints([x for item in simulation.arrived_at.items() for x in item])
+    w.int(simulation.completed)
+    w.int(simulation.total_turnaround)
+    w.int(simulation.makespan)
+
+
+def _write_arrivals_list(w: _Writer, arrivals: ProcCreatedTimedList):
+    w.int(arrivals.fetched_until_idx)
+    # one declaration after the other, like the processes file
+    w.ints([x for row in zip(*arrivals.columns) for x in row])
+
+
+def _read_arrivals_list(r: _Reader) -> ProcCreatedTimedList:
+    arrivals = ProcCreatedTimedList()
+    fetched_until_idx = r.int()
+    # already sorted, no need to go through append
+    arrivals.columns = rows_to_columns(array("q", r.ints()))
+    arrivals.fetched_until_idx = fetched_until_idx
+    return arrivals
+
+
+def _read_simulation(r: _Reader, kernel: Kernel) -> Simulation:
+    source = r.int()
+    if source == _ARRIVALS_GENERATED:
+        arrivals = GeneratedWorkload(WorkloadSpec.from_dict(json.loads(r.str())))
+        arrivals.skip(r.int())
+    elif source == _ARRIVALS_FILE:
+        arrivals = ProcFileStream(r.str(), kernel.sink, r.int())
+        arrivals.skip(r.int())
+    else:
+        arrivals = _read_arrivals_list(r)
+
+    simulation = Simulation(arrivals, kernel.process_manager, kernel.scheduler)
+    simulation.t = r.int()
+    simulation.max_time = r.float()
+    simulation.running = [
+        kernel.process_manager._get_pcb(pid) if pid != -1 else None for pid in r.ints()
+    ]
+    simulation.num_running = sum(proc is not None for proc in simulation.running)
+    simulation.running_exec_time = r.ints()
+    simulation.running_since = r.ints()
+    simulation.slice_id = r.int()
+    simulation.slice_ids = r.ints()
+    simulation.core_busy = r.ints()
+    simulation.finished = r.bool()
+
+    events = simulation.events
+    events._seq = r.int()
+    # saved in heap order, which is still a valid heap
+    events._heap = [(r.int(), r.int(), r.int(), r.opt_int()) for _ in range(r.int())]
+
+    arrived_at = r.ints()
+    simulation.arrived_at = dict(zip(arrived_at[::2], arrived_at[1::2]))
+    simulation.completed = r.int()
+    simulation.total_turnaround = r.int()
+    simulation.makespan = r.int()
+
+    return simulation
+
+
+# File system
+
+def _write_filesystem(w: _Writer, fs_manager: FileSystemManager):
+    system = fs_manager.system
+    w.int(system.disk.total_blocks)
+    w.runs([block.file_name for block in system.disk.blocks])
+
+    w.int(len(system.files))
+    for key, file in system.files.items():
+        w.str(key)
+        w.int(file.id)
+        w.str(file.name)
+        w.int(file.size)
+        w.int(file.owner_process)
+        w.int(file.start_block)
+
+    w.ints(sorted(system.real_time_processes))
+    w.ints(sorted(system.processes))
+    w.int(system.next_id)
+    w.int(system.failed_operations)
+
+    w.int(len(fs_manager.pending_operations))
+    for op in fs_manager.pending_operations:
+        w.int(op.process_id)
+        w.int(op.type)
+        w.str(op.file_name)
+        w.int(op.size)
+        w.opt_str(op.file_id)
+
+
+def _read_filesystem(r: _Reader, sink: EventSink) -> FileSystemManager:
+    fs_manager = FileSystemManager(r.int(), sink)
+    system = fs_manager.system
+    system.disk.blocks = [
+        DiskBlock(i, file_name) for i, file_name in enumerate(r.runs(strings=True))
+    ]
+
+    for _ in range(r.int()):
+        key = r.str()
+        file_id = r.int()
+        name = r.str()
+        size = r.int()
+        owner = r.int()
+        system.files[key] = File(file_id, name, size, owner, r.int())
+
+    for pid in r.ints():
+        fs_manager.real_time_processes.add(pid)
+        system.real_time_processes.add(pid)
+    for pid in r.ints():
+        fs_manager.processes.add(pid)
+        system.processes.add(pid)
+    system.next_id = r.int()
+    system.failed_operations = r.int()
+
+    for _ in range(r.int()):
+        process_id = r.int()
+        op_type = r.int()
+        file_name = r.str()
+        size = r.int()
+        fs_manager.add_operation(
+            FileOperation(process_id, op_type, file_name, size, r.opt_str())
+        )
+
+    return fs_manager
+
+
+def dump_snapshot(
+    kernel: Kernel,
+    simulation: Simulation,
+    fs_manager: typing.Optional[FileSystemManager] = None,
+) -> bytes:
+    w = _Writer()
+    _write_kernel(w, kernel)
+    _write_simulation(w, simulation)
+    w.bool(fs_manager is not None)
+    if fs_manager is not None:
+        _write_filesystem(w, fs_manager)
+
+    return _HEADER.pack(MAGIC, VERSION) + zlib.compress(bytes(w.buffer))
+
+
+def load_snapshot(
+    data: bytes,
+    sink: EventSink = None,
+    config: MachineConfig = None,
+) -> tuple[Kernel, Simulation, typing.Optional[FileSystemManager]]:
+    """Rebuilds a machine from a snapshot. A config may be given to branch
+    a what-if variant from the saved state (e.g. a different quantum table).
+    """
+    magic, version = _HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a simulator snapshot")
+    if version != VERSION:
+        raise ValueError(f"Unsupported snapshot version {version}")
+
+    r = _Reader(zlib.decompress(data[_HEADER.size:]))
+    kernel = _read_kernel(r, sink, config)
+    simulation = _read_simulation(r, kernel)
+    fs_manager = _read_filesystem(r, kernel.sink) if r.bool() else None
+
+    return kernel, simulation, fs_manager
+
+
+def write_snapshot(path: str, *args, **kwargs):
+    with open(path, "wb") as f:
+        f.write(dump_snapshot(*args, **kwargs))
+
+
+def read_snapshot(path: str, *args, **kwargs):
+    with open(path, "rb") as f:
+        return load_snapshot(f.read(), *args, **kwargs)
@@ -0,0 +1,182 @@
+"""Parameter sweep over workload files and machine configurations.
+
+Every (workload, config) pair is simulated in its own worker process and
+summarized in one row. Simulations are deterministic, so each row carries a
+run_key (hash of the inputs) that can be used to cache and compare results.
+
+Usage:
+    python -m simple_os.sweep t/*.txt -c configs.json -o results.csv
+
+configs.json holds a list of MachineConfig fields, for example:
+    [{"name": "default"}, {"name": "short_q", "quantum_table": {"1": 2}}, {"name": "cfs", "policy": "cfs"},
+     {"name": "buddy", "memory_strategy": "buddy"}]
+"""
+import argparse
+import csv
+import hashlib
+import itertools
+import json
+import sys
+import typing
+from concurrent.futures import ProcessPoolExecutor
+
+from simple_os.config import MachineConfig
+from simple_os.kernel import Kernel
+from simple_os.output import NullSink
+import simple_os.simulation_utils as utils
+
+ROW_FIELDS = [
+    "workload",
+    "config",
+    "run_key",
+    "processes",
+    "completed",
+    "killed",
+    "makespan",
+    "mean_turnaround",
+    "utilization",
+    "migrations",
+    "memory_blocked",
+    "failed_allocations",
+    "external_fragmentation",
+    "rescued_by_compaction",
+    "compacted_blocks",
+    "page_fault_rate",
+    "tlb_hit_rate",
+    "fs_failures",
+]
+
+
+def run_key(workload: str, config: MachineConfig, files: typing.Optional[str]) -> str:
+    digest = hashlib.sha1()
+    for path in (workload, files):
+        if path is not None:
+            with open(path, "rb") as f:
+                digest.update(f.read())
+        digest.update(b"\0")
+    digest.update(json.dumps(config.to_dict(), sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def run_one(workload: str, config_dict: dict, files: typing.Optional[str] = None) -> dict:
+    """Simulates one workload on one machine and summarizes the run."""
+    config = MachineConfig.from_dict(config_dict)
+
+    sink = NullSink()
+    procs = utils.parse_procs_decl(workload, sink)
+    kernel = Kernel(config, sink)
+    simulation = kernel.run(procs)
+
+    fs_failures = 0
+    if files is not None:
+        ops, fs_manager = utils.parse_file_decl(files, sink)
+        utils.execute_file_operations(procs, fs_manager, ops)
+        fs_failures = fs_manager.system.failed_operations
+
+    return {
+        "workload": workload,
+        "config": config.name,
+        "run_key": run_key(workload, config, files),
+        "processes": procs.num_procs,
+        "completed": simulation.completed,
+        "killed": kernel.process_manager.killed_count,
+        "makespan": simulation.makespan,
+        "mean_turnaround": round(simulation.mean_turnaround, 6),
+        # mean of the cores
+        "utilization": round(sum(simulation.utilization) / config.num_cores, 6),
+        "migrations": kernel.scheduler.migrations,
+        "memory_blocked": kernel.process_manager.memory_blocked_count,
+        # allocations retried because no hole was large enough, and the mean
+        # external fragmentation seen by all the allocations
+        "failed_allocations": kernel.memory_manager.failed_allocations,
+        "external_fragmentation": round(kernel.memory_manager.mean_fragmentation, 6),
+        # allocations that only found room by compacting, and the blocks moved
+        "rescued_by_compaction": 0 if config.paging else kernel.memory_manager.rescued,
+        "compacted_blocks": 0 if config.paging else kernel.memory_manager.moved_blocks,
+        # faults and TLB hits per memory reference, with paging
+        "page_fault_rate": round(kernel.memory_manager.fault_rate, 6) if config.paging else 0.0,
+        "tlb_hit_rate": round(kernel.memory_manager.tlb_hit_rate, 6) if config.paging else 0.0,
+        "fs_failures": fs_failures,
+    }
+
+
+def sweep(
+    workloads: list[str],
+    configs: list[dict],
+    files: typing.Optional[str] = None,
+    jobs: typing.Optional[int] = None,
+) -> list[dict]:
+    """Runs the whole (workload x config) matrix.
+    Rows come back in matrix order, whatever order the workers finish in.
+    """
+    matrix = list(itertools.product(workloads, configs))
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(
+            run_one,
+            [w for w, _ in matrix],
+            [c for _, c in matrix],
+            [files] * len(matrix),
+        ))
+
+
+def write_rows(rows: list[dict], out: typing.TextIO, fmt: str):
+    if fmt == "json":
+        json.dump(rows, out, indent=2)
+        out.write("\n")
+    else:
+        writer = csv.DictWriter(out, fieldnames=ROW_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OS Simulator parameter sweep")
+
+    parser.add_argument(
+        "workloads",
+        nargs="+",
+        help="Process declaration files to simulate",
+    )
+    parser.add_argument(
+        "--configs", "-c",
+        type=str,
+        help="JSON file with a list of machine configurations (default machine if omitted)",
+    )
+    parser.add_argument(
+        "--files", "-f",
+        type=str,
+        help="File with filesystem start state and operations, used by every run",
+    )
+    parser.add_argument(
+        "--jobs", "-j",
+        type=int,
+        default=None,
+        help="Number of worker processes (defaults to the number of cores)",
+    )
+    parser.add_argument(
+        "--output", "-o",
+        type=str,
+        help="Output file; .json writes JSON, anything else CSV (stdout if omitted)",
+    )
+    args = parser.parse_args()
+
+    configs = [{}]
+    if args.configs:
+        with open(args.configs, "r") as f:
+            configs = json.load(f)
+        # fail early, before spawning any worker
+        for config in configs:
+            MachineConfig.from_dict(config)
+
+    rows = sweep(args.workloads, configs, args.files, args.jobs)
+
+    if args.output:
+        fmt = "json" if args.output.endswith(".json") else "csv"
+        with open(args.output, "w", newline="") as out:
+            write_rows(rows, out, fmt)
+    else:
+        write_rows(rows, sys.stdout, "csv")
+
+
+if __name__ == "__main__":
+    main()
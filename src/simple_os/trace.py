@@ -0,0 +1,247 @@
+"""Compact binary trace of the simulator output events.
+
+Layout: an 8 byte magic, a little endian u16 version, then one record per
+event. A record is the u8 event id followed by the fixed-width fields of that
+event. Strings (messages, file names) are stored once in a STRING record
+(u8 id, u32 string id, u32 length, utf-8 bytes) and referenced by id.
+
+Usage:
+    python main.py -p t/p_io.txt -f files.txt -o trace --output-file a.trace
+    python -m simple_os.trace replay a.trace
+    python -m simple_os.trace diff a.trace b.trace
+"""
+import argparse
+import itertools
+import struct
+import sys
+import typing
+
+from simple_os.output import EVENT_FIELDS, OUTPUT_MODES, EventSink, OutputEvent, format_event, make_sink
+from simple_os.process.pcb import ProcBlockedReason
+
+MAGIC = b"SOSTRACE"
+VERSION = 1
+_HEADER = struct.Struct("<8sH")
+
+# record id of string table entries, outside of the OutputEvent range
+STRING_RECORD = 255
+_STRING = struct.Struct("<II")
+
+# encoding of nullable ints
+INT_NONE = -(2 ** 31)
+
+# per event field codes:
+#   i -> i32 (None stored as INT_NONE)
+#   ? -> bool
+#   r -> ProcBlockedReason (0 for None)
+#   s -> string table id
+EVENT_CODES: dict[OutputEvent, str] = {
+    OutputEvent.MESSAGE: "s",
+    OutputEvent.DISPATCH: "iiiiiiiiiii",
+    OutputEvent.EXECUTE: "i?",
+    OutputEvent.INSTRUCTIONS: "iii",
+    OutputEvent.EXIT: "i",
+    OutputEvent.QUANTUM_EXPIRED: "i",
+    OutputEvent.PREEMPTED: "i",
+    OutputEvent.KILL: "ir",
+    OutputEvent.BLOCK: "ir",
+    OutputEvent.UNBLOCK: "i",
+    OutputEvent.FS_CREATE: "issii",
+    OutputEvent.FS_DELETE: "iss",
+    OutputEvent.FS_FAIL: "is",
+}
+
+_STRUCT_CODES = {"i": "i", "?": "?", "r": "B", "s": "I"}
+
+RECORDS: dict[OutputEvent, struct.Struct] = {
+    event: struct.Struct("<B" + "".join(_STRUCT_CODES[c] for c in codes))
+    for event, codes in EVENT_CODES.items()
+}
+
+assert all(len(EVENT_CODES[e]) == len(EVENT_FIELDS[e]) for e in OutputEvent)
+
+
+class TraceSink(EventSink):
+    """Writes events as binary records, in batches."""
+
+    def __init__(self, out: typing.BinaryIO, buffer_size: int = 1 << 16):
+        self.out = out
+        self.buffer_size = buffer_size
+        self._buffer = bytearray(_HEADER.pack(MAGIC, VERSION))
+        self._strings: dict[str, int] = {}
+
+    def _string_id(self, text: str) -> int:
+        string_id = self._strings.get(text)
+        if string_id is None:
+            string_id = len(self._strings)
+            self._strings[text] = string_id
+            data = text.encode()
+            self._buffer.append(STRING_RECORD)
+            self._buffer += _STRING.pack(string_id, len(data))
+            self._buffer += data
+        return string_id
+
+    def emit(self, event: OutputEvent, *fields):
+        values = []
+        for code, value in zip(EVENT_CODES[event], fields):
+            if code == "i":
+                values.append(INT_NONE if value is None else value)
+            elif code == "r":
+                values.append(0 if value is None else value.value)
+            elif code == "s":
+                values.append(self._string_id(str(value)))
+            else:
+                values.append(value)
+
+        self._buffer += RECORDS[event].pack(event, *values)
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        self.out.write(self._buffer)
+        self._buffer.clear()
+        self.out.flush()
+
+    def close(self):
+        self.flush()
+
+
+def _decode(event: OutputEvent, raw: tuple, strings: list[str]) -> tuple:
+    fields = []
+    for code, value in zip(EVENT_CODES[event], raw):
+        if code == "i":
+            fields.append(None if value == INT_NONE else value)
+        elif code == "r":
+            fields.append(None if value == 0 else ProcBlockedReason(value))
+        elif code == "s":
+            fields.append(strings[value])
+        else:
+            fields.append(value)
+    return tuple(fields)
+
+
+def read_trace(path: str, chunk_size: int = 1 << 16) -> typing.Iterator[tuple[OutputEvent, tuple]]:
+    """Yields every (event, fields) of a trace, decoded back to the values
+    the sink received (strings as str, reasons as ProcBlockedReason).
+    The file is read chunk_size bytes at a time, so traces of any length
+    are decoded in constant memory.
+    """
+    with open(path, "rb") as f:
+        header = f.read(_HEADER.size)
+        if len(header) < _HEADER.size or header[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a simulator trace")
+        _, version = _HEADER.unpack(header)
+        if version != VERSION:
+            raise ValueError(f"Unsupported trace version {version} in {path}")
+
+        strings: list[str] = []
+        data = b""
+        pos = 0
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            # records may straddle chunks, the incomplete tail is kept
+            data = data[pos:] + chunk
+            pos = 0
+            size = len(data)
+            while pos < size:
+                kind = data[pos]
+
+                if kind == STRING_RECORD:
+                    if pos + 1 + _STRING.size > size:
+                        break
+                    _, length = _STRING.unpack_from(data, pos + 1)
+                    end = pos + 1 + _STRING.size + length
+                    if end > size:
+                        break
+                    strings.append(data[end - length:end].decode())
+                    pos = end
+                    continue
+
+                event = OutputEvent(kind)
+                record = RECORDS[event]
+                if pos + record.size > size:
+                    break
+                raw = record.unpack_from(data, pos)[1:]
+                pos += record.size
+                yield event, _decode(event, raw, strings)
+
+        if pos < len(data):
+            raise ValueError(f"{path} ends in the middle of a record")
+
+
+def replay(path: str, sink: EventSink):
+    for event, fields in read_trace(path):
+        sink.emit(event, *fields)
+    sink.close()
+
+
+def _describe(index: int, event: OutputEvent, fields: tuple) -> str:
+    named = ", ".join(f"{n}={v}" for n, v in zip(EVENT_FIELDS[event], fields))
+    text = format_event(event, fields)
+    description = f"  #{index} {event.name.lower()}({named})"
+    if text is not None and event != OutputEvent.MESSAGE:
+        description += "\n" + "\n".join(f"      | {line}" for line in text.strip("\n").splitlines())
+    return description
+
+
+def diff(path_a: str, path_b: str, out: typing.TextIO = None, context: int = 3) -> bool:
+    """Compares two traces event by event and reports the first divergence.
+    Returns True when both traces hold the same events.
+    """
+    out = out if out is not None else sys.stdout
+    recent: list[tuple[int, OutputEvent, tuple]] = []
+
+    pairs = itertools.zip_longest(read_trace(path_a), read_trace(path_b))
+    for index, (a, b) in enumerate(pairs):
+        if a == b:
+            recent.append((index, *a))
+            del recent[:-context]
+            continue
+
+        out.write(f"Traces diverge at event #{index}\n")
+        if recent:
+            out.write("last common events:\n")
+            for common in recent:
+                out.write(_describe(*common) + "\n")
+        for path, item in ((path_a, a), (path_b, b)):
+            out.write(f"{path}:\n")
+            if item is None:
+                out.write("  <end of trace>\n")
+            else:
+                out.write(_describe(index, *item) + "\n")
+        return False
+
+    out.write("Traces are identical\n")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OS Simulator binary traces")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    replay_parser = commands.add_parser("replay", help="Replays a trace into another output mode")
+    replay_parser.add_argument("trace", type=str)
+    replay_parser.add_argument(
+        "--output", "-o",
+        choices=[mode for mode in OUTPUT_MODES if mode != "trace"],
+        default="text",
+    )
+
+    diff_parser = commands.add_parser("diff", help="Reports the first divergence between two traces")
+    diff_parser.add_argument("trace_a", type=str)
+    diff_parser.add_argument("trace_b", type=str)
+    diff_parser.add_argument("--context", type=int, default=3, help="Common events shown before the divergence")
+
+    args = parser.parse_args()
+
+    if args.command == "replay":
+        replay(args.trace, make_sink(args.output))
+    else:
+        same = diff(args.trace_a, args.trace_b, context=args.context)
+        sys.exit(0 if same else 1)
+
+
+if __name__ == "__main__":
+    main()
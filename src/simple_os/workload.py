@@ -0,0 +1,205 @@
+"""Seeded synthetic workload generator.
+
+generate() lazily yields processes in created_at order, so it can feed a
+simulation through a ProcStream without ever materializing the workload:
+memory stays flat however many processes are generated.
+
+Usage (writes a process declaration file):
+    python -m simple_os.workload spec.json -n 1000 > procs.txt
+"""
+import argparse
+import json
+import math
+import random
+import sys
+import typing
+from dataclasses import asdict, dataclass, fields
+
+from simple_os.simulation_utils import ProcStream, ProcToBeDispathed
+
+ARRIVAL_PROCESSES = ("poisson", "bursty", "diurnal")
+EXEC_TIME_DISTRIBUTIONS = ("uniform", "exponential", "lognormal")
+
+
+@dataclass(frozen=True)
+class WorkloadSpec:
+    seed: int = 0
+    # None generates processes forever (the simulation max_time bounds it)
+    num_procs: typing.Optional[int] = 1000
+
+    # arrivals, in processes per time unit
+    arrival: str = "poisson"
+    rate: float = 0.2
+    # bursty: on/off modulated poisson, mean length of each period
+    burst_rate: float = 2.0
+    burst_mean_length: float = 20.0
+    idle_mean_length: float = 200.0
+    # diurnal: rate * (1 + amplitude * sin(2 pi t / period))
+    period: float = 1440.0
+    amplitude: float = 0.8
+
+    # weight of each priority, index 0 is real time
+    priority_weights: tuple[float, ...] = (1, 2, 2, 2, 2, 2)
+
+    exec_time: str = "exponential"
+    exec_time_min: int = 1
+    exec_time_max: int = 25
+    exec_time_mean: float = 8.0
+    # lognormal parameters of the underlying normal distribution
+    exec_time_mu: float = 1.8
+    exec_time_sigma: float = 0.6
+
+    # memory blocks, uniform in [min, max]
+    memory_min: int = 1
+    memory_max: int = 512
+    real_time_memory_max: int = 64
+
+    # probability of requesting each device
+    printer_probability: float = 0.1
+    scanner_probability: float = 0.1
+    modem_probability: float = 0.1
+    disk_probability: float = 0.1
+
+    def __post_init__(self):
+        if self.arrival not in ARRIVAL_PROCESSES:
+            raise ValueError(f"Unknown arrival process: {self.arrival}")
+        if self.exec_time not in EXEC_TIME_DISTRIBUTIONS:
+            raise ValueError(f"Unknown execution time distribution: {self.exec_time}")
+        if len(self.priority_weights) != 6:
+            raise ValueError("priority_weights needs one weight per priority 0..5")
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "WorkloadSpec":
+        known = {f.name for f in fields(cls)}
+        unknown = set(data) - known
+        if unknown:
+            raise ValueError(f"Unknown workload spec keys: {sorted(unknown)}")
+        data = dict(data)
+        if "priority_weights" in data:
+            data["priority_weights"] = tuple(data["priority_weights"])
+        return cls(**data)
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["priority_weights"] = list(self.priority_weights)
+        return data
+
+
+def _arrival_times(spec: WorkloadSpec, rng: random.Random) -> typing.Iterator[float]:
+    t = 0.0
+
+    if spec.arrival == "poisson":
+        while True:
+            t += rng.expovariate(spec.rate)
+            yield t
+
+    elif spec.arrival == "bursty":
+        bursting = False
+        period_end = rng.expovariate(1 / spec.idle_mean_length)
+        while True:
+            t += rng.expovariate(spec.burst_rate if bursting else spec.rate)
+            # NOTE: the arrival is simply redrawn in the new period, which
+            # is exact for exponential inter-arrival times (memoryless)
+            while t >= period_end:
+                t = period_end
+                bursting = not bursting
+                mean = spec.burst_mean_length if bursting else spec.idle_mean_length
+                period_end += rng.expovariate(1 / mean)
+                t += rng.expovariate(spec.burst_rate if bursting else spec.rate)
+            yield t
+
+    else:  # diurnal
+        # non-homogeneous poisson process by thinning
+        peak = spec.rate * (1 + abs(spec.amplitude))
+        while True:
+            t += rng.expovariate(peak)
+            rate = spec.rate * (1 + spec.amplitude * math.sin(2 * math.pi * t / spec.period))
+            if rng.random() * peak <= rate:
+                yield t
+
+
+def _exec_time(spec: WorkloadSpec, rng: random.Random) -> int:
+    if spec.exec_time == "uniform":
+        value = rng.randint(spec.exec_time_min, spec.exec_time_max)
+    elif spec.exec_time == "exponential":
+        value = round(rng.expovariate(1 / spec.exec_time_mean))
+    else:
+        value = round(rng.lognormvariate(spec.exec_time_mu, spec.exec_time_sigma))
+    return min(max(value, spec.exec_time_min), spec.exec_time_max)
+
+
+def generate(spec: WorkloadSpec) -> typing.Iterator[ProcToBeDispathed]:
+    """Lazily yields the processes of the workload, sorted by created_at.
+    The same spec always yields the same processes.
+    """
+    rng = random.Random(spec.seed)
+    priorities = range(6)
+
+    generated = 0
+    for t in _arrival_times(spec, rng):
+        if spec.num_procs is not None and generated == spec.num_procs:
+            return
+
+        priority = rng.choices(priorities, spec.priority_weights)[0]
+        if priority == 0:
+            memory = rng.randint(1, spec.real_time_memory_max)
+        else:
+            memory = rng.randint(spec.memory_min, spec.memory_max)
+
+        yield ProcToBeDispathed(
+            created_at=int(t),
+            priority=priority,
+            execution_time=_exec_time(spec, rng),
+            memory_needed=memory,
+            requested_printer=int(rng.random() < spec.printer_probability),
+            requested_scanner=int(rng.random() < spec.scanner_probability),
+            requested_modem=int(rng.random() < spec.modem_probability),
+            requested_disk=int(rng.random() < spec.disk_probability),
+        )
+        generated += 1
+
+
+class GeneratedWorkload(ProcStream):
+    """Arrival source feeding a simulation straight from the generator."""
+
+    def __init__(self, spec: WorkloadSpec):
+        self.spec = spec
+        super().__init__(generate(spec))
+
+    def __iter__(self) -> typing.Iterator[ProcToBeDispathed]:
+        # the whole workload again, from the first process
+        return generate(self.spec)
+
+
+def load_spec(path: str) -> WorkloadSpec:
+    with open(path, "r") as f:
+        return WorkloadSpec.from_dict(json.load(f))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic workload generator")
+    parser.add_argument("spec", type=str, nargs="?", help="JSON file with WorkloadSpec fields")
+    parser.add_argument("--num-procs", "-n", type=int, help="Overrides num_procs of the spec")
+    parser.add_argument("--seed", "-s", type=int, help="Overrides seed of the spec")
+    args = parser.parse_args()
+
+    spec = load_spec(args.spec) if args.spec else WorkloadSpec()
+    overrides = {}
+    if args.num_procs is not None:
+        overrides["num_procs"] = args.num_procs
+    if args.seed is not None:
+        overrides["seed"] = args.seed
+    if overrides:
+        spec = WorkloadSpec.from_dict({**spec.to_dict(), **overrides})
+
+    out = sys.stdout
+    for proc in generate(spec):
+        out.write(
+            f"{proc.created_at}, {proc.priority}, {proc.execution_time}, "
+            f"{proc.memory_needed}, {proc.requested_printer}, {proc.requested_scanner}, "
+            f"{proc.requested_modem}, {proc.requested_disk}\n"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+import pytest
+
+from simple_os.config import MachineConfig
+from simple_os.kernel import Kernel
+from simple_os.output import NullSink
+from simple_os.process.pcb import ProcState
+from simple_os.simulation_utils import ProcCreatedTimedList, ProcToBeDispathed
+
+# Helpers
+
+def make_procs(*decls):
+    procs = ProcCreatedTimedList()
+    for decl in decls:
+        procs.append(ProcToBeDispathed(*decl))
+    return procs
+
+WORKLOAD = (
+    (0, 2, 8, 64, 0, 0, 0, 0),
+    (6, 1, 8, 64, 1, 0, 0, 1),
+    (7, 0, 8, 64, 0, 0, 0, 0),
+    (9, 5, 3, 900, 0, 1, 1, 0),
+)
+
+# 1. Independência entre kernels
+
+def test_kernels_do_not_share_state():
+    a = Kernel()
+    b = Kernel()
+
+    assert a.scheduler is not b.scheduler
+    assert a.process_manager.process_table is not b.process_manager.process_table
+    assert a.memory_manager.memory is not b.memory_manager.memory
+    assert a.resource_manager is not b.resource_manager
+
+    a.run(make_procs(*WORKLOAD))
+
+    assert a.process_manager.next_pid == len(WORKLOAD)
+    assert b.process_manager.next_pid == 0
+    assert b.memory_manager.memory.blocks == [None] * 1024
+
+
+def test_same_workload_same_output(capsys):
+    Kernel().run(make_procs(*WORKLOAD))
+    first = capsys.readouterr().out
+
+    Kernel().run(make_procs(*WORKLOAD))
+    second = capsys.readouterr().out
+
+    assert first == second
+    assert "P3 return SIGINT" in first
+
+
+def test_run_finishes_every_process():
+    kernel = Kernel()
+    simulation = kernel.run(make_procs(*WORKLOAD))
+
+    assert kernel.process_manager.existing_processes == 0
+    assert simulation.arrivals.num_unfetched_procs == 0
+    assert simulation.completed == len(WORKLOAD)
+    assert simulation.arrived_at == {}
+    assert all(pcb is None for pcb in kernel.process_manager.process_table)
+
+# 2. Tabela de processos
+
+def test_more_than_a_hundred_live_processes():
+    kernel = Kernel()
+    pm = kernel.process_manager
+    pcbs = [pm.create_process(3, 5, 1, 0, 0, 0, 0) for _ in range(500)]
+
+    assert [pcb.pid for pcb in pcbs] == list(range(500))
+    assert pm.existing_processes == 500
+    assert pm._get_pcb(499) is pcbs[499]
+
+
+def test_freed_slots_are_reused_but_pids_are_not():
+    kernel = Kernel()
+    pm = kernel.process_manager
+    for _ in range(3):
+        pm.create_process(3, 5, 1, 0, 0, 0, 0)
+
+    pm.terminate_process(1)
+    pcb = pm.create_process(3, 5, 1, 0, 0, 0, 0)
+
+    assert pcb.pid == 3
+    assert len(pm.process_table) == 3
+    assert pm.process_table[pm._get_proc_table_idx(3)] is pcb
+    assert pm._get_pcb(1) is None
+
+
+def test_pcb_is_slotted_and_caches_io():
+    pm = Kernel().process_manager
+    plain = pm.create_process(3, 5, 1, 0, 0, 0, 0)
+    printer = pm.create_process(3, 5, 1, 1, 0, 0, 0)
+
+    assert not hasattr(plain, "__dict__")
+    assert plain.using_io is False
+    assert printer.using_io is True
+
+# 3. Múltiplos núcleos
+
+def test_cores_run_in_parallel():
+    decls = [(0, 1, 12, 8, 0, 0, 0, 0) for _ in range(4)]
+    one = Kernel(sink=NullSink()).run(make_procs(*decls))
+    kernel = Kernel(MachineConfig(num_cores=4), NullSink())
+    four = kernel.run(make_procs(*decls))
+
+    assert four.completed == one.completed == 4
+    assert four.makespan * 4 == one.makespan == 48
+    assert four.utilization == [1.0] * 4
+    assert kernel.scheduler.migrations == 0
+
+
+def test_idle_core_steals_work():
+    # placed alternately: the long processes 0 and 2 on core 0, the short
+    # ones on core 1, which takes process 2 once it is done with them
+    long, short = (0, 1, 30, 8, 0, 0, 0, 0), (0, 1, 2, 8, 0, 0, 0, 0)
+    kernel = Kernel(MachineConfig(num_cores=2), NullSink())
+    simulation = kernel.run(make_procs(long, short, long, short))
+
+    assert simulation.completed == 4
+    assert kernel.scheduler.migrations == 1
+    assert simulation.core_busy == [30, 34]
+    assert simulation.makespan == 34
+
+
+def test_affinity_is_respected():
+    decls = [(0, 1, 6, 8, 0, 0, 0, 0)] * 6
+    kernel = Kernel(MachineConfig(num_cores=3, affinity={pid: [2] for pid in range(6)}), NullSink())
+    simulation = kernel.run(make_procs(*decls))
+
+    assert simulation.core_busy == [0, 0, 36]
+    assert kernel.scheduler.migrations == 0
+
+
+def test_real_time_is_not_preempted_on_its_core():
+    decls = [(0, 0, 10, 8, 0, 0, 0, 0), (0, 3, 10, 8, 0, 0, 0, 0), (2, 0, 4, 8, 0, 0, 0, 0)]
+    kernel = Kernel(MachineConfig(num_cores=2), NullSink())
+    simulation = kernel.run(make_procs(*decls))
+
+    # the late real time process waits on a core, its own or core 1's,
+    # and never interrupts the first one
+    assert simulation.completed == 3
+    assert kernel.process_manager.process_table == [None] * len(kernel.process_manager.process_table)
+
+
+def test_invalid_affinity_is_rejected():
+    with pytest.raises(ValueError):
+        Kernel(MachineConfig(num_cores=2, affinity={0: [2]}))
+    with pytest.raises(ValueError):
+        MachineConfig(num_cores=0)
+
+# 4. Filas de espera
+
+def test_only_waiters_of_released_device_are_retried():
+    kernel = Kernel(sink=NullSink())
+    pm = kernel.process_manager
+    holder = pm.create_process(3, 5, 1, 0, 1, 0, 0)
+    modem = pm.create_process(3, 5, 1, 0, 0, 1, 0)
+    first, second = [pm.create_process(3, 5, 1, 0, 1, 0, 0) for _ in range(2)]
+    assert list(pm.wait_queues["scanner"]) == [first.pid, second.pid]
+
+    pm.terminate_process(modem.pid)
+    assert first.state == second.state == ProcState.BLOCKED
+
+    pm.terminate_process(holder.pid)
+    assert first.state == ProcState.READY
+    assert list(pm.wait_queues["scanner"]) == [second.pid]
+    assert pm.waiting_on == {second.pid: "scanner"}
+
+
+def test_memory_waiters_that_fit_are_woken():
+    # 100 blocos de usuário
+    kernel = Kernel(MachineConfig(memory_blocks=164), NullSink())
+    pm = kernel.process_manager
+    big = pm.create_process(3, 5, 60, 0, 0, 0, 0)
+    small = pm.create_process(3, 5, 30, 0, 0, 0, 0)
+    first, second, third = [pm.create_process(3, 5, size, 0, 0, 0, 0) for size in (80, 35, 45)]
+    assert list(pm.wait_queues["memory"]) == [first.pid, second.pid, third.pid]
+
+    # 40 blocos livres: o primeiro não cabe, o segundo sim
+    pm.terminate_process(small.pid)
+    assert first.state == third.state == ProcState.BLOCKED
+    assert second.state == ProcState.READY
+    assert list(pm.wait_queues["memory"]) == [first.pid, third.pid]
+
+    # 65 livres: o terceiro passa na frente do primeiro, que não cabe
+    pm.terminate_process(big.pid)
+    assert first.state == ProcState.BLOCKED
+    assert third.state == ProcState.READY
+    assert pm.waiting_on == {first.pid: "memory"}
+
+
+def test_device_waiter_keeps_its_memory():
+    kernel = Kernel(sink=NullSink())
+    pm = kernel.process_manager
+    holder = pm.create_process(3, 5, 10, 0, 1, 0, 0)
+    waiter = pm.create_process(3, 5, 10, 0, 1, 0, 0)
+    assert pm.waiting_on == {waiter.pid: "scanner"}
+
+    pm.terminate_process(holder.pid)
+    assert waiter.state == ProcState.READY
+    assert waiter.memory_offset == 74
+    assert kernel.memory_manager.memory.segments == {waiter.pid: [(74, 10)]}
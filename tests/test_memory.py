@@ -0,0 +1,330 @@
+import random
+
+import pytest
+
+from simple_os.config import MachineConfig
+from simple_os.kernel import Kernel
+from simple_os.memory.memory_manager import _MemoryManager
+from simple_os.memory.strategies import STRATEGIES
+from simple_os.output import EventSink, NullSink, OutputEvent
+from simple_os.process.pcb import ProcState
+from simple_os.simulation_utils import ProcCreatedTimedList, ProcToBeDispathed
+from simple_os.workload import GeneratedWorkload, WorkloadSpec
+
+# Helpers
+
+def block_first_fit(blocks, start, end, size):
+    # busca bloco a bloco, como o alocador original
+    free_count = 0
+    for i in range(start, end):
+        free_count = free_count + 1 if blocks[i] is None else 0
+        if free_count == size:
+            return i - size + 1
+    return -1
+
+
+class StartsSink(EventSink):
+    """Counts the STARTED flags and keeps the last instruction, per pid,
+    and the pid of every slice.
+    """
+
+    def __init__(self):
+        self.started: dict[int, int] = {}
+        self.last_instruction: dict[int, int] = {}
+        self.slices: list[int] = []
+
+    def emit(self, event, *fields):
+        if event == OutputEvent.EXECUTE:
+            pid, started = fields
+            self.started[pid] = self.started.get(pid, 0) + started
+            self.slices.append(pid)
+        elif event == OutputEvent.INSTRUCTIONS:
+            pid, first_pc, count = fields
+            self.last_instruction[pid] = first_pc + count - 1
+
+
+def churn(mm, rng, steps, max_size):
+    # aloca e libera ao acaso; devolve os pids vivos
+    live = []
+    for pid in range(steps):
+        if live and rng.random() < 0.45:
+            mm.free(live.pop(rng.randrange(len(live))))
+        elif mm.allocate(pid, rng.randint(1, max_size), rng.random() < 0.2)[0] == 0:
+            live.append(pid)
+    return live
+
+# 1. Alocação e liberação
+
+def test_free_coalesces_neighbours():
+    mm = _MemoryManager(total_blocks=100, real_time_blocks=0)
+    for pid in range(4):
+        assert mm.allocate(pid, 10) == (0, pid * 10)
+
+    mm.free(0)
+    mm.free(2)
+    assert mm.region.holes() == [(0, 10), (20, 30), (40, 100)]
+    assert mm.region.by_size == [(10, 0), (10, 20), (60, 40)]
+
+    mm.free(1)
+    mm.free(3)
+    assert mm.region.holes() == [(0, 100)]
+    assert mm.fragmentation().free_blocks == 100
+    assert mm.memory.blocks == [None] * 100
+
+
+def test_every_segment_of_a_process_is_freed():
+    mm = _MemoryManager(total_blocks=100, real_time_blocks=20)
+    mm.allocate(7, 5, is_real_time=True)
+    mm.allocate(7, 30)
+    mm.allocate(7, 30)
+
+    assert mm.memory.segments[7] == [(0, 5), (20, 30), (50, 30)]
+    assert mm.allocate(8, 30) == (1, None)
+    assert mm.allocate(8, 90) == (2, None)
+
+    mm.free(7)
+    assert mm.memory.segments == {}
+    assert mm.real_time_region.holes() == [(0, 20)]
+    assert mm.region.holes() == [(20, 100)]
+
+
+def test_same_offsets_as_block_first_fit():
+    rng = random.Random(1)
+    mm = _MemoryManager(total_blocks=256, real_time_blocks=32)
+    blocks = [None] * 256
+    live = []
+
+    for pid in range(2000):
+        if live and rng.random() < 0.45:
+            freed = live.pop(rng.randrange(len(live)))
+            mm.free(freed)
+            blocks = [None if owner == freed else owner for owner in blocks]
+            continue
+
+        is_real_time = rng.random() < 0.2
+        start, end = (0, 32) if is_real_time else (32, 256)
+        size = rng.randint(1, 40)
+        status, offset = mm.allocate(pid, size, is_real_time)
+
+        if size > end - start:
+            assert status == 2
+            continue
+        expected = block_first_fit(blocks, start, end, size)
+        assert offset == (None if expected == -1 else expected)
+        if status == 0:
+            blocks[offset:offset + size] = [pid] * size
+            live.append(pid)
+
+    assert mm.memory.blocks == blocks
+
+
+def test_restore_rebuilds_holes():
+    mm = _MemoryManager(total_blocks=100, real_time_blocks=20)
+    mm.restore({1: [(5, 5)], 2: [(30, 10), (60, 40)]})
+
+    assert mm.real_time_region.holes() == [(0, 5), (10, 20)]
+    assert mm.region.holes() == [(20, 30), (40, 60)]
+    assert mm.allocate(3, 15) == (0, 40)
+
+# 2. Estratégias
+
+def test_unknown_strategy():
+    with pytest.raises(ValueError):
+        _MemoryManager(strategy="random_fit")
+
+
+@pytest.mark.parametrize("strategy, offset", [
+    ("first_fit", 0), ("best_fit", 40), ("worst_fit", 60), ("next_fit", 60), ("segregated", 40),
+])
+def test_hole_choice(strategy, offset):
+    # buracos de 10 em 0, de 5 em 40 e de 40 em 60
+    mm = _MemoryManager(total_blocks=100, real_time_blocks=0, strategy=strategy)
+    mm.restore({1: [(10, 30)], 2: [(45, 15)]}, [[], [50]])
+
+    assert mm.allocate(3, 5) == (0, offset)
+
+
+def test_next_fit_wraps_around():
+    mm = _MemoryManager(total_blocks=100, real_time_blocks=0, strategy="next_fit")
+    for pid in range(5):
+        mm.allocate(pid, 20)
+    mm.free(1)
+
+    assert mm.allocate(5, 20) == (0, 20)
+    mm.free(0)
+    mm.free(2)
+    assert mm.allocate(6, 10) == (0, 40)
+    assert mm.allocate(7, 15) == (0, 0)
+
+
+def test_buddy_splits_and_merges():
+    mm = _MemoryManager(total_blocks=96, real_time_blocks=0, strategy="buddy")
+    # 96 blocos: um bloco de 64 e um de 32
+    assert mm.region.capacity == 64
+    assert mm.allocate(1, 100)[0] == 2
+    assert mm.allocate(2, 64)[0] == 0
+    assert mm.allocate(3, 5) == (0, 64)   # 32 -> 16 -> 8
+    assert mm.allocate(4, 8) == (0, 72)
+    assert mm.region.holes() == [(80, 96)]
+    assert mm.allocate(5, 20) == (1, None)
+
+    mm.free(3)
+    mm.free(4)
+    assert mm.region.holes() == [(64, 96)]
+    mm.free(2)
+    # os dois blocos iniciais nunca se juntam
+    assert mm.region.holes() == [(0, 64), (64, 96)]
+
+
+@pytest.mark.parametrize("strategy", STRATEGIES)
+def test_strategies_keep_free_space_consistent(strategy):
+    mm = _MemoryManager(total_blocks=512, real_time_blocks=64, strategy=strategy)
+    live = churn(mm, random.Random(2), 3000, 60)
+
+    blocks = mm.memory.blocks
+    for region in (mm.real_time_region, mm.region):
+        holes = region.holes()
+        assert sum(end - start for start, end in holes) == region.free_blocks
+        assert all(owner is None for start, end in holes for owner in blocks[start:end])
+    assert mm.allocations > 0 and mm.failed_allocations > 0
+
+    # reconstruída a partir dos segmentos, a memória livre é a mesma
+    restored = _MemoryManager(total_blocks=512, real_time_blocks=64, strategy=strategy)
+    restored.restore({pid: list(s) for pid, s in mm.memory.segments.items()}, mm.state())
+    assert restored.region.holes() == mm.region.holes()
+
+    for pid in live:
+        mm.free(pid)
+    assert mm.region.free_blocks == 448
+    assert mm.real_time_region.free_blocks == 64
+
+
+def test_fragmentation_metrics():
+    mm = _MemoryManager(total_blocks=100, real_time_blocks=0)
+    mm.restore({1: [(10, 30)], 2: [(45, 15)]})
+
+    fragmentation = mm.fragmentation()
+    assert fragmentation.free_blocks == 55
+    assert fragmentation.largest_hole == 40
+    assert fragmentation.external == pytest.approx(15 / 55)
+    assert fragmentation.histogram == {2: 1, 3: 1, 5: 1}
+
+    mm.allocate(3, 50)
+    mm.allocate(4, 40)
+    assert mm.failed_allocations == 1
+    # depois da segunda: buracos de 10 e 5
+    assert mm.mean_fragmentation == pytest.approx((15 / 55 + 5 / 15) / 2)
+
+# 3. Segmentos de cada processo
+
+def test_segments_match_the_holes():
+    mm = _MemoryManager(total_blocks=300, real_time_blocks=20)
+    churn(mm, random.Random(3), 1000, 40)
+
+    blocks = mm.memory.blocks
+    free = [i for i, owner in enumerate(blocks) if owner is None]
+    holes = mm.real_time_region.holes() + mm.region.holes()
+    assert free == [i for start, end in holes for i in range(start, end)]
+    assert mm.memory.used_blocks == 300 - len(free)
+
+
+def test_millions_of_blocks():
+    config = MachineConfig(memory_blocks=4_000_000, real_time_blocks=250_000)
+    kernel = Kernel(config, NullSink())
+    spec = WorkloadSpec(seed=1, num_procs=200, rate=0.5, memory_min=10_000, memory_max=200_000)
+    simulation = kernel.run(GeneratedWorkload(spec))
+
+    assert simulation.completed == 200
+    assert kernel.memory_manager.memory.used_blocks == 0
+
+
+def test_invalid_memory_sizes():
+    with pytest.raises(ValueError):
+        MachineConfig(memory_blocks=0)
+    with pytest.raises(ValueError):
+        MachineConfig(memory_blocks=100, real_time_blocks=200)
+
+# 4. Compactação
+
+def test_compaction_moves_the_cheapest_window():
+    mm = _MemoryManager(total_blocks=100, real_time_blocks=0, compaction=True)
+    mm.restore({1: [(0, 10)], 2: [(20, 40)], 3: [(65, 5)], 4: [(80, 20)]})
+    # buracos de 10, 5 e 10 blocos
+    assert mm.plan_compaction(mm.region, 15) == (60, 80, 5)
+    assert mm.plan_compaction(mm.region, 25) == (10, 80, 45)
+
+    assert mm.allocate(5, 26) == (1, None)
+    assert mm.compactions == 0
+    assert mm.allocate(5, 15) == (0, 65)
+    assert mm.memory.segments[3] == [(60, 5)]
+    assert mm.region.holes() == [(10, 20)]
+    assert mm.memory.blocks[58:82] == [2] * 2 + [3] * 5 + [5] * 15 + [4] * 2
+    assert (mm.compactions, mm.rescued, mm.moved_blocks, mm.compaction_time) == (1, 1, 5, 1)
+    assert mm.failed_allocations == 1
+
+
+def test_compaction_relocates_processes():
+    config = MachineConfig(memory_blocks=164, compaction=True, compaction_rate=10)
+    kernel = Kernel(config, NullSink())
+    pm = kernel.process_manager
+    first, second, third = [pm.create_process(1, 5, 30, 0, 0, 0, 0) for _ in range(3)]
+    pm.terminate_process(first.pid)
+
+    # 40 blocos livres, em buracos de 30 e 10
+    rescued = pm.create_process(1, 5, 35, 0, 0, 0, 0)
+    assert (second.memory_offset, third.memory_offset, rescued.memory_offset) == (64, 94, 124)
+    assert rescued.state == ProcState.READY
+    assert pm.memory_blocked_count == 0
+    mm = kernel.memory_manager
+    assert mm.memory.used_blocks == 95
+
+    # 60 blocos copiados a 10 por unidade de tempo: espera 6 antes de rodar
+    assert rescued.time_left == 5
+    assert mm.execute(rescued, 4) == 0
+    assert mm.execute(rescued, 4) == 2
+    assert mm.owed == {}
+
+
+def test_compaction_time_runs_no_instructions():
+    workload = GeneratedWorkload(WorkloadSpec(seed=5, num_procs=80, rate=0.5, memory_max=128))
+    sink = StartsSink()
+    config = MachineConfig(memory_blocks=448, memory_strategy="next_fit", compaction=True, compaction_rate=4)
+    kernel = Kernel(config, sink)
+    simulation = kernel.run(workload)
+
+    assert kernel.memory_manager.compaction_time > 0
+    assert set(sink.started.values()) == {1}
+    time_needed = [proc.execution_time for proc in workload]
+    assert all(pc <= time_needed[pid] for pid, pc in sink.last_instruction.items())
+    assert sum(pc == time_needed[pid] for pid, pc in sink.last_instruction.items()) == simulation.completed
+
+
+def test_compaction_keeps_real_time_slices_whole():
+    procs = ProcCreatedTimedList()
+    for decl in (
+        (0, 0, 1, 20, 0, 0, 0, 0),
+        (0, 0, 5, 20, 0, 0, 0, 0),
+        (0, 0, 5, 20, 0, 0, 0, 0),
+        # 24 blocos livres em dois buracos: compacta, 40 blocos a 4 por unidade
+        (2, 0, 5, 22, 0, 0, 0, 0),
+        (3, 0, 2, 2, 0, 0, 0, 0),
+    ):
+        procs.append(ProcToBeDispathed(*decl))
+    sink = StartsSink()
+    kernel = Kernel(MachineConfig(compaction=True, compaction_rate=4), sink)
+    simulation = kernel.run(procs)
+
+    assert kernel.memory_manager.compaction_time == 10
+    assert sink.slices == [0, 1, 2, 3, 4]
+    assert simulation.completed == 5
+
+
+def test_compaction_needs_contiguous_memory():
+    with pytest.raises(ValueError):
+        MachineConfig(memory_strategy="buddy", compaction=True)
+    with pytest.raises(ValueError):
+        MachineConfig(paging=True, compaction=True)
+    with pytest.raises(ValueError):
+        MachineConfig(compaction_rate=0)
+    with pytest.raises(ValueError):
+        _MemoryManager(strategy="buddy", compaction=True)
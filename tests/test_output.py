@@ -0,0 +1,70 @@
+import io
+import json
+
+from simple_os.kernel import Kernel
+from simple_os.output import CountingSink, JsonlSink, NullSink, OutputEvent, TextSink
+from simple_os.simulation_utils import ProcCreatedTimedList, ProcToBeDispathed
+
+# Helpers
+
+def run_with(sink):
+    procs = ProcCreatedTimedList()
+    procs.append(ProcToBeDispathed(0, 1, 8, 64, 0, 0, 0, 0))
+    procs.append(ProcToBeDispathed(3, 0, 2, 64, 0, 0, 0, 0))
+    procs.append(ProcToBeDispathed(4, 5, 2, 2000, 0, 0, 0, 0))
+    Kernel(sink=sink).run(procs)
+    sink.close()
+
+# 1. Texto
+
+def test_text_sink_expands_instruction_ranges():
+    out = io.StringIO()
+    sink = TextSink(out)
+    sink.emit(OutputEvent.EXECUTE, 3, True)
+    sink.emit(OutputEvent.INSTRUCTIONS, 3, 1, 2)
+    sink.emit(OutputEvent.QUANTUM_EXPIRED, 3)
+
+    assert out.getvalue() == (
+        "\nprocess 3 =>\n"
+        "P3 STARTED\n"
+        "P3 instruction 1\n"
+        "P3 instruction 2\n"
+        "P3 used its quantum\n"
+    )
+
+
+def test_text_sink_run():
+    out = io.StringIO()
+    run_with(TextSink(out))
+    text = out.getvalue()
+
+    assert "P0 interrupted" in text
+    assert "P1 return SIGINT" in text
+    assert "P2 terminated for ProcBlockedReason.TOO_LARGE_MEM_REQUEST" in text
+
+# 2. Outros modos
+
+def test_counting_sink():
+    sink = CountingSink(io.StringIO())
+    run_with(sink)
+    counts = sink.summary()
+
+    assert counts["instructions"] == 10
+    assert counts["exit"] == 2
+    assert counts["kill"] == 1
+    assert counts["preempted"] == 1
+
+
+def test_jsonl_sink():
+    out = io.StringIO()
+    run_with(JsonlSink(out, buffer_size=2))
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+
+    kill = next(r for r in records if r["event"] == "kill")
+    assert kill == {"event": "kill", "pid": 2, "reason": "TOO_LARGE_MEM_REQUEST"}
+    assert sum(r["count"] for r in records if r["event"] == "instructions") == 10
+
+
+def test_null_sink_prints_nothing(capsys):
+    run_with(NullSink())
+    assert capsys.readouterr().out == ""
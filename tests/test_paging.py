@@ -0,0 +1,161 @@
+import pytest
+
+from simple_os.config import MachineConfig
+from simple_os.kernel import Kernel
+from simple_os.memory.paging import REPLACEMENT_POLICIES, _PagedMemoryManager
+from simple_os.output import EventSink, NullSink, OutputEvent
+from simple_os.simulation_utils import ProcCreatedTimedList, ProcToBeDispathed
+from simple_os.workload import GeneratedWorkload, WorkloadSpec
+
+# Helpers
+
+def make_procs(*decls):
+    procs = ProcCreatedTimedList()
+    for decl in decls:
+        procs.append(ProcToBeDispathed(*decl))
+    return procs
+
+
+def resident(mm, pid):
+    return {page for page, frame in enumerate(mm.page_tables[pid]) if frame != -1}
+
+
+def touch(mm, pid, pages):
+    return sum(mm._reference(pid, mm.page_tables[pid], page) for page in pages)
+
+
+class InstructionsSink(EventSink):
+    """Keeps the STARTED flags and the instructions run, per pid."""
+
+    def __init__(self):
+        self.started: dict[int, int] = {}
+        self.last_instruction: dict[int, int] = {}
+
+    def emit(self, event, *fields):
+        if event == OutputEvent.EXECUTE:
+            pid, started = fields
+            self.started[pid] = self.started.get(pid, 0) + started
+        elif event == OutputEvent.INSTRUCTIONS:
+            pid, first_pc, count = fields
+            self.last_instruction[pid] = first_pc + count - 1
+
+
+def spec(seed, num_procs, rate):
+    # sem dispositivos, nenhum processo fica bloqueado
+    return WorkloadSpec(
+        seed=seed, num_procs=num_procs, rate=rate, memory_max=900,
+        printer_probability=0, scanner_probability=0, modem_probability=0, disk_probability=0,
+    )
+
+# 1. Substituição de páginas
+
+@pytest.mark.parametrize("replacement, pages, expected", [
+    ("fifo", [0, 1, 2, 0, 3], {1, 2, 3}),
+    ("lru", [0, 1, 2, 0, 3], {0, 2, 3}),
+    ("clock", [0, 1, 2, 0, 3], {1, 2, 3}),
+    ("fifo", [0, 1, 2, 3, 1, 4], {2, 3, 4}),
+    ("lru", [0, 1, 2, 3, 1, 4], {1, 3, 4}),
+    ("clock", [0, 1, 2, 3, 1, 4], {1, 3, 4}),
+    ("working_set", [0, 1, 2, 3, 1, 4], {1, 3, 4}),
+])
+def test_replacement_policies(replacement, pages, expected):
+    # 3 frames of 16 blocks, a process of 5 pages
+    mm = _PagedMemoryManager(48, 0, replacement=replacement)
+    mm.allocate(0, 80)
+
+    faults = touch(mm, 0, pages)
+    assert resident(mm, 0) == expected
+    assert mm.evictions == faults - 3
+
+
+def test_working_set_keeps_recent_pages():
+    mm = _PagedMemoryManager(48, 0, replacement="working_set")
+    mm.allocate(0, 80)
+    touch(mm, 0, [0, 1, 2])
+    # page 0 leaves the working set, 1 and 2 stay in it
+    touch(mm, 0, [1, 2] * 40)
+    touch(mm, 0, [3])
+
+    assert resident(mm, 0) == {1, 2, 3}
+
+# 2. TLB
+
+def test_tlb_hits_and_misses():
+    mm = _PagedMemoryManager(160, 0, tlb_entries=2)
+    mm.allocate(0, 160)
+
+    assert touch(mm, 0, [0, 0, 1, 2, 0]) == 3
+    assert mm.references == 5
+    # page 0 left the TLB but is still loaded
+    assert mm.tlb_hits == 1
+    assert mm.page_faults == 3
+    assert list(mm.tlb) == [(0, 2), (0, 0)]
+
+
+def test_free_drops_pages_and_tlb_entries():
+    mm = _PagedMemoryManager(160, 32)
+    mm.allocate(0, 64)
+    assert mm.allocate(1, 32, is_real_time=True) == (0, 0)
+    assert mm.allocate(2, 16, is_real_time=True) == (1, None)
+    assert mm.allocate(3, 48, is_real_time=True) == (2, None)
+    touch(mm, 0, [0, 1])
+
+    mm.free(0)
+    mm.free(1)
+    assert mm.tlb == {}
+    assert len(mm.free_frames) == mm.num_frames == 8
+    assert mm.real_time_free == 2
+
+# 3. Simulação
+
+def test_process_larger_than_memory_runs():
+    decl = (0, 2, 20, 4000, 0, 0, 0, 0)
+    contiguous = Kernel(sink=NullSink())
+    contiguous.run(make_procs(decl))
+    paged = Kernel(MachineConfig(paging=True), NullSink())
+    simulation = paged.run(make_procs(decl))
+
+    assert contiguous.process_manager.killed_count == 1
+    assert paged.process_manager.killed_count == 0
+    assert simulation.completed == 1
+    assert paged.memory_manager.page_faults > 0
+
+
+def test_page_faults_slow_processes_down():
+    makespans = []
+    for cost in (0, 5):
+        kernel = Kernel(MachineConfig(memory_blocks=320, paging=True, page_fault_cost=cost), NullSink())
+        simulation = kernel.run(GeneratedWorkload(spec(2, 60, 0.2)))
+        mm = kernel.memory_manager
+        assert simulation.completed == 60
+        assert mm.stall_time <= mm.page_faults * cost
+        makespans.append(simulation.makespan)
+
+    assert makespans[1] > makespans[0]
+
+
+@pytest.mark.parametrize("replacement", REPLACEMENT_POLICIES)
+def test_every_frame_is_owned_once(replacement):
+    kernel = Kernel(MachineConfig(memory_blocks=256, paging=True, page_replacement=replacement), NullSink())
+    simulation = kernel.start(GeneratedWorkload(spec(6, 100, 0.3)))
+    simulation.run(until=150)
+
+    mm = kernel.memory_manager
+    loaded = {frame: owner for frame, owner in enumerate(mm.frame_owner) if owner is not None}
+    assert len(loaded) + len(mm.free_frames) == mm.num_frames
+    assert all(mm.page_tables[pid][page] == frame for frame, (pid, page) in loaded.items())
+    assert all(mm.page_tables[pid][page] == frame for (pid, page), frame in mm.tlb.items())
+    assert mm.evictions > 0
+
+
+def test_stalls_run_no_instructions():
+    workload = GeneratedWorkload(WorkloadSpec(seed=1, num_procs=40))
+    sink = InstructionsSink()
+    kernel = Kernel(MachineConfig(memory_blocks=128, paging=True, tlb_entries=4), sink)
+    simulation = kernel.run(workload)
+
+    assert kernel.memory_manager.stall_time > 0
+    assert sink.started and set(sink.started.values()) == {1}
+    time_needed = [proc.execution_time for proc in workload]
+    assert all(pc <= time_needed[pid] for pid, pc in sink.last_instruction.items())
+    assert sum(pc == time_needed[pid] for pid, pc in sink.last_instruction.items()) == simulation.completed
@@ -0,0 +1,63 @@
+import io
+import json
+
+from simple_os.kernel import Kernel
+from simple_os.memory.memory_manager import _MemoryManager
+from simple_os.output import TextSink
+from simple_os.profiling import Profiler
+from simple_os.simulation_utils import parse_procs_decl
+
+# 1. Sem profiler nada muda
+
+def test_disabled_profiler_wraps_nothing():
+    kernel = Kernel()
+
+    assert kernel.profiler is None
+    assert "allocate" not in vars(kernel.memory_manager)
+    assert "apply_aging" not in vars(kernel.scheduler)
+
+
+def test_profiled_run_gives_same_output():
+    plain = io.StringIO()
+    Kernel(sink=TextSink(plain)).run(parse_procs_decl("t/p_mem_block.txt", TextSink(io.StringIO())))
+
+    profiled = io.StringIO()
+    profiler = Profiler()
+    Kernel(sink=TextSink(profiled), profiler=profiler).run(
+        parse_procs_decl("t/p_mem_block.txt", TextSink(io.StringIO()))
+    )
+
+    assert profiled.getvalue() == plain.getvalue()
+    assert profiler.counters["simulation.run"].calls == 1
+    assert profiler.counters["process_manager.create_process"].calls == 6
+    assert profiler.counters["process_manager.unblock_processes_when_possible"].work > 0
+
+# 2. Unidades de trabalho
+
+def test_contiguous_space_work_is_holes_examined():
+    profiler = Profiler()
+    kernel = Kernel(profiler=profiler)
+    mm: _MemoryManager = kernel.memory_manager
+
+    mm.allocate(0, 10)  # blocks 64..73
+    mm.allocate(1, 5)   # blocks 74..78
+    mm.allocate(2, 5)   # blocks 79..83
+    mm.free(1)
+    mm.allocate(3, 8)   # too large for the hole at 74, examines 2 holes
+    mm.allocate(4, 950) # larger than any hole, examines none
+
+    counter = profiler.counters["memory_manager.find_contiguous_space"]
+    assert counter.calls == 5
+    assert counter.work == 1 + 1 + 1 + 2
+
+
+def test_summary_and_json(tmp_path):
+    profiler = Profiler()
+    Kernel(sink=TextSink(io.StringIO()), profiler=profiler).run(
+        parse_procs_decl("t/p_prios.txt", TextSink(io.StringIO()))
+    )
+
+    assert profiler.summary().splitlines()[0].startswith("entry point")
+    path = tmp_path / "profile.json"
+    profiler.write_json(str(path))
+    assert json.loads(path.read_text())["scheduler.dispatch"]["calls"] > 0
@@ -1,4 +1,11 @@
+import pytest
+
+from simple_os.config import MachineConfig
+from simple_os.kernel import Kernel
+from simple_os.output import NullSink
+from simple_os.process.pcb import ProcState
 from simple_os.resource.resource_manager import _ResourceManager
+from simple_os.resource.safety import _SafetyChecker
 
 # Helpers
 
@@ -169,3 +176,179 @@ def test_reentrant_sata():
     assert alloc_ok(rm, 7, need_sata=True)
     assert alloc_ok(rm, 7, need_sata=True)
     assert rm.sata[0] == 7
+
+# 9. Pools configuráveis
+
+def test_large_pools():
+    rm = _ResourceManager({"printer": 64, "sata": 128})
+
+    assert [rm.acquire(pid, need_printer=True) for pid in range(3)] == [
+        [("printer", 63)], [("printer", 62)], [("printer", 61)],
+    ]
+    for pid in range(3, 64):
+        assert alloc_ok(rm, pid, need_printer=True, need_sata=True)
+    assert rm.busy_device(64, need_printer=True) == "printer"
+    assert rm.acquire(64, need_printer=True, need_sata=True) is None
+    assert rm.pools["sata"].free.bit_count() == 128 - 61
+
+    assert rm.release(10) == {"printer": [53], "sata": [120]}
+    assert rm.acquire(64, need_printer=True) == [("printer", 53)]
+    assert rm.held[64] == {"printer": [53]}
+
+
+def test_release_gives_back_every_device():
+    rm = _ResourceManager()
+    rm.request_resources(5, need_printer=True, need_sata=True)
+    rm.request_resources(5, need_printer=True, need_sata=True)
+
+    ok, msg = rm.release_resources(5)
+    assert ok
+    assert msg.endswith("printer[1], printer[0], sata[2], sata[1]")
+    assert rm.printers == [None, None]
+    assert rm.sata == [None, None, None]
+    assert rm.held == {}
+
+
+def test_restore_rebuilds_free_devices():
+    rm = _ResourceManager()
+    rm.restore({"scanner": [3], "modem": [None], "printer": [None, 3], "sata": [4, None, 3]})
+
+    assert rm.held == {3: {"scanner": [0], "printer": [1], "sata": [2]}, 4: {"sata": [0]}}
+    assert alloc_fail(rm, 5, need_scanner=True)
+    assert rm.acquire(5, need_printer=True, need_sata=True, need_modem=True) == [
+        ("modem", 0), ("printer", 0), ("sata", 1),
+    ]
+
+
+def test_machine_devices():
+    kernel = Kernel(MachineConfig(devices={"printer": 5}))
+    assert {name: pool.count for name, pool in kernel.resource_manager.pools.items()} == {
+        "scanner": 1, "modem": 1, "printer": 5, "sata": 3,
+    }
+    with pytest.raises(ValueError):
+        MachineConfig(devices={"tape": 1})
+    with pytest.raises(ValueError):
+        MachineConfig(devices={"printer": 0})
+
+# 10. Deadlock
+
+def test_packed_rows():
+    safety = _SafetyChecker([3, 1, 7, 2])
+    a, b = safety.pack([3, 0, 5, 2]), safety.pack([2, 1, 7, 2])
+
+    assert safety.le(b, safety.total)
+    assert not safety.le(a, b)
+    assert safety.le(safety.pack([2, 0, 5, 2]), a)
+    assert safety.unpack(safety.minus(a, b), 4) == [1, 0, 0, 0]
+    assert safety.unpack(safety.minus(b, a), 4) == [0, 1, 2, 0]
+
+
+def test_banker_delays_unsafe_request():
+    # pids 1 and 2 may both need the scanner and the modem
+    rm = _ResourceManager(deadlock="avoid")
+    rm.declare(1, need_scanner=True, need_modem=True)
+    rm.declare(2, need_scanner=True, need_modem=True)
+
+    assert rm.acquire(1, need_scanner=True) == [("scanner", 0)]
+    # the modem is free, but with it nobody could finish
+    assert rm.acquire(2, need_modem=True) is None
+    assert rm.safety.refused == 1
+    assert rm.acquire(1, need_modem=True) == [("modem", 0)]
+
+    rm.release(1)
+    assert rm.acquire(2, need_modem=True, need_scanner=True) is not None
+    assert rm.deadlocked() == []
+
+
+def test_unsafe_request_counted_once():
+    rm = _ResourceManager(deadlock="avoid")
+    rm.declare(1, need_scanner=True, need_modem=True)
+    rm.declare(2, need_scanner=True, need_modem=True)
+    rm.acquire(1, need_scanner=True)
+
+    # retried while still unsafe
+    for _ in range(3):
+        assert rm.acquire(2, need_modem=True) is None
+    assert rm.safety.refused == 1
+
+    rm.release(1)
+    assert rm.acquire(2, need_modem=True) is not None
+    # a request delayed later counts again
+    rm.declare(3, need_scanner=True, need_modem=True)
+    for _ in range(2):
+        assert rm.acquire(3, need_scanner=True) is None
+    assert rm.safety.refused == 2
+
+
+def test_unsafe_request_message():
+    rm = _ResourceManager(deadlock="avoid")
+    rm.declare(1, need_scanner=True, need_modem=True)
+    rm.declare(2, need_scanner=True, need_modem=True)
+
+    assert alloc_ok(rm, 1, need_scanner=True)
+    assert rm.request_resources(2, need_modem=True) == (False, "Request delayed: unsafe state")
+
+
+def test_unsafe_request_retried_on_release():
+    kernel = Kernel(MachineConfig(deadlock="avoid"), NullSink())
+    pm, rm = kernel.process_manager, kernel.resource_manager
+    holder = pm.create_process(1, 10, 16, 1, 0, 0, 0)
+    # pids outside the simulation, each holding what the other may ask for
+    rm.acquire(98, need_scanner=True)
+    rm.acquire(99, need_modem=True)
+    rm.declare(98, need_scanner=True, need_modem=True)
+    rm.declare(99, need_scanner=True, need_modem=True)
+
+    delayed = pm.create_process(1, 10, 16, 1, 0, 0, 0)
+    assert delayed.state == ProcState.BLOCKED
+    assert pm.waiting_on == {delayed.pid: "unsafe"}
+
+    rm.release(99)
+    pm.terminate_process(holder.pid)
+    assert delayed.state == ProcState.READY
+    assert rm.held[delayed.pid] == {"printer": [1]}
+    assert not pm.waiting_on
+
+
+def test_detects_circular_wait():
+    rm = _ResourceManager({"printer": 1}, deadlock="detect")
+    rm.acquire(1, need_scanner=True)
+    rm.acquire(2, need_modem=True)
+    rm.acquire(3, need_printer=True)
+    # 3 waits on the others, but is not part of the cycle
+    assert rm.acquire(3, need_modem=True) is None
+    assert rm.acquire(1, need_modem=True) is None
+    assert rm.deadlocked() == []
+    assert rm.acquire(2, need_scanner=True) is None
+
+    assert rm.deadlocked() == [1, 2, 3]
+    rm.release(2)
+    assert rm.deadlocked() == []
+
+
+def test_kills_youngest_deadlocked_process():
+    kernel = Kernel(MachineConfig(deadlock="detect"), NullSink())
+    pm, rm = kernel.process_manager, kernel.resource_manager
+    first = pm.create_process(1, 10, 16, 0, 1, 0, 0)
+    second = pm.create_process(1, 10, 16, 0, 0, 1, 0)
+    kernel.scheduler.get_next_exec_time_and_proc()
+    kernel.scheduler.get_next_exec_time_and_proc()
+    # each asks, in a second step, for the device of the other
+    first.using_modem = second.using_scanner = True
+    for pcb in (first, second):
+        pm._wait(pcb.pid, pm.resolve_process_resource_requests(pcb))
+    assert rm.deadlocked() == [first.pid, second.pid]
+    pm.recover_from_deadlock()
+
+    assert pm.deadlock_victims == pm.killed_count == 1
+    assert pm._get_pcb(second.pid) is None
+    assert rm.held == {first.pid: {"scanner": [0], "modem": [0]}}
+    assert first.state == ProcState.READY
+    assert not pm.waiting_on
+
+
+def test_machine_deadlock_handling():
+    assert Kernel(MachineConfig()).resource_manager.safety is None
+    assert Kernel(MachineConfig(deadlock="avoid")).resource_manager.deadlock == "avoid"
+    with pytest.raises(ValueError):
+        MachineConfig(deadlock="ignore")
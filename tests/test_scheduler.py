@@ -0,0 +1,197 @@
+import pytest
+
+from simple_os.cpu import _CPU
+from simple_os.output import NullSink
+from simple_os.process.pcb import PCB, ProcState
+from simple_os.process.scheduler import _Scheduler
+
+# Helpers
+
+def make_pcb(pid, priority, time_left=10):
+    return PCB(
+        pid=pid,
+        starting_priority=priority,
+        time_needed=time_left,
+        is_preemptable=priority == 0,
+        marked_for_termination=False,
+        memory_needed=None,
+        memory_offset=0,
+        memory_num_allocated_blocks=1,
+        time_left=time_left,
+        priority=priority,
+        state=ProcState.READY,
+        blocked_reason=None,
+        pc=0,
+        using_scanner=False,
+        requested_printer=0,
+        using_modem=False,
+        requested_sata=0,
+    )
+
+
+def make_scheduler(pcbs, quantum_table=None, **policies):
+    scheduler = _Scheduler(_CPU(NullSink()), quantum_table, NullSink(), **policies)
+    table = {pcb.pid: pcb for pcb in pcbs}
+    scheduler.register_process_lookup(table.get)
+    for pcb in pcbs:
+        scheduler.add_ready_process(pcb)
+    return scheduler
+
+# 1. Filas de prontos
+
+def test_highest_priority_first_and_fifo_within_level():
+    scheduler = make_scheduler([
+        make_pcb(0, 3), make_pcb(1, 1), make_pcb(2, 3), make_pcb(3, 0, time_left=7),
+    ])
+
+    order = [scheduler.get_next_exec_time_and_proc() for _ in range(4)]
+
+    assert [(t, pcb.pid) for t, pcb in order] == [(7, 3), (6, 1), (4, 0), (4, 2)]
+    assert scheduler.policy.ready_levels == 0
+    assert scheduler.get_next_exec_time_and_proc() == (None, None)
+
+
+def test_many_levels():
+    table = {prio: 1 for prio in range(1, 40)}
+    scheduler = make_scheduler([make_pcb(0, 39), make_pcb(1, 17)], table)
+
+    assert scheduler.num_queues == 40
+    assert scheduler.get_next_exec_time_and_proc()[1].pid == 1
+
+    pcb = scheduler.get_next_exec_time_and_proc()[1]
+    scheduler.requeue_after_execution(pcb, 1)
+    assert pcb.priority == 39  # already the lowest level
+
+
+def test_missing_level_is_rejected():
+    with pytest.raises(ValueError):
+        _Scheduler(_CPU(NullSink()), {1: 6, 3: 4})
+
+# 2. Envelhecimento
+
+def test_aging_promotes_one_level():
+    scheduler = make_scheduler([make_pcb(0, 3), make_pcb(1, 2)])
+
+    scheduler.apply_aging(19)
+    assert scheduler.policy.ready_levels == 0b1100
+
+    scheduler.apply_aging(1)
+    assert scheduler.policy.ready_pids(1) == [1] and scheduler.policy.ready_pids(2) == [0]
+    assert scheduler.policy.ready_levels == 0b0110
+    assert scheduler.get_next_exec_time_and_proc()[1].priority == 1
+
+# 3. Políticas
+
+def run_slices(scheduler, num_slices):
+    """Runs num_slices slices, requeueing every process. Returns the
+    time each pid got.
+    """
+    ran = {}
+    for _ in range(num_slices):
+        exec_time, pcb = scheduler.get_next_exec_time_and_proc()
+        pcb.time_left -= exec_time
+        ran[pcb.pid] = ran.get(pcb.pid, 0) + exec_time
+        scheduler.apply_aging(exec_time)
+        scheduler.requeue_after_execution(pcb, exec_time)
+    return ran
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        _Scheduler(_CPU(NullSink()), policy="round robin")
+    with pytest.raises(ValueError):
+        _Scheduler(_CPU(NullSink()), real_time_policy="mlfq")
+
+
+def test_edf_runs_earliest_deadline_first():
+    scheduler = make_scheduler(
+        [make_pcb(0, 0, time_left=9), make_pcb(1, 3), make_pcb(2, 0, time_left=2)],
+        real_time_policy="edf",
+    )
+
+    order = [scheduler.get_next_exec_time_and_proc() for _ in range(3)]
+
+    assert [(t, pcb.pid) for t, pcb in order] == [(2, 2), (9, 0), (4, 1)]
+
+
+def test_edf_deadline_counts_from_ready():
+    first = make_pcb(0, 0, time_left=9)
+    scheduler = make_scheduler([first], real_time_policy="edf")
+    scheduler.apply_aging(8)
+    later = make_pcb(1, 0, time_left=2)
+    scheduler.register_process_lookup({0: first, 1: later}.get)
+    scheduler.add_ready_process(later)
+
+    assert scheduler.get_next_exec_time_and_proc()[1] is first
+
+
+@pytest.mark.parametrize("policy", ["cfs", "stride", "lottery"])
+def test_share_follows_priority(policy):
+    pcbs = [make_pcb(pid, 1 + pid % 5, time_left=10**9) for pid in range(10)]
+    scheduler = make_scheduler(pcbs, policy=policy)
+
+    ran = run_slices(scheduler, 5000)
+    by_level = [sum(ran.get(pid, 0) for pid in range(level - 1, 10, 5)) for level in range(1, 6)]
+
+    # no demotion and every level strictly ahead of the one below
+    assert [pcb.priority for pcb in pcbs] == [1 + pid % 5 for pid in range(10)]
+    assert all(a > b for a, b in zip(by_level, by_level[1:]))
+    assert min(by_level) > 0
+
+
+def test_stride_share_is_proportional_to_tickets():
+    pcbs = [make_pcb(0, 1, time_left=10**9), make_pcb(1, 5, time_left=10**9)]
+    scheduler = make_scheduler(pcbs, {1: 1, 2: 1, 3: 1, 4: 1, 5: 1}, policy="stride")
+
+    ran = run_slices(scheduler, 600)
+
+    # 500 against 100 tickets
+    assert ran == {0: 500, 1: 100}
+
+
+def test_cfs_new_process_starts_at_min_vruntime():
+    old = make_pcb(0, 1, time_left=10**9)
+    scheduler = make_scheduler([old], policy="cfs")
+    run_slices(scheduler, 50)
+
+    new = make_pcb(1, 1, time_left=10**9)
+    scheduler.register_process_lookup({0: old, 1: new}.get)
+    scheduler.add_ready_process(new)
+    ran = run_slices(scheduler, 20)
+
+    # shares the CPU from now on instead of catching up on the past
+    assert ran[0] == ran[1]
+
+
+def test_lottery_grows_and_reuses_slots():
+    pcbs = [make_pcb(pid, 1 + pid % 5) for pid in range(100)]
+    scheduler = make_scheduler(pcbs, policy="lottery")
+    lottery = scheduler.policy
+    assert lottery.total_tickets == sum(lottery.tickets(pcb.priority) for pcb in pcbs)
+
+    picked = {scheduler.get_next_exec_time_and_proc()[1].pid for _ in range(100)}
+
+    assert picked == set(range(100))
+    assert lottery.total_tickets == 0
+    assert scheduler.get_next_exec_time_and_proc() == (None, None)
+    assert len(lottery.free_slots) == len(lottery.slots)
+
+
+# 4. Múltiplos núcleos
+
+@pytest.mark.parametrize("policy", ["mlfq", "cfs", "stride"])
+def test_idle_core_steals_but_not_pinned(policy):
+    pcbs = [make_pcb(pid, 1 + pid % 3) for pid in range(6)]
+    scheduler = _Scheduler(_CPU(NullSink()), sink=NullSink(), policy=policy, num_cores=3, affinity={1: [1]})
+    scheduler.register_process_lookup({pcb.pid: pcb for pcb in pcbs}.get)
+
+    assert [scheduler.add_ready_process(pcb) for pcb in pcbs] == [0, 1, 2, 0, 1, 2]
+
+    # core 2 runs out of work, then takes from the others from the back,
+    # except the process pinned to core 1
+    taken = [scheduler.get_next_exec_time_and_proc(2)[1] for _ in range(6)]
+
+    assert [pcb.pid for pcb in taken[:5]] == [2, 5, 3, 4, 0]
+    assert taken[5] is None
+    assert scheduler.migrations == 3
+    assert scheduler.get_next_exec_time_and_proc(1)[1].pid == 1
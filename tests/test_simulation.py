@@ -0,0 +1,96 @@
+import pytest
+
+from simple_os.output import NullSink
+from simple_os.simulation import EventKind, EventQueue
+from simple_os.simulation_utils import ProcCreatedTimedList, ProcFileStream, ProcToBeDispathed, parse_procs_decl
+
+# 1. Fila de eventos
+
+def test_events_ordered_by_time():
+    q = EventQueue()
+    q.push(10, EventKind.QUANTUM_EXPIRY)
+    q.push(3, EventKind.ARRIVAL)
+    q.push(7, EventKind.COMPLETION)
+
+    assert [q.pop()[0] for _ in range(3)] == [3, 7, 10]
+    assert len(q) == 0
+
+
+def test_arrivals_before_slice_end_at_same_time():
+    q = EventQueue()
+    q.push(5, EventKind.QUANTUM_EXPIRY, 1)
+    q.push(5, EventKind.COMPLETION, 1)
+    q.push(5, EventKind.PREEMPTION, 1)
+    q.push(5, EventKind.ARRIVAL)
+
+    kinds = [q.pop()[1] for _ in range(4)]
+    assert kinds == [
+        EventKind.ARRIVAL,
+        EventKind.PREEMPTION,
+        EventKind.COMPLETION,
+        EventKind.QUANTUM_EXPIRY,
+    ]
+
+
+def test_same_key_is_fifo():
+    q = EventQueue()
+    q.push(1, EventKind.PREEMPTION, "a")
+    q.push(1, EventKind.PREEMPTION, "b")
+
+    assert q.pop()[2] == "a"
+    assert q.pop()[2] == "b"
+    assert q.peek_time() is None
+
+# 2. Lista de chegadas
+
+def decl(created_at, priority=1):
+    return ProcToBeDispathed(created_at, priority, 1, 1, 0, 0, 0, 0)
+
+
+def test_unsorted_append_is_stable():
+    procs = ProcCreatedTimedList()
+    for p in [decl(5, 1), decl(2, 1), decl(5, 2), decl(2, 2), decl(0), decl(9)]:
+        procs.append(p)
+
+    assert [(p.created_at, p.priority) for p in procs] == [
+        (0, 1), (2, 1), (2, 2), (5, 1), (5, 2), (9, 1),
+    ]
+
+
+def test_file_stream_matches_parsed_list(tmp_path):
+    path = tmp_path / "procs.txt"
+    path.write_text("".join(f"{t}, 1, 3, 8, 0, 0, 0, 0\n\n" for t in range(0, 50, 5)))
+
+    parsed = parse_procs_decl(str(path), NullSink())
+    stream = ProcFileStream(str(path), NullSink(), chunk_size=3)
+
+    assert list(stream) == list(parsed)
+    assert stream.get_unfetched_procs_until(12) == parsed.get_unfetched_procs_until(12)
+    assert stream.next_arrival_time == parsed.next_arrival_time == 15
+
+
+@pytest.mark.parametrize("line", ["0, 1, 3, 8, 0, 0, 0", "0, 1, 3, 8, 0, 0, 0, x", "0, 1, 3.5, 8, 0, 0, 0, 0"])
+def test_malformed_declaration(tmp_path, line):
+    path = tmp_path / "procs.txt"
+    path.write_text(f"0, 1, 3, 8, 0, 0, 0, 0\n{line}\n")
+
+    with pytest.raises((ValueError, TypeError)):
+        parse_procs_decl(str(path), NullSink())
+
+
+def test_columns_roundtrip():
+    procs = ProcCreatedTimedList()
+    procs.extend([decl(3, 2), decl(1, 5), decl(3, 0)])
+
+    assert procs.columns[0].tolist() == [1, 3, 3]
+    assert procs.columns[1].tolist() == [5, 2, 0]
+    assert procs.get_unfetched_procs_until(2) == [decl(1, 5)]
+    assert procs.num_unfetched_procs == 2
+
+
+def test_large_priorities_and_device_requests(tmp_path):
+    path = tmp_path / "procs.txt"
+    path.write_text("0, 200, 3, 8, 300, 0, 0, 1000\n")
+
+    procs = parse_procs_decl(str(path), NullSink())
+    assert list(procs) == [ProcToBeDispathed(0, 200, 3, 8, 300, 0, 0, 1000)]
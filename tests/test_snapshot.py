@@ -0,0 +1,205 @@
+import io
+
+import pytest
+
+from simple_os.config import MachineConfig
+from simple_os.kernel import Kernel
+from simple_os.output import NullSink, TextSink
+from simple_os.simulation_utils import ProcCreatedTimedList, ProcFileStream, ProcToBeDispathed, parse_file_decl
+from simple_os.snapshot import dump_snapshot, load_snapshot
+from simple_os.workload import GeneratedWorkload, WorkloadSpec
+
+# Helpers
+
+WORKLOAD = (
+    (0, 5, 8, 400, 0, 0, 0, 0),
+    (0, 5, 11, 560, 1, 0, 0, 0),
+    (2, 3, 6, 64, 1, 1, 1, 1),
+    (6, 1, 5, 64, 0, 0, 0, 0),
+    (9, 0, 4, 10, 0, 0, 0, 0),
+)
+
+def make_procs():
+    procs = ProcCreatedTimedList()
+    for decl in WORKLOAD:
+        procs.append(ProcToBeDispathed(*decl))
+    return procs
+
+# 1. Continuar de um snapshot
+
+@pytest.mark.parametrize("t", [0, 3, 10, 25])
+def test_resume_gives_same_output(t):
+    straight = io.StringIO()
+    Kernel(sink=TextSink(straight)).run(make_procs())
+
+    out = io.StringIO()
+    kernel = Kernel(sink=TextSink(out))
+    simulation = kernel.start(make_procs())
+    simulation.run(until=t)
+    assert not simulation.finished
+
+    data = dump_snapshot(kernel, simulation)
+    _, resumed, _ = load_snapshot(data, TextSink(out))
+    resumed.run()
+
+    assert resumed.finished
+    assert out.getvalue() == straight.getvalue()
+    straight_simulation = Kernel(sink=NullSink()).run(make_procs())
+    assert resumed.completed == straight_simulation.completed
+    assert resumed.total_turnaround == straight_simulation.total_turnaround
+    assert resumed.makespan == straight_simulation.makespan
+
+
+def test_resume_file_stream(tmp_path):
+    path = tmp_path / "procs.txt"
+    path.write_text("".join(", ".join(map(str, decl)) + "\n" for decl in WORKLOAD))
+
+    straight = io.StringIO()
+    Kernel(sink=TextSink(straight)).run(ProcFileStream(str(path), NullSink()))
+
+    out = io.StringIO()
+    kernel = Kernel(sink=TextSink(out))
+    simulation = kernel.start(ProcFileStream(str(path), NullSink(), chunk_size=2))
+    simulation.run(until=3)
+    _, resumed, _ = load_snapshot(dump_snapshot(kernel, simulation), TextSink(out))
+    resumed.run()
+
+    assert out.getvalue() == straight.getvalue()
+    assert resumed.arrivals.num_fetched == len(WORKLOAD)
+
+
+@pytest.mark.parametrize("policy,real_time_policy,seed,machine", [
+    ("cfs", "edf", 3, {}),
+    ("lottery", "fifo", 3, {}),
+    ("stride", "edf", 3, {}),
+    # idle cores fail to steal processes pinned to the other core
+    ("lottery", "edf", 10, {"num_cores": 2, "affinity": {pid: [pid % 2] for pid in range(0, 80, 3)}}),
+])
+def test_resume_other_policies(policy, real_time_policy, seed, machine):
+    config = MachineConfig(policy=policy, real_time_policy=real_time_policy, **machine)
+    spec = WorkloadSpec(seed=seed, num_procs=80, rate=0.3, memory_max=128)
+
+    straight = io.StringIO()
+    Kernel(config, TextSink(straight)).run(GeneratedWorkload(spec))
+
+    out = io.StringIO()
+    kernel = Kernel(config, TextSink(out))
+    simulation = kernel.start(GeneratedWorkload(spec))
+    simulation.run(until=60)
+    _, resumed, _ = load_snapshot(dump_snapshot(kernel, simulation), TextSink(out))
+    resumed.run()
+
+    assert out.getvalue() == straight.getvalue()
+
+
+@pytest.mark.parametrize("config", [
+    MachineConfig(memory_blocks=320, memory_strategy="next_fit"),
+    MachineConfig(memory_blocks=320, memory_strategy="buddy"),
+    MachineConfig(memory_blocks=320, memory_strategy="segregated"),
+    MachineConfig(memory_blocks=448, memory_strategy="next_fit", compaction=True, compaction_rate=16),
+    MachineConfig(memory_blocks=128, paging=True, page_replacement="fifo"),
+    MachineConfig(memory_blocks=128, paging=True, page_replacement="clock", tlb_entries=4),
+    MachineConfig(memory_blocks=128, paging=True, page_replacement="working_set"),
+], ids=lambda config: (
+    config.page_replacement if config.paging else "compaction" if config.compaction else config.memory_strategy
+))
+def test_resume_other_memory(config):
+    spec = WorkloadSpec(seed=5, num_procs=80, rate=0.5, memory_max=128)
+
+    straight = io.StringIO()
+    Kernel(config, TextSink(straight)).run(GeneratedWorkload(spec))
+
+    out = io.StringIO()
+    kernel = Kernel(config, TextSink(out))
+    simulation = kernel.start(GeneratedWorkload(spec))
+    simulation.run(until=60)
+    _, resumed, _ = load_snapshot(dump_snapshot(kernel, simulation), TextSink(out))
+    resumed.run()
+
+    assert out.getvalue() == straight.getvalue()
+
+
+def test_resume_more_devices():
+    config = MachineConfig(devices={"scanner": 2, "printer": 5, "sata": 8})
+    spec = WorkloadSpec(
+        seed=9, num_procs=80, rate=0.5, memory_max=64,
+        printer_probability=0.5, scanner_probability=0.4, modem_probability=0.3, disk_probability=0.5,
+    )
+
+    straight = io.StringIO()
+    Kernel(config, TextSink(straight)).run(GeneratedWorkload(spec))
+
+    out = io.StringIO()
+    kernel = Kernel(config, TextSink(out))
+    simulation = kernel.start(GeneratedWorkload(spec))
+    simulation.run(until=40)
+    assert kernel.resource_manager.held
+    _, resumed, _ = load_snapshot(dump_snapshot(kernel, simulation), TextSink(out))
+    resumed.run()
+
+    assert out.getvalue() == straight.getvalue()
+
+
+@pytest.mark.parametrize("deadlock", ["avoid", "detect"])
+def test_resume_deadlock_handling(deadlock):
+    config = MachineConfig(devices={"printer": 3}, deadlock=deadlock)
+    spec = WorkloadSpec(
+        seed=9, num_procs=80, rate=0.5, memory_max=64,
+        printer_probability=0.5, scanner_probability=0.4, modem_probability=0.3, disk_probability=0.5,
+    )
+    kernel = Kernel(config, NullSink())
+    simulation = kernel.start(GeneratedWorkload(spec))
+    simulation.run(until=40)
+    resumed, _, _ = load_snapshot(dump_snapshot(kernel, simulation), NullSink())
+
+    safety, restored = kernel.resource_manager.safety, resumed.resource_manager.safety
+    assert safety.requests
+    for matrix in ("allocation", "maximum", "need", "requests"):
+        assert getattr(restored, matrix) == getattr(safety, matrix)
+    assert restored.available == safety.available
+
+
+def test_filesystem_roundtrip():
+    ops, fs_manager = parse_file_decl("files.txt", NullSink())
+    kernel = Kernel(sink=NullSink())
+    simulation = kernel.start(make_procs())
+
+    _, _, restored = load_snapshot(dump_snapshot(kernel, simulation, fs_manager), NullSink())
+
+    assert restored.system.get_disk_state() == fs_manager.system.get_disk_state()
+    assert sorted(restored.system.files) == sorted(fs_manager.system.files)
+    assert [str(op) for op in restored.pending_operations] == [str(op) for op in ops]
+
+# 2. Variantes a partir do mesmo ponto
+
+def test_branches_are_independent():
+    kernel = Kernel(sink=NullSink())
+    simulation = kernel.start(make_procs())
+    simulation.run(until=10)
+    data = dump_snapshot(kernel, simulation)
+
+    _, s1, _ = load_snapshot(data, NullSink())
+    k2, s2, _ = load_snapshot(data, NullSink(), MachineConfig(name="short", quantum_table={1: 1, 2: 1, 3: 1, 4: 1, 5: 1}))
+    s1.run()
+
+    assert s1.finished and not s2.finished
+    assert k2.process_manager.existing_processes > 0
+    assert k2.scheduler.quantum_table[1] == 1
+
+    s2.run()
+    assert s2.completed == s1.completed
+
+
+def test_rejects_other_policy():
+    kernel = Kernel(sink=NullSink())
+    data = dump_snapshot(kernel, kernel.start(make_procs()))
+
+    with pytest.raises(ValueError):
+        load_snapshot(data, NullSink(), MachineConfig(policy="cfs"))
+    with pytest.raises(ValueError):
+        load_snapshot(data, NullSink(), MachineConfig(devices={"printer": 3}))
+
+
+def test_rejects_other_data():
+    with pytest.raises(ValueError):
+        load_snapshot(b"not a snapshot at all")
@@ -0,0 +1,44 @@
+import pytest
+
+from simple_os.config import MachineConfig
+from simple_os.sweep import run_one, sweep
+
+# 1. Uma execução
+
+def test_run_one_summary():
+    row = run_one("t/p_mem_block.txt", {}, "files.txt")
+
+    assert row["config"] == "default"
+    assert row["processes"] == 6
+    assert row["completed"] == 6
+    assert row["killed"] == 0
+    assert row["memory_blocked"] > 0
+    assert row["failed_allocations"] >= row["memory_blocked"]
+    assert row["fs_failures"] == 2
+
+
+def test_run_one_uses_config():
+    row = run_one("t/p_mem_block.txt", {"name": "small", "memory_blocks": 512})
+
+    assert row["config"] == "small"
+    assert row["killed"] > 0
+
+# 2. Determinismo
+
+def test_sweep_is_deterministic():
+    configs = [{}, {"name": "short_q", "quantum_table": {"1": 2}}]
+    first = sweep(["t/p_prios.txt", "t/p_io.txt"], configs, jobs=2)
+    second = sweep(["t/p_prios.txt", "t/p_io.txt"], configs, jobs=2)
+
+    assert first == second
+    assert [(r["workload"], r["config"]) for r in first] == [
+        ("t/p_prios.txt", "default"),
+        ("t/p_prios.txt", "short_q"),
+        ("t/p_io.txt", "default"),
+        ("t/p_io.txt", "short_q"),
+    ]
+
+
+def test_config_from_dict_rejects_unknown_keys():
+    with pytest.raises(ValueError, match="quantum"):
+        MachineConfig.from_dict({"quantum": 3})
@@ -0,0 +1,98 @@
+import io
+
+import pytest
+
+from simple_os.kernel import Kernel
+from simple_os.output import OutputEvent, TextSink
+from simple_os.simulation_utils import ProcCreatedTimedList, ProcToBeDispathed
+from simple_os.trace import TraceSink, diff, read_trace, replay
+
+# Helpers
+
+def write_trace(path, *decls):
+    procs = ProcCreatedTimedList()
+    for decl in decls:
+        procs.append(ProcToBeDispathed(*decl))
+    with open(path, "wb") as f:
+        sink = TraceSink(f, buffer_size=64)
+        Kernel(sink=sink).run(procs)
+        sink.close()
+
+WORKLOAD = (
+    (0, 2, 8, 64, 1, 0, 0, 1),
+    (6, 1, 8, 64, 1, 0, 0, 0),
+    (7, 0, 3, 2000, 0, 0, 0, 0),
+)
+
+# 1. Ida e volta
+
+def test_replay_matches_text_output(tmp_path):
+    path = tmp_path / "run.trace"
+    write_trace(path, *WORKLOAD)
+
+    replayed = io.StringIO()
+    replay(path, TextSink(replayed))
+
+    direct = io.StringIO()
+    procs = ProcCreatedTimedList()
+    for decl in WORKLOAD:
+        procs.append(ProcToBeDispathed(*decl))
+    Kernel(sink=TextSink(direct)).run(procs)
+
+    assert replayed.getvalue() == direct.getvalue()
+
+
+def test_trace_keeps_none_and_reasons(tmp_path):
+    path = tmp_path / "run.trace"
+    write_trace(path, *WORKLOAD)
+    events = list(read_trace(path))
+
+    kill = [fields for event, fields in events if event.name == "KILL"]
+    assert len(kill) == 1
+    assert kill[0][1].name == "TOO_LARGE_MEM_REQUEST"
+
+
+def test_read_in_small_chunks(tmp_path):
+    path = tmp_path / "run.trace"
+    with open(path, "wb") as f:
+        sink = TraceSink(f)
+        sink.emit(OutputEvent.MESSAGE, "uma mensagem bem mais longa que um pedaço")
+        sink.emit(OutputEvent.EXECUTE, 3, True)
+        sink.emit(OutputEvent.FS_CREATE, 3, "A", "7", 0, 4)
+        sink.emit(OutputEvent.MESSAGE, "uma mensagem bem mais longa que um pedaço")
+        sink.close()
+    write_trace(tmp_path / "long.trace", *WORKLOAD)
+
+    for trace in (path, tmp_path / "long.trace"):
+        events = list(read_trace(trace))
+        for chunk_size in (1, 5, 13):
+            assert list(read_trace(trace, chunk_size)) == events
+    assert list(read_trace(path, 5))[2] == (OutputEvent.FS_CREATE, (3, "A", "7", 0, 4))
+
+
+def test_truncated_trace(tmp_path):
+    path = tmp_path / "run.trace"
+    write_trace(path, *WORKLOAD)
+    data = path.read_bytes()
+    path.write_bytes(data[:-1])
+
+    with pytest.raises(ValueError):
+        list(read_trace(path, chunk_size=7))
+    path.write_bytes(b"not a trace")
+    with pytest.raises(ValueError):
+        list(read_trace(path))
+
+# 2. Diff
+
+def test_diff(tmp_path):
+    a, b, c = tmp_path / "a.trace", tmp_path / "b.trace", tmp_path / "c.trace"
+    write_trace(a, *WORKLOAD)
+    write_trace(b, *WORKLOAD)
+    write_trace(c, *WORKLOAD[:2], (7, 0, 4, 64, 0, 0, 0, 0))
+
+    out = io.StringIO()
+    assert diff(a, b, out)
+
+    out = io.StringIO()
+    assert not diff(a, c, out)
+    assert "Traces diverge at event #" in out.getvalue()
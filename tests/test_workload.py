@@ -0,0 +1,62 @@
+import io
+
+import pytest
+
+from simple_os.kernel import Kernel
+from simple_os.output import TextSink
+from simple_os.simulation_utils import ProcCreatedTimedList, ProcStream
+from simple_os.workload import GeneratedWorkload, WorkloadSpec, generate
+
+# 1. Gerador
+
+@pytest.mark.parametrize("arrival", ["poisson", "bursty", "diurnal"])
+def test_generate_is_sorted_and_deterministic(arrival):
+    spec = WorkloadSpec(seed=7, num_procs=500, arrival=arrival)
+    procs = list(generate(spec))
+
+    assert len(procs) == 500
+    assert procs == list(generate(spec))
+    assert all(a.created_at <= b.created_at for a, b in zip(procs, procs[1:]))
+    assert all(spec.exec_time_min <= p.execution_time <= spec.exec_time_max for p in procs)
+
+
+def test_generate_priority_mix():
+    spec = WorkloadSpec(num_procs=300, priority_weights=(0, 0, 0, 1, 0, 0))
+    assert {p.priority for p in generate(spec)} == {3}
+
+
+def test_generate_forever():
+    procs = generate(WorkloadSpec(num_procs=None))
+    assert len([next(procs) for _ in range(10_000)]) == 10_000
+
+
+def test_invalid_spec():
+    with pytest.raises(ValueError):
+        WorkloadSpec(arrival="weekly")
+    with pytest.raises(ValueError):
+        WorkloadSpec.from_dict({"rate": 1, "procs": 3})
+
+# 2. Simulação alimentada pelo gerador
+
+def test_stream_simulation_matches_materialized_list():
+    spec = WorkloadSpec(seed=3, num_procs=60, rate=0.1)
+
+    procs = ProcCreatedTimedList()
+    for proc in generate(spec):
+        procs.append(proc)
+    materialized = io.StringIO()
+    Kernel(sink=TextSink(materialized)).run(procs)
+
+    streamed = io.StringIO()
+    simulation = Kernel(sink=TextSink(streamed)).run(GeneratedWorkload(spec))
+
+    assert streamed.getvalue() == materialized.getvalue()
+    assert simulation.arrivals.num_fetched == 60
+
+
+def test_stream_rejects_unsorted_input():
+    procs = list(generate(WorkloadSpec(num_procs=3, rate=0.01)))
+    stream = ProcStream(reversed(procs))
+
+    with pytest.raises(ValueError):
+        stream.get_unfetched_procs_until(procs[-1].created_at)